@@ -0,0 +1,3 @@
+from i18ntools.cli import main
+
+main()
@@ -0,0 +1,292 @@
+"""The backends that translate batches of texts for make_api_call.
+
+A backend is any object with the methods of TranslatorBackend. The Azure
+Cognitive Services Translator is the default backend. Its endpoint can be
+changed, i.e. to the local stand-in server in i18ntools.fake_translator,
+to load test batching, concurrency and retries without the real API.
+"""
+
+import os
+import sys
+import time
+from typing import Protocol
+
+from i18ntools.metrics import record_request, record_retry
+from i18ntools.rate_limit import RateLimiter, parse_retry_after, retry_status_codes
+
+# Default region for the Azure translator resource.
+default_region = "eastus2"
+# Default number of requests sent to the Translator API at the same time.
+default_workers = 1
+# URL of the Azure Cognitive Services Translator.
+default_endpoint = "https://api.cognitive.microsofttranslator.com"
+# Environment variable that overrides default_endpoint.
+endpoint_variable = "TRANSLATOR_API_ENDPOINT"
+# Environment variable of the API key of the Translator API, which is only
+# sent to default_endpoint.
+subscription_key_variable = "TRANSLATOR_API_SUBSCRIPTION_KEY"
+# Environment variable of the key sent to any other endpoint, i.e. the token
+# of i18ntools serve.
+endpoint_key_variable = "TRANSLATOR_ENDPOINT_KEY"
+
+
+class TranslatorBackend(Protocol):
+    """The methods make_api_call uses to translate texts."""
+
+    def translate_batch(self, texts, input_lang, output_langs):
+        """Translates a batch of texts that fits within the request limits
+        and returns a list with a list of the translations of each text,
+        in the order of output_langs.
+
+        Keyword arguments:
+        texts -- a list of the strings to translate
+        input_lang -- the language of the texts i.e. en for English
+        output_langs -- a list of the languages to translate the texts into
+        """
+
+    def close(self):
+        """Releases the connections of the backend."""
+
+
+def create_session(workers=default_workers):
+    """Returns a requests.Session that keeps its connections alive
+    and can be shared by up to workers threads at the same time.
+
+    Keyword arguments:
+    workers -- the number of threads that will use the session. (default 1)
+    """
+    # Import requests here since it is slow to import and the commands
+    # that do not translate anything should start quickly
+    import requests
+
+    session = requests.Session()
+    # Keep a pooled connection for every thread so none of them have to
+    # open a new connection for each request
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=1, pool_maxsize=max(workers, 1)
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def post_translation_request(
+    session,
+    translator_endpoint,
+    headers,
+    request_payload,
+    translator_region,
+    rate_limiter=None,
+    characters=None,
+):
+    """Sends one request to the Translator API and returns its JSON response.
+
+    Keyword arguments:
+    session -- the requests.Session used to send the request
+    translator_endpoint -- the URL of the Translator API translate method
+    headers -- the REST API request headers
+    request_payload -- a list of dictionaries with the text to translate
+    translator_region -- the region of the Azure translator resource
+    rate_limiter -- a RateLimiter that schedules the request within the quota
+        and retries it when it is throttled or fails for a transient reason.
+        If this is left as None, then the request is sent once.
+    characters -- the number of characters the request counts against the
+        quota. (default the number of characters in request_payload)
+    """
+    import requests
+
+    if characters is None:
+        characters = sum(len(item["text"]) for item in request_payload)
+
+    attempt = 0
+    while True:
+        if rate_limiter is not None and attempt == 0:
+            rate_limiter.acquire(characters)
+        elif rate_limiter is not None:
+            # The request is only counted against the quota once
+            rate_limiter.wait_for_pause()
+        can_retry = rate_limiter is not None and attempt < rate_limiter.max_retries
+        # Make the REST API call to Translator API to translate the values
+        # https://learn.microsoft.com/en-us/azure/cognitive-services/translator/reference/v3-0-translate
+        start = time.perf_counter()
+        try:
+            response = session.post(
+                translator_endpoint, headers=headers, json=request_payload, timeout=30
+            )
+        except (requests.ConnectionError, requests.Timeout) as e:
+            record_request(time.perf_counter() - start, characters, None)
+            if not can_retry:
+                raise
+            delay = rate_limiter.backoff(attempt)
+            record_retry(delay, False)
+            print(f"Translation request failed ({e}), retrying in {delay:.1f} seconds")
+            attempt += 1
+            continue
+        record_request(time.perf_counter() - start, characters, response.status_code)
+
+        if response.status_code == 200:
+            return response.json()
+
+        if can_retry and response.status_code in retry_status_codes:
+            throttled = response.status_code == 429
+            delay = rate_limiter.backoff(
+                attempt,
+                parse_retry_after(response.headers.get("Retry-After")),
+                throttled,
+            )
+            record_retry(delay, throttled)
+            print(
+                f"Translation {'throttled' if throttled else 'failed'} with status "
+                f"code: {response.status_code}, retrying in {delay:.1f} seconds"
+            )
+            attempt += 1
+            continue
+
+        # Exit with an error if the REST API call was not successful
+        status_code_message = (
+            f"Translation failed with status code: {response.status_code}"
+        )
+        print(status_code_message)
+        print("Response:", response.text)
+        print("translator_region:", translator_region)
+        raise requests.HTTPError(status_code_message, response)
+
+
+class AzureTranslatorBackend:
+    """Translates texts with the Azure Cognitive Services Translator.
+
+    Keyword arguments:
+    translator_region -- the region of the Azure translator resource.
+        (default eastus2)
+    endpoint -- the base URL of the Translator API. (default the
+        TRANSLATOR_API_ENDPOINT environment variable, or the Azure endpoint)
+    subscription_key -- the API key. (default the
+        TRANSLATOR_API_SUBSCRIPTION_KEY environment variable for the Azure
+        endpoint, and the TRANSLATOR_ENDPOINT_KEY environment variable, if it
+        is set, for any other endpoint, so the Azure key is never sent to
+        another host)
+    session -- a requests.Session to send the requests with. If this is left
+        as None, then a new session is created and closed with the backend.
+    workers -- number of threads that send requests at the same time.
+        (default 1)
+    rate_limiter -- a RateLimiter that keeps the requests within the quota
+        of the subscription. (default RateLimiter() without a quota)
+    """
+
+    def __init__(
+        self,
+        translator_region=default_region,
+        endpoint=None,
+        subscription_key=None,
+        session=None,
+        workers=default_workers,
+        rate_limiter=None,
+    ):
+        if endpoint is None:
+            endpoint = os.environ.get(endpoint_variable) or default_endpoint
+            if endpoint.rstrip("/") != default_endpoint:
+                # Make sure a variable left over from a load test is noticed
+                print(
+                    f"Warning: sending the requests to {endpoint} instead of "
+                    f"Azure, since {endpoint_variable} is set",
+                    file=sys.stderr,
+                )
+        endpoint = endpoint.rstrip("/")
+        if subscription_key is None and endpoint == default_endpoint:
+            # Read the API key from an environment variable
+            subscription_key = os.environ[subscription_key_variable]
+        elif subscription_key is None:
+            # Other endpoints, like i18ntools serve, get their own key, if any
+            subscription_key = os.environ.get(endpoint_key_variable, "")
+        self.translator_region = translator_region
+        self.endpoint = endpoint
+        # Set up the REST API request headers
+        self.headers = {
+            "Content-Type": "application/json",
+            "Ocp-Apim-Subscription-Region": translator_region,
+        }
+        if subscription_key:
+            self.headers["Ocp-Apim-Subscription-Key"] = subscription_key
+        self.owns_session = session is None
+        self.session = create_session(workers) if session is None else session
+        self.rate_limiter = RateLimiter() if rate_limiter is None else rate_limiter
+
+    def get_translate_url(self, input_lang, output_langs):
+        """Returns the URL of the translate method for a pair of languages.
+
+        Keyword arguments:
+        input_lang -- the language of the texts i.e. en for English
+        output_langs -- a list of the languages to translate the texts into
+        """
+        return "{0}/translate?api-version=3.0&from={1}&to={2}".format(
+            self.endpoint, input_lang, "&to=".join(output_langs)
+        )
+
+    def translate_batch(self, texts, input_lang, output_langs):
+        """Translates a batch of texts with one request and returns a list
+        with a list of the translations of each text.
+
+        Keyword arguments:
+        texts -- a list of the strings to translate
+        input_lang -- the language of the texts i.e. en for English
+        output_langs -- a list of the languages to translate the texts into
+        """
+        response_object = post_translation_request(
+            self.session,
+            self.get_translate_url(input_lang, output_langs),
+            self.headers,
+            [{"text": text} for text in texts],
+            self.translator_region,
+            self.rate_limiter,
+            # The quota counts the characters once per output language
+            sum(len(text) for text in texts) * len(output_langs),
+        )
+        return [
+            [translation["text"] for translation in result["translations"]]
+            for result in response_object
+        ]
+
+    def close(self):
+        """Closes the session of the backend if it created it."""
+        if self.owns_session:
+            self.session.close()
+
+
+def add_endpoint_arguments(parser):
+    """Adds the CLI option for the endpoint of the translator to a parser.
+
+    Keyword arguments:
+    parser -- the argparse.ArgumentParser of the CLI script
+    """
+    parser.add_argument(
+        "--endpoint",
+        required=False,
+        type=str,
+        help=(
+            "base URL of the translator to send the requests to, i.e. the URL of "
+            "i18ntools serve. Defaults to the TRANSLATOR_API_ENDPOINT environment "
+            "variable, or the Azure Cognitive Services Translator. The Azure API "
+            "key is only sent to the Azure endpoint. Other endpoints are sent the "
+            "key in the TRANSLATOR_ENDPOINT_KEY environment variable, if it is set."
+        ),
+    )
+
+
+def backend_from_args(args, rate_limiter=None):
+    """Returns an AzureTranslatorBackend for the --endpoint option, or None if
+    the option was not given so that the default backend is used.
+
+    Keyword arguments:
+    args -- the parsed arguments of the CLI script, with the region and
+        workers options
+    rate_limiter -- a RateLimiter that keeps the requests within the quota
+        of the subscription. (default None)
+    """
+    if args.endpoint is None:
+        return None
+    return AzureTranslatorBackend(
+        args.region,
+        endpoint=args.endpoint,
+        workers=args.workers,
+        rate_limiter=rate_limiter,
+    )
@@ -0,0 +1,418 @@
+#!/usr/bin/env python
+"""Measures the time and peak memory of parsing, sorting and translating
+synthetic i18n Java properties bundles, and compares them with a baseline.
+
+The bundles are generated with a given number of keys and share of multiline
+values, comments and duplicate values. Translating uses a stub backend with
+the pseudo-translation of the fake translator, so the benchmarks run offline
+and only measure the work done on this machine.
+
+The startup time of the subcommands of the i18ntools command is measured
+too, as the time their --help takes on top of starting Python. The run fails
+if a subcommand that only works on local files takes longer than
+--startup_budget to start.
+
+Save a baseline with --save_baseline and compare a later run with it with
+--compare. The run fails if a stage got slower, or used more memory, than
+the baseline by more than --threshold.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from i18ntools.fake_translator import pseudo_translate
+from i18ntools.parse_i18n_file import (
+    parse_i18n_file,
+    parse_i18n_file_without_backslashes,
+)
+from i18ntools.sort_i18n_file import sort_i18n_file
+from i18ntools.translate import translate_file
+
+# Default numbers of keys of the generated bundles.
+default_sizes = (1000, 10000, 100000)
+# Default share of the values that span several lines.
+default_multiline_ratio = 0.1
+# Default number of comment lines per message.
+default_comment_ratio = 0.2
+# Default share of the values that are the same as an earlier value.
+default_duplicate_ratio = 0.1
+# Default number of times each stage is timed. The fastest time is kept.
+default_repeat = 3
+# Default share a stage may get slower than its baseline.
+default_threshold = 0.2
+# Subcommands of the i18ntools command whose startup time is measured.
+startup_commands = ("parse", "sort", "translate", "translate-missing")
+# Subcommands that only work on local files, which must start within the budget.
+local_commands = ("parse", "sort")
+# Default number of seconds a local subcommand may take to start on top of
+# starting Python.
+default_startup_budget = 0.1
+# Version of the format of the baseline files.
+baseline_format_version = 1
+# Words the generated values are made of.
+words = (
+    "the value of property {0} is not valid, please enter a number between "
+    "{1} and {2} for the field user account password email address save "
+    "cancel delete confirm settings device login logout session expired"
+).split()
+
+
+class StubBackend:
+    """A translator backend that pseudo-translates texts in process."""
+
+    def translate_batch(self, texts, input_lang, output_langs):
+        return [
+            [pseudo_translate(text, lang) for lang in output_langs] for text in texts
+        ]
+
+    def close(self):
+        pass
+
+
+def generate_bundle(
+    file_path,
+    keys,
+    multiline_ratio=default_multiline_ratio,
+    comment_ratio=default_comment_ratio,
+    duplicate_ratio=default_duplicate_ratio,
+    seed=0,
+):
+    """Writes a synthetic i18n Java properties bundle.
+
+    Keyword arguments:
+    file_path -- filepath of the bundle to write
+    keys -- number of messages in the bundle
+    multiline_ratio -- share of the values that span several lines
+    comment_ratio -- average number of comment lines before a message
+    duplicate_ratio -- share of the values that are the same as an
+        earlier value
+    seed -- seed of the random generator, so the same bundle is written
+        every time. (default 0)
+    """
+    rng = random.Random(seed)
+    values = []
+    with open(file_path, "w", encoding="utf-8") as f:
+        for index in range(keys):
+            if rng.random() < comment_ratio:
+                f.write(f"# Messages of section {index}\n")
+            if values and rng.random() < duplicate_ratio:
+                value = rng.choice(values)
+            else:
+                value = " ".join(rng.choices(words, k=rng.randint(2, 12)))
+                if rng.random() < multiline_ratio:
+                    continuation = " ".join(rng.choices(words, k=rng.randint(2, 8)))
+                    value = f"{value} \\\n    {continuation}"
+                values.append(value)
+            f.write(f"section{index % 100}.message{index}={value}\n")
+
+
+def measure(function, repeat=default_repeat):
+    """Returns a tuple of the fastest time in seconds of calling function
+    repeat times and the peak memory in bytes it allocated.
+
+    Keyword arguments:
+    function -- the function to call without arguments
+    repeat -- number of times to time the function. (default 3)
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    # Tracing slows the function down, so memory is measured in its own call
+    tracemalloc.start()
+    try:
+        function()
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return min(times), peak_bytes
+
+
+def get_stages(input_file_path, work_dir):
+    """Returns a dictionary of the name and function of each stage
+    measured for a bundle.
+
+    Keyword arguments:
+    input_file_path -- filepath of the generated bundle
+    work_dir -- directory the output files are written to
+    """
+    translated_file_path = Path(work_dir) / "messages_de.properties"
+    backend = StubBackend()
+
+    def translate():
+        translate_file(
+            input_file_path, "de", str(translated_file_path), backend=backend
+        )
+
+    def sort():
+        sort_i18n_file(input_file_path, "de", str(translated_file_path))
+
+    return {
+        "parse_i18n_file": lambda: parse_i18n_file(input_file_path),
+        "parse_i18n_file_without_backslashes": (
+            lambda: parse_i18n_file_without_backslashes(input_file_path)
+        ),
+        "translate_file": translate,
+        "sort_i18n_file": sort,
+    }
+
+
+def run_benchmarks(
+    sizes=default_sizes,
+    multiline_ratio=default_multiline_ratio,
+    comment_ratio=default_comment_ratio,
+    duplicate_ratio=default_duplicate_ratio,
+    repeat=default_repeat,
+):
+    """Runs every stage on a bundle of each size and returns a dictionary of
+    the results, keyed on the stage and size, i.e. "parse_i18n_file[1000]".
+
+    Keyword arguments:
+    sizes -- a list of the numbers of keys of the bundles.
+        (default [1000, 10000, 100000])
+    multiline_ratio -- share of the values that span several lines.
+        (default 0.1)
+    comment_ratio -- average number of comment lines before a message.
+        (default 0.2)
+    duplicate_ratio -- share of the values that are the same as an
+        earlier value. (default 0.1)
+    repeat -- number of times each stage is timed. (default 3)
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        for keys in sizes:
+            input_file_path = str(Path(work_dir) / "messages.properties")
+            generate_bundle(
+                input_file_path, keys, multiline_ratio, comment_ratio, duplicate_ratio
+            )
+            for stage, function in get_stages(input_file_path, work_dir).items():
+                # Keep the progress messages of the scripts out of the report
+                with contextlib.redirect_stdout(io.StringIO()):
+                    seconds, peak_bytes = measure(function, repeat)
+                name = f"{stage}[{keys}]"
+                results[name] = {
+                    "seconds": seconds,
+                    "keys_per_second": keys / seconds if seconds > 0 else None,
+                    "peak_bytes": peak_bytes,
+                }
+                print(
+                    f"{name:<48} {seconds * 1000:>10.1f} ms "
+                    f"{peak_bytes / 1024 / 1024:>10.1f} MiB"
+                )
+    return results
+
+
+def time_process(args, repeat=default_repeat):
+    """Returns the fastest time in seconds of running a Python process
+    repeat times.
+
+    Keyword arguments:
+    args -- a list of the arguments of the Python interpreter
+    repeat -- number of times to run the process. (default 3)
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def run_startup_benchmarks(commands=startup_commands, repeat=default_repeat):
+    """Measures the time each subcommand of the i18ntools command takes to
+    show its help on top of starting Python, and returns a dictionary of the
+    results, keyed on the subcommand, i.e. "startup[sort]".
+
+    Keyword arguments:
+    commands -- a list of the subcommands to measure.
+        (default parse, sort, translate and translate-missing)
+    repeat -- number of times each subcommand is timed. (default 3)
+    """
+    python_seconds = time_process(["-c", "pass"], repeat)
+    results = {}
+    for command in commands:
+        seconds = time_process(["-m", "i18ntools", command, "--help"], repeat)
+        name = f"startup[{command}]"
+        results[name] = {"seconds": max(seconds - python_seconds, 0.0)}
+        print(f"{name:<48} {results[name]['seconds'] * 1000:>10.1f} ms")
+    return results
+
+
+def check_startup_budget(results, budget=default_startup_budget):
+    """Returns a list of messages describing each local subcommand that took
+    longer than the budget to start.
+
+    Keyword arguments:
+    results -- the results returned by run_startup_benchmarks
+    budget -- number of seconds a local subcommand may take to start.
+        (default 0.1)
+    """
+    return [
+        f"startup[{command}] took {result['seconds'] * 1000:.1f} ms, "
+        f"more than the budget of {budget * 1000:.0f} ms"
+        for command in local_commands
+        if (result := results.get(f"startup[{command}]")) is not None
+        and result["seconds"] > budget
+    ]
+
+
+def compare_results(results, baseline, threshold=default_threshold):
+    """Returns a list of messages describing each stage that got slower,
+    or used more memory, than the baseline by more than threshold.
+
+    Keyword arguments:
+    results -- the results returned by run_benchmarks
+    baseline -- the results of an earlier run
+    threshold -- share a stage may get worse than its baseline. (default 0.2)
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        for metric in ("seconds", "peak_bytes"):
+            # The startup times have no peak memory
+            if metric not in result or metric not in baseline[name]:
+                continue
+            before = baseline[name][metric]
+            after = result[metric]
+            if before > 0 and after > before * (1 + threshold):
+                regressions.append(
+                    f"{name} {metric} went from {before:.6g} to {after:.6g} "
+                    f"(+{(after / before - 1) * 100:.0f}%)"
+                )
+    return regressions
+
+
+def main():
+    """Build a CLI for running the benchmarks and comparing them with a baseline."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "-k",
+        "--keys",
+        required=False,
+        type=int,
+        nargs="+",
+        default=list(default_sizes),
+        help="numbers of keys of the generated bundles. Defaults to 1000 10000 100000",
+    )
+    parser.add_argument(
+        "--multiline_ratio",
+        required=False,
+        type=float,
+        default=default_multiline_ratio,
+        help=f"share of the values that span several lines. "
+        f"Defaults to {default_multiline_ratio}",
+    )
+    parser.add_argument(
+        "--comment_ratio",
+        required=False,
+        type=float,
+        default=default_comment_ratio,
+        help=f"average number of comment lines before a message. "
+        f"Defaults to {default_comment_ratio}",
+    )
+    parser.add_argument(
+        "--duplicate_ratio",
+        required=False,
+        type=float,
+        default=default_duplicate_ratio,
+        help=f"share of the values that are the same as an earlier value. "
+        f"Defaults to {default_duplicate_ratio}",
+    )
+    parser.add_argument(
+        "--repeat",
+        required=False,
+        type=int,
+        default=default_repeat,
+        help=f"number of times each stage is timed. Defaults to {default_repeat}",
+    )
+    parser.add_argument(
+        "--save_baseline",
+        required=False,
+        type=str,
+        help="filepath to save the results to, to compare later runs with.",
+    )
+    parser.add_argument(
+        "--compare",
+        required=False,
+        type=str,
+        help="filepath of a baseline to compare the results with.",
+    )
+    parser.add_argument(
+        "--threshold",
+        required=False,
+        type=float,
+        default=default_threshold,
+        help=(
+            "share a stage may get slower, or use more memory, than the baseline "
+            f"before the run fails. Defaults to {default_threshold}"
+        ),
+    )
+    parser.add_argument(
+        "--startup_budget",
+        required=False,
+        type=float,
+        default=default_startup_budget,
+        help=(
+            "number of seconds the local subcommands, parse and sort, may take "
+            "to start on top of starting Python before the run fails. "
+            f"Defaults to {default_startup_budget}"
+        ),
+    )
+    args = parser.parse_args()
+    results = run_benchmarks(
+        args.keys,
+        args.multiline_ratio,
+        args.comment_ratio,
+        args.duplicate_ratio,
+        args.repeat,
+    )
+    results.update(run_startup_benchmarks(repeat=args.repeat))
+
+    if args.save_baseline is not None:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": baseline_format_version,
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+        print("Baseline saved to:", args.save_baseline)
+
+    if args.compare is not None:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_results(results, baseline["results"], args.threshold)
+        if len(regressions) > 0:
+            print("Regressions compared with", args.compare)
+            for regression in regressions:
+                print(" ", regression)
+            sys.exit(1)
+        print("No regressions compared with", args.compare)
+
+    over_budget = check_startup_budget(results, args.startup_budget)
+    if len(over_budget) > 0:
+        print("Subcommands over the startup budget")
+        for message in over_budget:
+            print(" ", message)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
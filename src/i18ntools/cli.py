@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+"""Runs the i18ntools scripts as subcommands of a single i18ntools command,
+i.e. i18ntools sort -i messages.properties -t de
+
+Only the module of the subcommand that is run is imported, and requests is
+only imported once a request is sent, so the subcommands that work on local
+files, like sort and parse, start quickly. Run a subcommand with --help to
+see its options.
+"""
+
+import argparse
+import importlib
+import sys
+
+# The module whose main function runs each subcommand, and what it does.
+commands = {
+    "translate": (
+        "i18ntools.translate",
+        "translate an i18n Java properties file into new files of other languages",
+    ),
+    "translate-missing": (
+        "i18ntools.translate_missing",
+        "translate the messages that are missing from a translated file",
+    ),
+    "status": (
+        "i18ntools.status",
+        "report the missing, extra and duplicate keys of every bundle and language",
+    ),
+    "watch": (
+        "i18ntools.watch",
+        "translate the messages of files into their output files as they are saved",
+    ),
+    "sort": (
+        "i18ntools.sort_i18n_file",
+        "sort the messages of a translated file like the input file",
+    ),
+    "parse": (
+        "i18ntools.parse_i18n_file",
+        "print the messages of an i18n Java properties file as a dictionary",
+    ),
+    "serve": (
+        "i18ntools.serve",
+        "run a local translation service that shares requests to the translator",
+    ),
+    "fake-translator": (
+        "i18ntools.fake_translator",
+        "run a local stand-in for the translator to load test against",
+    ),
+    "benchmark": (
+        "i18ntools.benchmark",
+        "measure the time and memory of parsing, sorting and translating",
+    ),
+}
+# Other names of the subcommands, i.e. the names of the old scripts.
+aliases = {
+    "translate_missing": "translate-missing",
+    "sort-i18n-file": "sort",
+    "sort_i18n_file": "sort",
+    "parse-i18n-file": "parse",
+    "parse_i18n_file": "parse",
+    "fake_translator": "fake-translator",
+}
+
+
+def run_command(command, args):
+    """Runs a subcommand with a list of its arguments.
+
+    Keyword arguments:
+    command -- the name or alias of the subcommand, i.e. sort
+    args -- a list of the command line arguments of the subcommand
+    """
+    command = aliases.get(command, command)
+    module_name, _ = commands[command]
+    module = importlib.import_module(module_name)
+    # The scripts read their arguments from sys.argv, and name themselves
+    # in their help and error messages after the first one
+    sys.argv = [f"i18ntools {command}", *args]
+    module.main()
+
+
+def main(argv=None):
+    """Build a CLI that runs the subcommand given as its first argument."""
+    if argv is None:
+        argv = sys.argv[1:]
+    parser = argparse.ArgumentParser(
+        prog="i18ntools",
+        description=__doc__,
+        epilog="subcommands:\n"
+        + "\n".join(
+            f"  {command:<20}{summary}" for command, (_, summary) in commands.items()
+        ),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "command",
+        help="the subcommand to run. See the list below.",
+    )
+    parser.add_argument(
+        "args",
+        nargs=argparse.REMAINDER,
+        help="the options of the subcommand",
+    )
+    args = parser.parse_args(argv)
+    if args.command not in commands and args.command not in aliases:
+        parser.error(
+            f"unknown command {args.command}, choose from {', '.join(commands)}"
+        )
+    run_command(args.command, args.args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,476 @@
+"""Plans the requests of a translate or translate missing run without sending
+any of them, to report what the run would cost and how long it would take.
+
+A dry run parses the files, finds the messages to translate, skips the values
+in the translation cache and the values that are the same as another message,
+and splits the rest into requests exactly like a real run does, but the
+requests go to a DryRunBackend that only counts them. The translation cache is
+opened read-only, and no output files, journals or manifests are written.
+"""
+
+import json
+import math
+from pathlib import Path
+
+from i18ntools.i18n_document import read_i18n_document
+from i18ntools.job_planner import translate_jobs
+from i18ntools.translate import (
+    check_duplicate_keys,
+    default_lang,
+    default_workers,
+    get_default_filepath,
+    get_selected_messages,
+    iter_payload_chunks,
+    make_api_call,
+    split_languages,
+)
+from i18ntools.translate_missing import (
+    find_pending_messages,
+    get_manifest_filepath,
+    hash_value,
+    read_manifest,
+)
+from i18ntools.translate_tree import (
+    find_base_bundles,
+    missing_mode,
+    plan_bundle,
+    translate_mode,
+)
+from i18ntools.translation_cache import (
+    TranslationCache,
+    get_default_cache_path,
+    normalize_text,
+)
+
+# Version of the format of the JSON plan.
+plan_format_version = 1
+# Default number of seconds a request is assumed to take when the wall time
+# of a plan is estimated.
+default_request_latency = 1.0
+
+
+class DryRunBackend:
+    """A translator backend that counts the requests it is asked to send
+    instead of sending them, and returns each text as its own translation.
+
+    Keyword arguments:
+    output_langs -- a list of the languages the run translates into
+    """
+
+    def __init__(self, output_langs):
+        self.output_langs = list(output_langs)
+        self.message_count = 0
+        self.text_count = 0
+        self.request_count = 0
+        self.billed_characters = dict.fromkeys(self.output_langs, 0)
+
+    def translate_batch(self, texts, input_lang, output_langs):
+        self.request_count += 1
+        self.text_count += len(texts)
+        # The Translator API bills the characters once per output language
+        characters = sum(len(text) for text in texts)
+        for lang in output_langs:
+            self.billed_characters[lang] = (
+                self.billed_characters.get(lang, 0) + characters
+            )
+        return [[text] * len(output_langs) for text in texts]
+
+    def close(self):
+        pass
+
+
+class ReadOnlyCache:
+    """Looks translations up in a TranslationCache without storing the
+    translations of a dry run in it.
+
+    The translations stored during the dry run are kept in memory instead,
+    so a value that repeats in a later chunk or file is found like it would
+    be in the cache of a real run, and is not counted again.
+
+    Keyword arguments:
+    cache -- the TranslationCache to look translations up in
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+        # The translation of each source text, language of the source text
+        # and language of the translation stored during the dry run
+        self.stored = {}
+
+    def lookup(self, text, from_lang, to_langs):
+        source = normalize_text(text)
+        translations = [self.stored.get((source, from_lang, lang)) for lang in to_langs]
+        if all(translation is not None for translation in translations):
+            return translations
+        return self.cache.lookup(text, from_lang, to_langs)
+
+    def store(self, text, from_lang, to_langs, translations):
+        source = normalize_text(text)
+        for to_lang, translation in zip(to_langs, translations):
+            self.stored[(source, from_lang, to_lang)] = translation
+
+    def save(self):
+        pass
+
+
+def open_read_only_cache(cache_path=None):
+    """Returns the translation cache opened read-only for a dry run, or None
+    if it does not exist yet, in which case nothing is created.
+
+    Keyword arguments:
+    cache_path -- filepath of the translation cache.
+        (default get_default_cache_path())
+    """
+    if cache_path is None:
+        cache_path = get_default_cache_path()
+    if not Path(cache_path).is_file():
+        return None
+    return TranslationCache(cache_path, read_only=True)
+
+
+def plan_messages(backend, input_data, input_lang, workers, cache, skip_list=None):
+    """Sends the messages of one call to make_api_call to a DryRunBackend.
+
+    Keyword arguments:
+    backend -- the DryRunBackend of the plan
+    input_data -- a dictionary of the keys and values to translate
+    input_lang -- the language of the values i.e. en for English
+    workers -- number of requests to send at the same time
+    cache -- a ReadOnlyCache to look the values up in, or None
+    skip_list -- a SkipList of the values that are not sent. (default None)
+    """
+    if len(input_data) == 0:
+        return
+    backend.message_count += len(input_data)
+    make_api_call(
+        input_data,
+        backend.output_langs,
+        input_lang,
+        workers=workers,
+        cache=cache,
+        backend=backend,
+        skip_list=skip_list,
+    )
+
+
+def plan_translate_file(
+    input_file_path,
+    output_lang,
+    input_lang=default_lang,
+    remove_backslashes=False,
+    workers=default_workers,
+    cache=None,
+    keys=None,
+    skip_list=None,
+):
+    """Returns a DryRunBackend with the requests that translate_file would
+    send for the same arguments.
+
+    Keyword arguments:
+    input_file_path -- filepath of the i18n Java properties file to translate
+    output_lang -- language of the output file i.e. de for German, or a comma
+        separated string or a list of several languages
+    input_lang -- the language of the input file. (default en)
+    remove_backslashes -- when true, backslashes from multiline values are
+        not included in the text that gets translated.
+    workers -- number of requests to send at the same time. (default 1)
+    cache -- a TranslationCache to look up earlier translations in.
+        (default None)
+    keys -- a list of keys and glob patterns of keys to only translate the
+        messages they select. (default None)
+    skip_list -- a SkipList of the values that are copied as they are
+        instead of being translated. (default None)
+    """
+    if not Path(input_file_path).exists():
+        raise FileNotFoundError(f"File {input_file_path} does not exist")
+
+    output_langs = split_languages(output_lang)
+    backend = DryRunBackend(output_langs)
+    # Share the translations stored by the dry run between the chunks
+    if cache is not None:
+        cache = ReadOnlyCache(cache)
+    if keys is not None:
+        input_data = get_selected_messages(input_file_path, keys, remove_backslashes)
+        plan_messages(backend, input_data, input_lang, workers, cache, skip_list)
+        return backend
+
+    check_duplicate_keys(input_file_path)
+    # Plan the requests of each chunk like translate_file sends them
+    chunks = iter_payload_chunks(
+        input_file_path, output_langs, workers, remove_backslashes
+    )
+    for _, input_data in chunks:
+        plan_messages(backend, input_data, input_lang, workers, cache, skip_list)
+    return backend
+
+
+def plan_translate_missing_messages(
+    input_file_path,
+    output_lang,
+    output_file_path=None,
+    input_lang=default_lang,
+    remove_backslashes=False,
+    workers=default_workers,
+    cache=None,
+    incremental=False,
+    keys=None,
+    skip_list=None,
+):
+    """Returns a DryRunBackend with the requests that translate_missing_messages
+    would send for the same arguments.
+
+    Keyword arguments:
+    input_file_path -- filepath of the i18n Java properties file to translate
+    output_lang -- language of the output file i.e. de for German
+    output_file_path -- filepath of the output file. Defaults to the
+        input_file with the output language appended to it.
+    input_lang -- the language of the input file. (default en)
+    remove_backslashes -- when true, backslashes from multiline values are
+        not included in the text that gets translated.
+    workers -- number of requests to send at the same time. (default 1)
+    cache -- a TranslationCache to look up earlier translations in.
+        (default None)
+    incremental -- when true, the messages whose value changed since the
+        manifest next to the output file was written are planned too.
+    keys -- a list of keys and glob patterns of keys to only translate the
+        messages they select. (default None)
+    skip_list -- a SkipList of the values that are copied as they are
+        instead of being translated. (default None)
+    """
+    if not Path(input_file_path).exists():
+        raise FileNotFoundError(f"File {input_file_path} does not exist")
+    if output_file_path is None:
+        output_file_path = get_default_filepath(input_file_path, output_lang)
+    if not Path(output_file_path).exists():
+        raise FileNotFoundError(f"File {output_file_path} does not exist")
+
+    input_document = read_i18n_document(input_file_path)
+    input_data = input_document.to_dict(remove_backslashes)
+    output_data = read_i18n_document(output_file_path).to_dict(remove_backslashes)
+    selected_keys = input_data
+    if keys is not None:
+        selected_keys = input_document.select_keys(keys)
+    manifest = None
+    source_hashes = None
+    if incremental:
+        manifest = read_manifest(get_manifest_filepath(output_file_path))
+        source_hashes = {key: hash_value(value) for key, value in input_data.items()}
+
+    _, _, payload_data = find_pending_messages(
+        input_data, output_data, selected_keys, manifest, source_hashes
+    )
+    backend = DryRunBackend([output_lang])
+    if cache is not None:
+        cache = ReadOnlyCache(cache)
+    plan_messages(backend, payload_data, input_lang, workers, cache, skip_list)
+    return backend
+
+
+def plan_translate_tree(
+    input_dir,
+    output_lang,
+    mode=translate_mode,
+    include=None,
+    exclude=None,
+    input_lang=default_lang,
+    remove_backslashes=False,
+    workers=default_workers,
+    cache=None,
+    skip_list=None,
+):
+    """Returns a DryRunBackend with the requests that translate_tree would
+    send for the same arguments.
+
+    Keyword arguments:
+    input_dir -- the directory to search for base bundles
+    output_lang -- language of the output files i.e. de for German, or a
+        comma separated string or a list of several languages
+    mode -- translate_mode or missing_mode. (default translate_mode)
+    include -- a list of glob patterns of the files to include.
+        (default ["*.properties"])
+    exclude -- a list of glob patterns of the files to skip. (default None)
+    input_lang -- the language of the base bundles. (default en)
+    remove_backslashes -- when true, backslashes from multiline values are
+        not included in the text that gets translated.
+    workers -- number of requests to send at the same time. (default 1)
+    cache -- a TranslationCache to look up earlier translations in.
+        (default None)
+    skip_list -- a SkipList of the values that are copied as they are
+        instead of being translated. (default None)
+    """
+    if mode not in (translate_mode, missing_mode):
+        raise ValueError(f"Cannot plan the requests of mode: {mode}")
+
+    output_langs = split_languages(output_lang)
+    backend = DryRunBackend(output_langs)
+    jobs = []
+    # Only read the files, so the output files are never sorted here
+    for input_file_path in find_base_bundles(input_dir, include, exclude):
+        plans = plan_bundle(
+            input_file_path, output_langs, mode, remove_backslashes, False
+        )
+        jobs.extend((lang, payload_data) for lang, _, payload_data in plans)
+    backend.message_count += sum(len(payload_data) for _, payload_data in jobs)
+    translate_jobs(
+        jobs,
+        input_lang,
+        workers=workers,
+        cache=ReadOnlyCache(cache) if cache is not None else None,
+        backend=backend,
+        skip_list=skip_list,
+    )
+    return backend
+
+
+def estimate_wall_time(
+    request_count,
+    billed_characters,
+    workers=default_workers,
+    characters_per_minute=None,
+    requests_per_minute=None,
+    request_latency=default_request_latency,
+):
+    """Returns an estimate of the number of seconds it takes to send the
+    requests, which is the longest of the time the workers take to send them
+    and the time the quota of the subscription makes them wait.
+
+    Keyword arguments:
+    request_count -- number of requests to send
+    billed_characters -- total number of characters billed for the requests
+    workers -- number of requests sent at the same time. (default 1)
+    characters_per_minute -- the characters per minute the requests are
+        limited to, or None for no limit. (default None)
+    requests_per_minute -- the requests per minute the requests are
+        limited to, or None for no limit. (default None)
+    request_latency -- number of seconds a request is assumed to take.
+        (default 1.0)
+    """
+    seconds = math.ceil(request_count / workers) * request_latency
+    # Like the token buckets of the RateLimiter, each quota allows a full
+    # minute of use at the start, and the rest is spread out at its rate
+    if characters_per_minute is not None:
+        quota_seconds = (billed_characters - characters_per_minute) * 60
+        seconds = max(seconds, quota_seconds / characters_per_minute)
+    if requests_per_minute is not None:
+        quota_seconds = (request_count - requests_per_minute) * 60
+        seconds = max(seconds, quota_seconds / requests_per_minute)
+    return seconds
+
+
+def get_plan(
+    backend,
+    workers=default_workers,
+    characters_per_minute=None,
+    requests_per_minute=None,
+    request_latency=default_request_latency,
+):
+    """Returns a dictionary of the requests a DryRunBackend counted and an
+    estimate of their wall time, which can be saved as JSON.
+
+    Keyword arguments:
+    backend -- the DryRunBackend of the plan
+    The other arguments are the same as the ones of estimate_wall_time.
+    """
+    billed_characters = sum(backend.billed_characters.values())
+    return {
+        "version": plan_format_version,
+        "messages": backend.message_count,
+        "texts": backend.text_count,
+        "requests": backend.request_count,
+        "billed_characters": dict(backend.billed_characters),
+        "total_billed_characters": billed_characters,
+        "estimated_seconds": round(
+            estimate_wall_time(
+                backend.request_count,
+                billed_characters,
+                workers,
+                characters_per_minute,
+                requests_per_minute,
+                request_latency,
+            ),
+            3,
+        ),
+    }
+
+
+def format_plan(plan):
+    """Returns a plan as text.
+
+    Keyword arguments:
+    plan -- the dictionary returned by get_plan
+    """
+    billed_characters = ", ".join(
+        f"{lang} {characters:,}"
+        for lang, characters in plan["billed_characters"].items()
+    )
+    return "\n".join(
+        [
+            f"Dry run: {plan['messages']} messages would be sent as "
+            f"{plan['texts']} texts in {plan['requests']} requests",
+            f"Billed characters: {billed_characters} "
+            f"(total {plan['total_billed_characters']:,})",
+            f"Estimated wall time: {plan['estimated_seconds']:.1f} seconds",
+        ]
+    )
+
+
+def add_dry_run_arguments(parser):
+    """Adds the CLI options for planning a run without sending it to a parser.
+
+    Keyword arguments:
+    parser -- the argparse.ArgumentParser of the CLI script
+    """
+    parser.add_argument(
+        "--dry_run",
+        "--dry-run",
+        "--plan",
+        action="store_true",
+        help=(
+            "do not send any requests or write any files. Instead, report how "
+            "many requests would be sent, how many characters would be billed "
+            "for each language, and how long the run would take."
+        ),
+    )
+    parser.add_argument(
+        "--plan_json",
+        "--plan-json",
+        required=False,
+        type=str,
+        help="filepath of a JSON file to save the report of --dry_run to.",
+    )
+    parser.add_argument(
+        "--character_budget",
+        "--character-budget",
+        required=False,
+        type=int,
+        help=(
+            "with --dry_run, exit with status 1 if more than this many "
+            "characters would be billed in total."
+        ),
+    )
+
+
+def report_plan(plan, plan_json=None, character_budget=None):
+    """Prints a plan, saves it as JSON if asked to, and returns true if it
+    is within the character budget.
+
+    Keyword arguments:
+    plan -- the dictionary returned by get_plan
+    plan_json -- filepath to save the plan to as JSON. (default None)
+    character_budget -- maximum number of characters the plan may bill,
+        or None for no limit. (default None)
+    """
+    print(format_plan(plan))
+    if plan_json is not None:
+        with open(plan_json, "w", encoding="utf-8") as f:
+            json.dump(plan, f, indent=2)
+            f.write("\n")
+    if character_budget is None:
+        return True
+    if plan["total_billed_characters"] > character_budget:
+        print(
+            f"{plan['total_billed_characters']:,} billed characters are over "
+            f"the budget of {character_budget:,}"
+        )
+        return False
+    return True
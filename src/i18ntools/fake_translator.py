@@ -0,0 +1,272 @@
+#!/usr/bin/env python
+"""Runs a local stand-in for the Azure Cognitive Services Translator, so that
+batching, concurrency and retries can be load tested offline.
+
+The server answers the translate method of the Translator API v3 with a
+deterministic pseudo-translation of each text, and enforces the same request
+limits. Its latency, error rate and characters-per-minute quota can be
+adjusted to act like a slow, flaky or throttled subscription.
+
+To send the requests of the other scripts to it, set the environment variable
+TRANSLATOR_API_ENDPOINT to the URL it prints, i.e. http://127.0.0.1:8765 .
+It accepts any subscription key, or none, so no real key is needed.
+"""
+
+import argparse
+import math
+import random
+import re
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+from i18ntools.rate_limit import TokenBucket
+from i18ntools.translate_request import TranslateRequestHandler, default_max_body_size
+
+# Default port the server listens on.
+default_port = 8765
+# Placeholders, format specifiers and HTML tags that are not translated.
+placeholder_pattern = re.compile(r"(\{[^{}]*\}|%[-#+ 0-9.]*[a-zA-Z]|<[^<>]*>)")
+# Vowels are swapped for accented ones so translated text is easy to spot.
+pseudo_letters = str.maketrans("aeiouAEIOU", "àéîöûÀÉÎÖÛ")
+
+
+def pseudo_translate(text, to_lang):
+    """Returns a deterministic pseudo-translation of the text, which is the
+    text with its vowels accented and the language in front of it.
+    Placeholders like {0} and %s and HTML tags are kept as they are.
+
+    Keyword arguments:
+    text -- the text to translate
+    to_lang -- the language to translate the text into
+    """
+    parts = placeholder_pattern.split(text)
+    # The odd parts are the placeholders split out by the pattern
+    translated = "".join(
+        part if index % 2 else part.translate(pseudo_letters)
+        for index, part in enumerate(parts)
+    )
+    return f"[{to_lang}] {translated}"
+
+
+class FakeTranslatorHandler(TranslateRequestHandler):
+    """Answers the requests sent to a FakeTranslatorServer."""
+
+    def do_POST(self):
+        # Any subscription key, or none, is accepted, so no real key is needed
+        translate_request = self.read_translate_request()
+        if translate_request is None:
+            return
+        _, to_langs, texts = translate_request
+        characters = sum(len(text) for text in texts) * len(to_langs)
+        status, retry_after = self.server.admit(characters)
+        if status == 429:
+            self.send_error_json(
+                429,
+                429001,
+                "The server rejected the request because the client has exceeded "
+                "request limits.",
+                {"Retry-After": str(retry_after)},
+            )
+            return
+        if status == 500:
+            self.send_error_json(500, 500000, "An unexpected error occurred.")
+            return
+
+        self.send_translations(
+            [[pseudo_translate(text, lang) for lang in to_langs] for text in texts],
+            to_langs,
+        )
+
+
+class FakeTranslatorServer(ThreadingHTTPServer):
+    """A local stand-in for the Azure Cognitive Services Translator.
+
+    The server can be used as a context manager, in which case it is served
+    from a background thread inside the with block.
+
+    Keyword arguments:
+    host -- the address to listen on. (default 127.0.0.1)
+    port -- the port to listen on, or 0 for any free port. (default 8765)
+    latency -- number of seconds each request takes. (default 0)
+    error_rate -- share of the requests, from 0 to 1, that fail with
+        status code 500. (default 0)
+    characters_per_minute -- quota of characters per minute, counted once
+        per output language, after which requests are throttled with status
+        code 429 and a Retry-After header, or None for no quota.
+        (default None)
+    seed -- seed of the random errors, so that a load test can be repeated.
+        (default None)
+    verbose -- when true, each request is logged. (default False)
+    max_body_size -- maximum number of bytes in the body of a request, above
+        which it is rejected with status code 413. (default 1 MiB)
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=default_port,
+        latency=0.0,
+        error_rate=0.0,
+        characters_per_minute=None,
+        seed=None,
+        verbose=False,
+        max_body_size=default_max_body_size,
+    ):
+        super().__init__((host, port), FakeTranslatorHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.bucket = None
+        if characters_per_minute is not None:
+            self.bucket = TokenBucket(characters_per_minute)
+        self.random = random.Random(seed)
+        self.verbose = verbose
+        self.max_body_size = max_body_size
+        self.lock = threading.Lock()
+        self.thread = None
+        self.request_count = 0
+        self.character_count = 0
+        self.throttled_count = 0
+        self.error_count = 0
+
+    @property
+    def endpoint(self):
+        """The base URL to send requests to."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def admit(self, characters):
+        """Waits for the latency of a request and returns a tuple of the status
+        code to answer it with and the seconds to retry after when throttled.
+
+        Keyword arguments:
+        characters -- the number of characters the request counts against
+            the quota
+        """
+        if self.latency > 0:
+            time.sleep(self.latency)
+        with self.lock:
+            self.request_count += 1
+            failed = self.random.random() < self.error_rate
+        if self.bucket is not None:
+            wait = self.bucket.try_reserve(characters)
+            if wait > 0:
+                with self.lock:
+                    self.throttled_count += 1
+                # Azure asks for a whole number of seconds
+                return 429, math.ceil(wait)
+        with self.lock:
+            if failed:
+                self.error_count += 1
+                return 500, None
+            self.character_count += characters
+        return 200, None
+
+    def start(self):
+        """Serves requests from a background thread."""
+        # Check for shutdown often so tests do not wait for it
+        self.thread = threading.Thread(
+            target=self.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        )
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Stops serving requests and closes the server."""
+        if self.thread is not None:
+            self.shutdown()
+            self.thread.join()
+            self.thread = None
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+def main():
+    """Build a CLI for running a FakeTranslatorServer until it is interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--host",
+        required=False,
+        type=str,
+        default="127.0.0.1",
+        help="address to listen on. Defaults to 127.0.0.1",
+    )
+    parser.add_argument(
+        "-p",
+        "--port",
+        required=False,
+        type=int,
+        default=default_port,
+        help=f"port to listen on. Defaults to {default_port}",
+    )
+    parser.add_argument(
+        "--latency",
+        required=False,
+        type=float,
+        default=0.0,
+        help="number of seconds each request takes. Defaults to 0",
+    )
+    parser.add_argument(
+        "--error_rate",
+        "--error-rate",
+        required=False,
+        type=float,
+        default=0.0,
+        help="share of the requests, from 0 to 1, that fail with status code 500.",
+    )
+    parser.add_argument(
+        "--characters_per_minute",
+        "--characters-per-minute",
+        required=False,
+        type=int,
+        help=(
+            "quota of characters per minute after which requests are throttled "
+            "with status code 429. Defaults to no quota."
+        ),
+    )
+    parser.add_argument(
+        "--seed",
+        required=False,
+        type=int,
+        help="seed of the random errors, so that a load test can be repeated.",
+    )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        action="store_true",
+        help="log each request.",
+    )
+    args = parser.parse_args()
+    server = FakeTranslatorServer(
+        args.host,
+        args.port,
+        args.latency,
+        args.error_rate,
+        args.characters_per_minute,
+        args.seed,
+        args.verbose,
+    )
+    print(f"Fake translator listening on {server.endpoint}")
+    print(f"Set TRANSLATOR_API_ENDPOINT={server.endpoint} to send requests to it")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(
+            f"Answered {server.request_count} requests: "
+            f"{server.character_count} characters translated, "
+            f"{server.throttled_count} throttled, {server.error_count} failed"
+        )
+
+
+if __name__ == "__main__":
+    main()
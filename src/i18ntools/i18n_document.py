@@ -0,0 +1,329 @@
+"""A parsed i18n Java properties file that keeps the comments, empty lines
+and order of its messages, so that it can be read once, passed between the
+translate, sort and translate missing operations, and written back out.
+"""
+
+import os
+import re
+from pathlib import Path
+
+from i18ntools.key_selection import KeyIndex
+from i18ntools.parse_i18n_file import (
+    merge_multiline_string,
+    raise_for_duplicate_keys,
+    tokenize_i18n_lines,
+)
+
+# Size of the buffer used when reading i18n Java properties files.
+read_buffer_size = 1 << 16
+# Language code at the end of the name of a translation, i.e. _de, _en_GB,
+# _pt-pt or _zh-Hans in messages_zh-Hans.properties.
+language_suffix_pattern = re.compile(
+    r"_[a-z]{2,3}(?:[-_][A-Z][a-z]{3})?(?:_[A-Z]{2}|_[0-9]{3}|-[A-Za-z]{2})?$"
+)
+
+
+def get_default_filepath(input_file_path, output_lang):
+    """Returns the filepath for a new i18n Java properties file
+    based on the filepath of the input file and the output language.
+
+    The filepath returned will be in the same directory as the input file.
+    The filename will be the same as the input file but with the
+    output_lang appended to it. For example, "/dir/messages.properties"
+    would become "/dir/messages_de.properties"
+    and "/dir/messages_zh.properties" would become "/dir/messages_de.properties".
+    Underscores that do not start a language code are kept, so
+    "/dir/error_messages.properties" would become
+    "/dir/error_messages_de.properties".
+
+    Keyword arguments:
+    input_file_path -- filepath of the file to translate
+    output_lang -- language of the output file i.e. de for German
+    """
+    directory, filename = os.path.split(input_file_path)
+    parts = os.path.splitext(filename)
+    # Use regex string replace to remove the language code
+    # from the filename, if there is one.
+    filename_without_extension = language_suffix_pattern.sub("", parts[0])
+    return os.path.join(
+        directory, f"{filename_without_extension}_{output_lang}{parts[1]}"
+    )
+
+
+def has_language_suffix(file_path):
+    """Returns true when the name of a file ends with a language code, like
+    the translations named by get_default_filepath do.
+
+    Keyword arguments:
+    file_path -- filepath of an i18n Java properties file
+    """
+    return language_suffix_pattern.search(Path(file_path).stem) is not None
+
+
+class I18nEntry:
+    """A message in an i18n Java properties file.
+
+    Keyword arguments:
+    key -- the key of the message
+    value -- the raw value of the message. The lines of a multiline value
+        are joined with newlines and keep their backslashes.
+    start_line -- the line number the message starts on, or None if the
+        message was not read from a file
+    end_line -- the line number the message ends on, or None if the
+        message was not read from a file
+    comments -- a list of the comment and empty lines before the message
+    raw_lines -- a list of the lines the message was read from, or None if
+        the message was not read from a file or its value was changed
+    """
+
+    __slots__ = ("key", "value", "start_line", "end_line", "comments", "raw_lines")
+
+    def __init__(
+        self,
+        key,
+        value,
+        start_line=None,
+        end_line=None,
+        comments=None,
+        raw_lines=None,
+    ):
+        self.key = key
+        self.value = value
+        self.start_line = start_line
+        self.end_line = end_line
+        self.comments = comments if comments is not None else []
+        self.raw_lines = raw_lines
+
+    def copy(self):
+        """Returns a copy of the message that can be changed without changing
+        this one."""
+        return I18nEntry(
+            self.key,
+            self.value,
+            self.start_line,
+            self.end_line,
+            self.comments,
+            self.raw_lines,
+        )
+
+    def lines(self):
+        """Returns the lines of the message, without its comments."""
+        if self.raw_lines is not None:
+            return self.raw_lines
+        return [f"{self.key}={self.value}\n"]
+
+    def __repr__(self):
+        return f"I18nEntry({self.key!r}, {self.value!r})"
+
+
+class I18nDocument:
+    """The messages of an i18n Java properties file, in the order they
+    appear in the file.
+
+    Keyword arguments:
+    entries -- a list of the I18nEntry messages of the document
+    trailing_lines -- a list of the comment and empty lines after the
+        last message
+    file_path -- filepath the document was read from, if any
+    """
+
+    __slots__ = ("entries", "trailing_lines", "file_path", "_index", "_key_index")
+
+    def __init__(self, entries=None, trailing_lines=None, file_path=None):
+        self.entries = entries if entries is not None else []
+        self.trailing_lines = trailing_lines if trailing_lines is not None else []
+        self.file_path = file_path
+        # When a key is duplicated, the index has the last message with it,
+        # which is the one a Java application would use
+        self._index = {entry.key: entry for entry in self.entries}
+        # The KeyIndex for select_keys, built the first time it is needed
+        self._key_index = None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def get(self, key):
+        """Returns the I18nEntry with the key, or None if there is none."""
+        return self._index.get(key)
+
+    def keys(self):
+        """Returns a list of the keys in the order they appear."""
+        return [entry.key for entry in self.entries]
+
+    def duplicate_keys(self):
+        """Returns a set of the keys that appear more than once."""
+        return {
+            entry.key for entry in self.entries if self._index[entry.key] is not entry
+        }
+
+    def select_keys(self, patterns):
+        """Returns a list of the keys that match any of the key patterns,
+        in the order they appear, like KeyIndex.select does.
+
+        Keyword arguments:
+        patterns -- a list of keys and glob patterns of keys
+        """
+        if self._key_index is None:
+            self._key_index = KeyIndex(self.keys())
+        return self._key_index.select(patterns)
+
+    def to_dict(self, remove_backslashes=False):
+        """Returns the data of the document as a dictionary,
+        like parse_i18n_file does.
+
+        Keyword arguments:
+        remove_backslashes -- when true, the data returned will not have the
+            backslashes used in multiline values.
+            Multiline values will be transformed into single line values.
+        """
+        raise_for_duplicate_keys(self.file_path, self.duplicate_keys())
+        if remove_backslashes:
+            return {
+                entry.key: merge_multiline_string(entry.value) for entry in self.entries
+            }
+        return {entry.key: entry.value for entry in self.entries}
+
+    def set_value(self, key, value):
+        """Replaces the value of the message with the key, keeping its place
+        in the document, or adds a new message at the end if there is none.
+
+        Keyword arguments:
+        key -- the key of the message
+        value -- the new raw value of the message
+        """
+        entry = self._index.get(key)
+        if entry is None:
+            self.append(I18nEntry(key, value))
+            return
+        entry.value = value
+        entry.raw_lines = None
+
+    def append(self, entry):
+        """Adds an I18nEntry at the end of the document."""
+        self.entries.append(entry)
+        self._index[entry.key] = entry
+        self._key_index = None
+
+    def copy(self):
+        """Returns a copy of the document whose messages can be changed
+        without changing this one."""
+        return I18nDocument(
+            [entry.copy() for entry in self.entries],
+            list(self.trailing_lines),
+            self.file_path,
+        )
+
+    def with_values(self, values):
+        """Returns a new document with the same comments and order as this
+        one and the values replaced by the ones in values.
+
+        Keyword arguments:
+        values -- a list of the new values, in the order of the messages
+        """
+        entries = [
+            I18nEntry(
+                entry.key,
+                value,
+                entry.start_line,
+                entry.end_line,
+                entry.comments,
+            )
+            for entry, value in zip(self.entries, values, strict=True)
+        ]
+        return I18nDocument(entries, self.trailing_lines)
+
+    def lines(self):
+        """Returns the lines of the document, with comments and empty lines."""
+        lines = []
+        for entry in self.entries:
+            lines.extend(entry.comments)
+            lines.extend(entry.lines())
+        lines.extend(self.trailing_lines)
+        return lines
+
+
+def iter_i18n_entries(file_path):
+    """Reads an i18n Java properties file lazily and yields an I18nEntry for
+    each message in the order they appear, so that only one message at a time
+    has to be kept in memory.
+
+    If the file ends with comments or empty lines, then the last I18nEntry
+    yielded has a key and value of None and those lines as its comments.
+    Every line yielded ends with a newline.
+
+    Keyword arguments:
+    file_path -- filepath of the i18n Java properties file to read
+    """
+    if not Path(file_path).exists():
+        raise FileNotFoundError(f"File {file_path} does not exist")
+
+    comments = []
+    line_number = 1
+    with open(file_path, "r", encoding="utf-8", buffering=read_buffer_size) as f:
+        for key, value, raw_lines in tokenize_i18n_lines(f):
+            # Make sure a last line without a newline does not run into
+            # a line written after it
+            raw_lines = [
+                line if line.endswith("\n") else line + "\n" for line in raw_lines
+            ]
+            if key is None:
+                comments.extend(raw_lines)
+            else:
+                end_line = line_number + len(raw_lines) - 1
+                yield I18nEntry(key, value, line_number, end_line, comments, raw_lines)
+                comments = []
+            line_number += len(raw_lines)
+
+    if len(comments) > 0:
+        yield I18nEntry(None, None, comments=comments)
+
+
+def read_i18n_document(file_path, cache=None):
+    """Reads an i18n Java properties file in a single pass and
+    returns it as an I18nDocument.
+
+    Keyword arguments:
+    file_path -- filepath of the i18n Java properties file to read
+    cache -- a DocumentCache to reuse the document of the file from, as long
+        as the file has not changed since it was read, or None to always
+        parse the file. (default None)
+    """
+    if cache is not None and Path(file_path).exists():
+        document = cache.get(file_path)
+        if document is not None:
+            document.file_path = file_path
+            return document
+
+    entries = []
+    trailing_lines = []
+    for entry in iter_i18n_entries(file_path):
+        if entry.key is None:
+            trailing_lines = entry.comments
+        else:
+            entries.append(entry)
+
+    document = I18nDocument(entries, trailing_lines, file_path)
+    if cache is not None:
+        cache.put(file_path, document)
+    return document
+
+
+def write_i18n_document(document, file_path, cache=None):
+    """Writes an I18nDocument to an i18n Java properties file.
+
+    Keyword arguments:
+    document -- the I18nDocument to write
+    file_path -- filepath of the i18n Java properties file to write
+    cache -- a DocumentCache to drop the old document of the file from.
+        (default None)
+    """
+    if cache is not None:
+        cache.discard(file_path)
+    with open(file_path, "w", encoding="utf-8") as f:
+        f.writelines(document.lines())
@@ -0,0 +1,134 @@
+"""An append-only journal of the translations a long running job received,
+so that a job that failed partway through can be resumed without sending
+the messages that were already translated again.
+
+The journal is a file of JSON lines next to the output file. The first line
+describes the job, and every line after it holds the translations of one
+chunk of messages, keyed on the message key with the source text they were
+translated from. A line that was cut off when the job was killed is ignored.
+"""
+
+import json
+from pathlib import Path
+
+# Suffix added to the output filepath to get the filepath of its journal.
+journal_suffix = ".journal"
+# Version of the format of the journal.
+journal_format_version = 1
+
+
+def get_journal_filepath(output_file_path):
+    """Returns the filepath of the journal of a job that writes output_file_path.
+    For example, "/dir/messages_de.properties" would become
+    "/dir/messages_de.properties.journal".
+
+    Keyword arguments:
+    output_file_path -- filepath of the output file of the job
+    """
+    return f"{output_file_path}{journal_suffix}"
+
+
+class JobJournal:
+    """The journal of a translation job.
+
+    Keyword arguments:
+    file_path -- filepath of the journal
+    input_lang -- the language the messages are translated from
+    output_langs -- a list of the languages the messages are translated into
+    resume -- when true, the translations of an existing journal of the same
+        job are loaded so they can be reused. Otherwise any existing journal
+        is replaced. (default False)
+    """
+
+    def __init__(self, file_path, input_lang, output_langs, resume=False):
+        self.file_path = file_path
+        self.header = {
+            "version": journal_format_version,
+            "input_lang": input_lang,
+            "output_langs": list(output_langs),
+        }
+        self.translations = {}
+        self.ends_with_newline = True
+        if resume:
+            self._load()
+        if len(self.translations) > 0:
+            print(
+                f"Resuming from {len(self.translations)} translated messages "
+                f"in {file_path}"
+            )
+            self.file = open(file_path, "a", encoding="utf-8")
+            if not self.ends_with_newline:
+                # Start after the line that was cut off
+                self.file.write("\n")
+        else:
+            self.file = open(file_path, "w", encoding="utf-8")
+            self._write_line(self.header)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _load(self):
+        if not Path(self.file_path).exists():
+            return
+        with open(self.file_path, "r", encoding="utf-8") as f:
+            lines = iter(f)
+            try:
+                header = json.loads(next(lines))
+            except (StopIteration, ValueError):
+                return
+            if header != self.header:
+                print(f"Ignoring {self.file_path} since it is for a different job")
+                return
+            for line in lines:
+                self.ends_with_newline = line.endswith("\n")
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # The job was killed while this line was being written
+                    continue
+                for key, (source, translations) in record.items():
+                    self.translations[key] = (source, translations)
+
+    def _write_line(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        # Flush every line so it is kept even if the job is killed
+        self.file.flush()
+
+    def lookup(self, key, source):
+        """Returns the list of journaled translations of the message into
+        each output language, or None if it was not translated from source.
+
+        Keyword arguments:
+        key -- the key of the message
+        source -- the text the message is translated from
+        """
+        journaled = self.translations.get(key)
+        if journaled is None or journaled[0] != source:
+            return None
+        return journaled[1]
+
+    def record(self, translations):
+        """Appends the translations of a chunk of messages to the journal.
+
+        Keyword arguments:
+        translations -- a dictionary of each key and a tuple of its source
+            text and the list of its translations into each output language
+        """
+        if len(translations) == 0:
+            return
+        # Only the translations loaded to resume from are kept in memory,
+        # since a job never looks up a message it translated itself
+        self._write_line({key: list(value) for key, value in translations.items()})
+
+    def close(self):
+        """Closes the journal, keeping it so the job can be resumed."""
+        if not self.file.closed:
+            self.file.close()
+
+    def remove(self):
+        """Closes and deletes the journal once the job is complete."""
+        self.close()
+        Path(self.file_path).unlink(missing_ok=True)
@@ -0,0 +1,159 @@
+"""Plans the requests to the Azure Cognitive Services Translator for many
+files at once.
+
+Bundles often only have a handful of messages to translate, so sending one
+request per file spends most of the time on round trips. The planner collects
+the pending messages of every file that is translated into the same language,
+packs them into as few full-size requests as the API limits allow, and routes
+each translation back to the file and key it belongs to.
+"""
+
+from i18ntools.backends import AzureTranslatorBackend
+from i18ntools.translate import (
+    default_lang,
+    default_max_characters,
+    default_max_elements,
+    default_region,
+    default_workers,
+    make_api_call,
+)
+
+
+def group_jobs_by_language(jobs):
+    """Returns a dictionary of each output language and the list of
+    the indexes of the jobs that translate into it, in the order of jobs.
+
+    Keyword arguments:
+    jobs -- a list of (output_lang, payload_data) tuples, where payload_data
+        is a dictionary of the keys and values of a file to translate
+    """
+    groups = {}
+    for job_index, (output_lang, _) in enumerate(jobs):
+        groups.setdefault(output_lang, []).append(job_index)
+    return groups
+
+
+def group_languages_by_payload(jobs, groups):
+    """Returns a list of (output_langs, job_indexes_by_lang) tuples, where the
+    languages whose jobs have the same messages in the same order, like the
+    files of translate_tree's translate mode, are in the same tuple.
+
+    Keyword arguments:
+    jobs -- a list of (output_lang, payload_data) tuples
+    groups -- the dictionary returned by group_jobs_by_language
+    """
+    language_groups = []
+    # Only compare the payloads of languages with as many messages per job
+    candidates = {}
+    for output_lang, job_indexes in groups.items():
+        payloads = [jobs[job_index][1] for job_index in job_indexes]
+        sizes = tuple(len(payload_data) for payload_data in payloads)
+        for other_payloads, language_group in candidates.get(sizes, []):
+            if other_payloads == payloads:
+                language_group[0].append(output_lang)
+                language_group[1].append(job_indexes)
+                break
+        else:
+            language_group = ([output_lang], [job_indexes])
+            language_groups.append(language_group)
+            candidates.setdefault(sizes, []).append((payloads, language_group))
+    return language_groups
+
+
+def translate_jobs(
+    jobs,
+    input_lang=default_lang,
+    translator_region=default_region,
+    max_elements=default_max_elements,
+    max_characters=default_max_characters,
+    workers=default_workers,
+    session=None,
+    cache=None,
+    rate_limiter=None,
+    backend=None,
+    skip_list=None,
+):
+    """Translates the messages of many files and returns a list with
+    a dictionary of the keys and their translated values for each job.
+
+    The messages of all the jobs with the same output language are sent
+    together, packed into as few requests as possible. Values that are the
+    same in several files are only sent once, and languages whose jobs have
+    the same messages are translated in the same requests.
+
+    Keyword arguments:
+    jobs -- a list of (output_lang, payload_data) tuples, where payload_data
+        is a dictionary of the keys and values of a file to translate
+    input_lang -- the language of the input files i.e. en for English.
+        (default en)
+    translator_region -- the region of the Azure translator resource.
+        (default eastus2)
+    max_elements -- maximum number of values sent in one request.
+        (default 1000)
+    max_characters -- maximum number of characters sent in one request.
+        (default 50000)
+    workers -- number of requests to send at the same time. (default 1)
+    session -- a requests.Session to send the requests with. If this is left
+        as None, then a new session is created and closed for this call.
+    cache -- a TranslationCache to look up values in before sending them,
+        and to save the new translations in. (default None)
+    rate_limiter -- a RateLimiter that keeps the requests of all the jobs
+        within the quota of the subscription.
+        (default RateLimiter() without a quota)
+    backend -- the TranslatorBackend that translates the messages. If this
+        is left as None, then an AzureTranslatorBackend is created for this
+        call with translator_region, session and rate_limiter.
+    skip_list -- a SkipList of the values that are not translated, and are
+        returned as their own translation instead. (default None)
+    """
+    translations = [{} for _ in jobs]
+    groups = group_jobs_by_language(jobs)
+
+    owns_backend = backend is None
+    if owns_backend:
+        backend = AzureTranslatorBackend(
+            translator_region,
+            session=session,
+            workers=workers,
+            rate_limiter=rate_limiter,
+        )
+    try:
+        for output_langs, job_indexes_by_lang in group_languages_by_payload(
+            jobs, groups
+        ):
+            # Key each message on the place of its job as well, since files
+            # share keys, and the place is the same for every language
+            payload_data = {
+                (place, key): value
+                for place, job_index in enumerate(job_indexes_by_lang[0])
+                for key, value in jobs[job_index][1].items()
+            }
+            if len(payload_data) == 0:
+                continue
+            print(
+                f"Packing the messages of {len(job_indexes_by_lang[0])} files "
+                f"to translate into {', '.join(output_langs)}"
+            )
+            response_object = make_api_call(
+                payload_data,
+                output_langs,
+                input_lang,
+                translator_region,
+                max_elements,
+                max_characters,
+                workers,
+                cache=cache,
+                pack=True,
+                backend=backend,
+                skip_list=skip_list,
+            )
+            for (place, key), result in zip(payload_data, response_object):
+                # Split the translations of each language out to its own job
+                for job_indexes, translation in zip(
+                    job_indexes_by_lang, result["translations"]
+                ):
+                    translations[job_indexes[place]][key] = translation["text"]
+    finally:
+        if owns_backend:
+            backend.close()
+    return translations
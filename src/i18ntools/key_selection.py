@@ -0,0 +1,145 @@
+"""Selects the messages of an i18n Java properties file by their keys, so that
+a part of a file, i.e. the messages of one feature, can be translated on its
+own.
+
+A key pattern is either a key, which selects that key and every key below it,
+i.e. handshake.register selects handshake.register.disabledException.error ,
+or a glob pattern with *, ? or [...], i.e. instructorService.*.success .
+
+The keys are kept in a KeyIndex sorted by key, so the keys with the prefix of
+a pattern are found by bisection, and only those are compared with it.
+Selecting a few messages costs time in proportion to how many are selected,
+not to the size of the file.
+"""
+
+from bisect import bisect_left
+from fnmatch import fnmatchcase
+
+# Characters that make a key pattern a glob pattern.
+wildcard_characters = "*?["
+# Character between the parts of a key, i.e. handshake.register.error .
+key_separator = "."
+
+
+def get_literal_prefix(pattern):
+    """Returns the part of a key pattern before its first wildcard character.
+
+    Keyword arguments:
+    pattern -- the key pattern
+    """
+    for index, character in enumerate(pattern):
+        if character in wildcard_characters:
+            return pattern[:index]
+    return pattern
+
+
+class KeyIndex:
+    """An index of the keys of a document for selecting them by key pattern.
+
+    Keyword arguments:
+    keys -- a list of the keys in the order they appear in the document
+    """
+
+    __slots__ = ("sorted_keys", "positions")
+
+    def __init__(self, keys):
+        self.positions = {}
+        for position, key in enumerate(keys):
+            self.positions.setdefault(key, position)
+        self.sorted_keys = sorted(self.positions)
+
+    def with_prefix(self, prefix):
+        """Returns a sorted list of the keys that start with prefix.
+
+        Keyword arguments:
+        prefix -- the start of the keys
+        """
+        start = bisect_left(self.sorted_keys, prefix)
+        end = start
+        while end < len(self.sorted_keys) and self.sorted_keys[end].startswith(prefix):
+            end += 1
+        return self.sorted_keys[start:end]
+
+    def select(self, patterns):
+        """Returns a list of the keys that match any of the key patterns,
+        in the order they appear in the document.
+
+        Keyword arguments:
+        patterns -- a list of key patterns
+        """
+        selected_keys = set()
+        for pattern in patterns:
+            prefix = get_literal_prefix(pattern)
+            candidates = self.with_prefix(prefix)
+            if prefix == pattern:
+                # A key selects itself and the keys below it
+                selected_keys.update(
+                    key
+                    for key in candidates
+                    if key == pattern or key.startswith(pattern + key_separator)
+                )
+            else:
+                selected_keys.update(
+                    key for key in candidates if fnmatchcase(key, pattern)
+                )
+        return sorted(selected_keys, key=self.positions.__getitem__)
+
+
+def read_key_patterns(file_path):
+    """Returns a list of the key patterns in a file, one per line.
+    Empty lines and lines that start with # are skipped.
+
+    Keyword arguments:
+    file_path -- filepath of the file with the key patterns
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        lines = [line.strip() for line in f]
+    return [line for line in lines if line and not line.startswith("#")]
+
+
+def add_key_selection_arguments(parser):
+    """Adds the CLI options for selecting the messages to translate to a parser.
+
+    Keyword arguments:
+    parser -- the argparse.ArgumentParser of the CLI script
+    """
+    parser.add_argument(
+        "-k",
+        "--keys",
+        required=False,
+        type=str,
+        nargs="+",
+        help=(
+            "only translate the messages with these keys. A key also selects the "
+            "keys below it, i.e. handshake.register selects "
+            "handshake.register.disabledException.error , and glob patterns like "
+            "instructorService.*.success are allowed. The selected messages are "
+            "replaced in, or added to, the existing output file, and its other "
+            "lines are left as they are."
+        ),
+    )
+    parser.add_argument(
+        "--keys_from",
+        "--keys-from",
+        required=False,
+        type=str,
+        help=(
+            "filepath of a file with a key or glob pattern on each line, "
+            "to select the messages like --keys does."
+        ),
+    )
+
+
+def key_patterns_from_args(args):
+    """Returns a list of the key patterns of the options added by
+    add_key_selection_arguments, or None if no messages were selected.
+
+    Keyword arguments:
+    args -- the parsed arguments of the CLI script
+    """
+    if args.keys is None and args.keys_from is None:
+        return None
+    patterns = list(args.keys or [])
+    if args.keys_from is not None:
+        patterns.extend(read_key_patterns(args.keys_from))
+    return patterns
@@ -0,0 +1,284 @@
+"""Records where the time of a run goes, so a slow run can be told apart
+as slow to parse, slow on the network, throttled or slow to write.
+
+Metrics are only recorded while a RunMetrics is active, i.e. inside a
+collect_metrics block. Otherwise every recording function returns right away,
+so the instrumentation costs next to nothing when it is turned off.
+"""
+
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# Version of the format of the metrics JSON files.
+metrics_format_version = 1
+# Latency percentiles included in the metrics.
+latency_percentiles = (50, 90, 99)
+
+# The RunMetrics being recorded to, or None when metrics are turned off.
+active_metrics = None
+
+
+def percentile(sorted_values, percent):
+    """Returns the nearest-rank percentile of a sorted list of numbers,
+    or None if the list is empty.
+
+    Keyword arguments:
+    sorted_values -- a sorted list of numbers
+    percent -- the percentile to return, from 0 to 100
+    """
+    if len(sorted_values) == 0:
+        return None
+    rank = max(math.ceil(percent / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+class RunMetrics:
+    """The metrics of one run.
+
+    Keyword arguments:
+    hook -- a function called with the name of each event and a dictionary of
+        its fields as it is recorded, i.e. to send the metrics to a stats sink
+        or to start and stop a profiler. The events are "phase", "request",
+        "retry" and "cache". (default None)
+    """
+
+    def __init__(self, hook=None):
+        self.hook = hook
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.latencies = []
+        self.status_codes = {}
+        self.characters_sent = 0
+        self.retry_count = 0
+        self.throttled_count = 0
+        self.throttle_seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def _emit(self, event, fields):
+        if self.hook is not None:
+            self.hook(event, fields)
+
+    def add_phase_time(self, name, seconds):
+        """Adds seconds to the time spent in a phase of the run.
+
+        Keyword arguments:
+        name -- the name of the phase, i.e. "parse"
+        seconds -- the number of seconds spent in it
+        """
+        with self.lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+        self._emit("phase", {"name": name, "seconds": seconds})
+
+    def add_request(self, latency, characters, status_code):
+        """Records a request sent to the translator.
+
+        Keyword arguments:
+        latency -- the number of seconds the request took
+        characters -- the number of characters the request counted against
+            the quota
+        status_code -- the status code of the response, or None if the
+            request failed without one
+        """
+        with self.lock:
+            self.latencies.append(latency)
+            self.characters_sent += characters
+            self.status_codes[status_code] = self.status_codes.get(status_code, 0) + 1
+        self._emit(
+            "request",
+            {"latency": latency, "characters": characters, "status_code": status_code},
+        )
+
+    def add_retry(self, delay, throttled):
+        """Records a request that is sent again.
+
+        Keyword arguments:
+        delay -- the number of seconds waited before it is sent again
+        throttled -- true if the request was throttled with status code 429
+        """
+        with self.lock:
+            self.retry_count += 1
+            if throttled:
+                self.throttled_count += 1
+        self._emit("retry", {"delay": delay, "throttled": throttled})
+
+    def add_throttle_wait(self, seconds):
+        """Records time spent waiting to stay within the quota.
+
+        Keyword arguments:
+        seconds -- the number of seconds waited
+        """
+        with self.lock:
+            self.throttle_seconds += seconds
+
+    def add_cache_lookups(self, hits, misses):
+        """Records lookups in the translation cache.
+
+        Keyword arguments:
+        hits -- the number of texts found in the cache
+        misses -- the number of texts not found in the cache
+        """
+        with self.lock:
+            self.cache_hits += hits
+            self.cache_misses += misses
+        self._emit("cache", {"hits": hits, "misses": misses})
+
+    def to_dict(self):
+        """Returns the metrics as a dictionary that can be saved as JSON."""
+        with self.lock:
+            latencies = sorted(self.latencies)
+            lookups = self.cache_hits + self.cache_misses
+            return {
+                "version": metrics_format_version,
+                "total_seconds": time.perf_counter() - self.started,
+                "phases": dict(self.phases),
+                "requests": {
+                    "count": len(latencies),
+                    "status_codes": {
+                        str(status_code): count
+                        for status_code, count in self.status_codes.items()
+                    },
+                    "characters_sent": self.characters_sent,
+                    "latency_seconds": {
+                        "total": sum(latencies),
+                        "max": latencies[-1] if latencies else None,
+                        **{
+                            f"p{percent}": percentile(latencies, percent)
+                            for percent in latency_percentiles
+                        },
+                    },
+                },
+                "retries": {
+                    "count": self.retry_count,
+                    "throttled": self.throttled_count,
+                    "throttle_wait_seconds": self.throttle_seconds,
+                },
+                "cache": {
+                    "hits": self.cache_hits,
+                    "misses": self.cache_misses,
+                    "hit_rate": self.cache_hits / lookups if lookups else None,
+                },
+            }
+
+    def write_json(self, file_path):
+        """Saves the metrics to a JSON file.
+
+        Keyword arguments:
+        file_path -- filepath of the JSON file
+        """
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+@contextmanager
+def collect_metrics(hook=None):
+    """Records the metrics of everything run inside the with block and
+    yields the RunMetrics they are recorded to.
+
+    Keyword arguments:
+    hook -- a function called with each event as it is recorded.
+        (default None)
+    """
+    global active_metrics
+    previous_metrics = active_metrics
+    metrics = RunMetrics(hook)
+    active_metrics = metrics
+    try:
+        yield metrics
+    finally:
+        active_metrics = previous_metrics
+
+
+@contextmanager
+def _timed_phase(metrics, name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add_phase_time(name, time.perf_counter() - start)
+
+
+def phase(name):
+    """Returns a context manager that adds the time spent in its with block
+    to a phase of the run.
+
+    Keyword arguments:
+    name -- the name of the phase, i.e. "parse"
+    """
+    if active_metrics is None:
+        return nullcontext()
+    return _timed_phase(active_metrics, name)
+
+
+def record_request(latency, characters, status_code):
+    """Records a request sent to the translator if metrics are turned on.
+    See RunMetrics.add_request.
+    """
+    if active_metrics is not None:
+        active_metrics.add_request(latency, characters, status_code)
+
+
+def record_retry(delay, throttled):
+    """Records a request that is sent again if metrics are turned on.
+    See RunMetrics.add_retry.
+    """
+    if active_metrics is not None:
+        active_metrics.add_retry(delay, throttled)
+
+
+def record_throttle_wait(seconds):
+    """Records time spent waiting for the quota if metrics are turned on.
+    See RunMetrics.add_throttle_wait.
+    """
+    if active_metrics is not None:
+        active_metrics.add_throttle_wait(seconds)
+
+
+def record_cache_lookups(hits, misses):
+    """Records lookups in the translation cache if metrics are turned on.
+    See RunMetrics.add_cache_lookups.
+    """
+    if active_metrics is not None:
+        active_metrics.add_cache_lookups(hits, misses)
+
+
+def add_metrics_arguments(parser):
+    """Adds the CLI option for saving the metrics of a run to a parser.
+
+    Keyword arguments:
+    parser -- the argparse.ArgumentParser of the CLI script
+    """
+    parser.add_argument(
+        "--metrics_json",
+        "--metrics-json",
+        required=False,
+        type=str,
+        help=(
+            "filepath to save the metrics of the run to as JSON, with the time "
+            "spent in each phase, the number, latency and characters of the "
+            "requests, the retries and the cache hit rate."
+        ),
+    )
+
+
+@contextmanager
+def metrics_from_args(args):
+    """Records the metrics of the with block if the --metrics_json option
+    was given, and saves them when the block exits, even if it failed.
+
+    Keyword arguments:
+    args -- the parsed arguments of the CLI script
+    """
+    if args.metrics_json is None:
+        yield None
+        return
+    with collect_metrics() as metrics:
+        try:
+            yield metrics
+        finally:
+            metrics.write_json(args.metrics_json)
+            print("Metrics saved to:", args.metrics_json)
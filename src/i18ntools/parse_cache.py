@@ -0,0 +1,231 @@
+"""Caches of parsed i18n Java properties files, so that a file that is
+parsed many times, i.e. once per output language, is only tokenized once.
+
+DocumentCache keeps the I18nDocuments that read_i18n_document is asked to
+cache in memory, i.e. by i18ntools watch --cache_documents. ParseCache
+keeps the dictionaries of parse_i18n_file, and can also save them on disk.
+
+A cached result is used as long as the file has the same modification time
+and size as when it was parsed. When those changed, the content hash of the
+file is compared, so a file that was touched but not edited is not parsed
+again. Files are cached in an in-process LRU cache and, optionally, in a
+directory on disk that is shared between runs.
+"""
+
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from i18ntools.parse_i18n_file import parse_i18n_lines, raise_for_duplicate_keys
+
+# Default maximum number of parsed files kept in memory.
+default_max_entries = 128
+# Version of the format of the files in the on-disk cache.
+disk_format_version = 1
+# Number of seconds a file must be left unchanged before DocumentCache keeps
+# it, since a second write in the same tick of the file system clock would
+# not change its modification time or, if the size stays the same, its size.
+racy_seconds = 2
+
+
+def get_file_stamp(file_path):
+    """Returns the modification time and size of a file, or None if it was
+    modified too recently for them to tell a later change apart.
+
+    Keyword arguments:
+    file_path -- filepath of the file
+    """
+    stat = os.stat(file_path)
+    if time.time_ns() - stat.st_mtime_ns < racy_seconds * 1_000_000_000:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class DocumentCache:
+    """An LRU cache of the I18nDocument of each file, which is used as long as
+    the file has the same modification time and size as when it was read.
+
+    Keyword arguments:
+    max_entries -- maximum number of documents kept in memory. (default 128)
+    """
+
+    def __init__(self, max_entries=default_max_entries):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, file_path):
+        """Returns a copy of the cached document of a file, or None if it is
+        not cached or the file changed since it was read.
+
+        Keyword arguments:
+        file_path -- filepath of the i18n Java properties file
+        """
+        cache_key = os.path.abspath(file_path)
+        stamp = get_file_stamp(file_path)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is None or stamp is None or entry[0] != stamp:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(cache_key)
+        # Return a copy so the caller can change it without changing the cache
+        return entry[1].copy()
+
+    def put(self, file_path, document):
+        """Caches the document read from a file, unless the file was changed
+        too recently to tell whether it changes again.
+
+        Keyword arguments:
+        file_path -- filepath the document was read from
+        document -- the I18nDocument of the file
+        """
+        cache_key = os.path.abspath(file_path)
+        stamp = get_file_stamp(file_path)
+        with self._lock:
+            if stamp is None:
+                self._entries.pop(cache_key, None)
+                return
+            self._entries[cache_key] = (stamp, document.copy())
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, file_path):
+        """Removes the document of a file from the cache, i.e. when the file
+        is written.
+
+        Keyword arguments:
+        file_path -- filepath of the i18n Java properties file
+        """
+        with self._lock:
+            self._entries.pop(os.path.abspath(file_path), None)
+
+    def clear(self):
+        """Removes every document from the cache."""
+        with self._lock:
+            self._entries.clear()
+
+
+class ParseCache:
+    """An LRU cache of the data parse_i18n_file returns for each file.
+
+    Keyword arguments:
+    max_entries -- maximum number of parsed files kept in memory.
+        (default 128)
+    cache_dir -- directory to also save the parsed files in, so that they can
+        be reused by later runs. If this is left as None, then parsed files
+        are only kept in memory.
+    """
+
+    def __init__(self, max_entries=default_max_entries, cache_dir=None):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        if cache_dir is not None:
+            Path(cache_dir).mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def parse_i18n_file(self, file_path, remove_backslashes=False):
+        """Returns the data of an i18n Java properties file as a dictionary,
+        like parse_i18n_file does, reusing the cached data if the file
+        did not change since it was last parsed.
+
+        Keyword arguments:
+        file_path -- filepath of the i18n Java properties file to parse
+        remove_backslashes -- when true, the data returned will not have the
+            backslashes used in multiline values.
+        """
+        if not Path(file_path).exists():
+            raise FileNotFoundError(f"File {file_path} does not exist")
+
+        cache_key = (os.path.abspath(file_path), remove_backslashes)
+        stat = os.stat(file_path)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is None:
+                entry = self._read_from_disk(cache_key)
+
+            if entry is None or (entry["mtime_ns"], entry["size"]) != (
+                stat.st_mtime_ns,
+                stat.st_size,
+            ):
+                # The file may have changed, so compare its content hash
+                with open(file_path, "rb") as f:
+                    content = f.read()
+                content_hash = hashlib.sha256(content).hexdigest()
+                if entry is None or entry["hash"] != content_hash:
+                    self.misses += 1
+                    # Split the lines the same way reading a text file does
+                    lines = io.StringIO(content.decode("utf-8"), newline=None)
+                    data, duplicate_keys = parse_i18n_lines(lines, remove_backslashes)
+                    entry = {
+                        "hash": content_hash,
+                        "data": data,
+                        "duplicate_keys": sorted(duplicate_keys),
+                    }
+                else:
+                    self.hits += 1
+                entry["mtime_ns"] = stat.st_mtime_ns
+                entry["size"] = stat.st_size
+                self._write_to_disk(cache_key, entry)
+            else:
+                self.hits += 1
+
+            self._entries[cache_key] = entry
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        raise_for_duplicate_keys(file_path, set(entry["duplicate_keys"]))
+        # Return a copy so the caller can change it without changing the cache
+        return dict(entry["data"])
+
+    def clear(self):
+        """Removes every parsed file from the in-process cache."""
+        with self._lock:
+            self._entries.clear()
+
+    def _disk_path(self, cache_key):
+        path, remove_backslashes = cache_key
+        name = hashlib.sha256(f"{path}\0{remove_backslashes}".encode()).hexdigest()
+        return Path(self.cache_dir) / f"{name}.json"
+
+    def _read_from_disk(self, cache_key):
+        if self.cache_dir is None:
+            return None
+        disk_path = self._disk_path(cache_key)
+        try:
+            with open(disk_path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("version") != disk_format_version:
+            return None
+        # JSON objects keep their order, so the data is in the file's order
+        return entry
+
+    def _write_to_disk(self, cache_key, entry):
+        if self.cache_dir is None:
+            return
+        disk_path = self._disk_path(cache_key)
+        temp_path = disk_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"version": disk_format_version, **entry},
+                f,
+                ensure_ascii=False,
+                separators=(",", ":"),
+            )
+        # Replace the file in one step so other processes never read half of it
+        os.replace(temp_path, disk_path)
@@ -4,92 +4,141 @@
 If called with remove_backslashes=False, then the whitespace in
 multiline values is preserved.
 
-If called with remove_backslashes=True, then configparser is used
-and the whitespace and backslashes in multiline values are removed.
+If called with remove_backslashes=True, then the whitespace and backslashes
+in multiline values are removed.
 
-Note that this method does not work properly for multiline translations
-with an "=" character in them.
+A line that ends with an odd number of backslashes continues on the next line,
+so multiline values may contain "=" characters.
 """
 
 import argparse
-import configparser
-import tempfile
 from pathlib import Path
 
 
-def parse_i18n_file(file_path, remove_backslashes=False):
-    """Parses an i18n Java properties file and returns the data as a dictionary.
-
-    Note that this method does not work properly for multiline translations
-    with an "=" character in them.
+def ends_with_continuation(line):
+    """Returns True if the line ends with a backslash that continues
+    the value on the next line. A backslash that is escaped by another
+    backslash does not continue the value.
 
     Keyword arguments:
-    file_path -- filepath of the i18n Java properties file to parse
-    remove_backslashes -- when true, the data returned will not have the
-        backslashes used in multiline values.
-        Multiline values will be transformed into single line values.
+    line -- a line of an i18n Java properties file without trailing whitespace
     """
-    if not Path(file_path).exists():
-        raise FileNotFoundError(f"File {file_path} does not exist")
+    backslash_count = len(line) - len(line.rstrip("\\"))
+    return backslash_count % 2 == 1
 
-    # Open the input file in read mode to read its contents
-    with open(file_path, "r", encoding="utf-8") as f:
-        file_contents = f.readlines()
 
-    data = {}
-    duplicate_keys = set()
-    most_recent_key = None
-    for line in file_contents:
-        # Skip comments and empty lines
-        if line.startswith("#") or line.strip() == "":
+def tokenize_i18n_lines(lines):
+    """Reads the lines of an i18n Java properties file in a single pass and
+    yields a (key, value, raw_lines) tuple for each message, comment and
+    empty line in the order they appear.
+
+    For a message, value has the lines of a multiline value joined with
+    newlines and without their trailing whitespace, and raw_lines is the list
+    of lines the message spans. For a comment or an empty line, key and value
+    are None and raw_lines holds just that line.
+
+    Keyword arguments:
+    lines -- an iterable of the lines of the file, i.e. an open file
+    """
+    key = None
+    value = None
+    raw_lines = []
+    continued = False
+    for line in lines:
+        stripped_line = line.rstrip()
+        if line.startswith("#") or stripped_line == "":
+            # A comment or an empty line ends a multiline value
+            continued = False
+            if key is not None:
+                yield key, value, raw_lines
+                key = None
+            yield None, None, [line]
             continue
 
-        # Extract the key and value on this line
-        parts = line.strip().split("=", 1)
-        if len(parts) == 1:
-            # This line is part of a multiline value.
-            # Add the additional line to the value in our dictionary,
-            # stripping the trailing whitespace.
-            data[most_recent_key] += "\n" + line.rstrip()
+        parts = stripped_line.strip().split("=", 1)
+        if key is not None and (continued or len(parts) == 1):
+            # This line is part of a multiline value. Lines that follow
+            # a line ending with a backslash are always part of the value,
+            # even if they have an "=" character in them.
+            value += "\n" + stripped_line
+            raw_lines.append(line)
+            continued = ends_with_continuation(stripped_line)
             continue
 
+        if key is not None:
+            yield key, value, raw_lines
         key = parts[0]
-        value = parts[1]
+        value = parts[1] if len(parts) == 2 else ""
+        raw_lines = [line]
+        continued = ends_with_continuation(stripped_line)
+
+    if key is not None:
+        yield key, value, raw_lines
+
+
+def parse_i18n_lines(lines, remove_backslashes=False):
+    """Parses the lines of an i18n Java properties file and returns a tuple
+    of the data as a dictionary and a set of the keys that appear more
+    than once.
+
+    Keyword arguments:
+    lines -- an iterable of the lines of the file, i.e. an open file
+    remove_backslashes -- when true, the data returned will not have the
+        backslashes used in multiline values.
+        Multiline values will be transformed into single line values.
+    """
+    data = {}
+    duplicate_keys = set()
+    for key, value, _ in tokenize_i18n_lines(lines):
+        if key is None:
+            # Skip comments and empty lines
+            continue
         if key in data:
             duplicate_keys.add(key)
+        if remove_backslashes:
+            # Transform multiline values into single line values
+            value = merge_multiline_string(value)
         data[key] = value
-        most_recent_key = key
+    return data, duplicate_keys
 
-    if len(duplicate_keys) > 0:
-        raise SyntaxWarning(
-            f"{file_path} cannot be parsed for translation. "
-            f"It has at least one duplicate key: {duplicate_keys}"
-        )
 
-    if remove_backslashes:
-        # Now that we've ensured the file has no duplicate properties, return
-        # the data as a dictionary with multiline values transformed into
-        # single line values.
-        return parse_i18n_file_without_backslashes(file_path)
+def parse_i18n_file(file_path, remove_backslashes=False, cache=None):
+    """Parses an i18n Java properties file and returns the data as a dictionary.
+
+    Keyword arguments:
+    file_path -- filepath of the i18n Java properties file to parse
+    remove_backslashes -- when true, the data returned will not have the
+        backslashes used in multiline values.
+        Multiline values will be transformed into single line values.
+    cache -- a ParseCache to reuse the data of a file from, as long as
+        the file has not changed since it was parsed. (default None)
+    """
+    if cache is not None:
+        return cache.parse_i18n_file(file_path, remove_backslashes)
 
+    if not Path(file_path).exists():
+        raise FileNotFoundError(f"File {file_path} does not exist")
+
+    # Open the input file in read mode and parse it one line at a time
+    with open(file_path, "r", encoding="utf-8") as f:
+        data, duplicate_keys = parse_i18n_lines(f, remove_backslashes)
+
+    raise_for_duplicate_keys(file_path, duplicate_keys)
     return data
 
 
-def convert_properties_to_ini(input_path, ini_path):
-    """Reads a properties file and writes it as an .ini file with a [DEFAULT] section
-    header to make it compatible with configparser.
+def raise_for_duplicate_keys(file_path, duplicate_keys):
+    """Raises a SyntaxWarning if there are any duplicate keys.
 
     Keyword arguments:
-    input_path -- filepath of the i18n Java properties file to convert
-    ini_path -- filepath of the output .ini file
+    file_path -- filepath of the i18n Java properties file the keys are from
+    duplicate_keys -- a set of the keys that appear more than once in the file
     """
-    with (
-        open(input_path, "r", encoding="utf-8") as infile,
-        open(ini_path, "w", encoding="utf-8") as outfile,
-    ):
-        # Add a dummy section header
-        outfile.write("[DEFAULT]\n")
-        outfile.writelines(infile.readlines())
+    if len(duplicate_keys) > 0:
+        raise SyntaxWarning(
+            f"{file_path} cannot be parsed for translation. "
+            f"It has at least one duplicate key: {duplicate_keys}"
+        )
 
 
 def merge_multiline_string(multiline_string: str) -> str:
@@ -116,33 +165,10 @@ def parse_i18n_file_without_backslashes(file_path):
     Multiline values will be transformed into single line values with the
     backslashes removed.
 
-    Note that this method does not work properly for multiline translations
-    with an "=" character in them.
-
     Keyword arguments:
     file_path -- filepath of the i18n Java properties file to parse
     """
-    # Use a temporary file that is automatically cleaned up
-    with tempfile.NamedTemporaryFile(
-        mode="w", suffix=".ini", encoding="utf-8", delete=True
-    ) as temp_ini:
-        # Convert the properties file into a temporary .ini file
-        convert_properties_to_ini(file_path, temp_ini.name)
-
-        # Parse the temporary .ini file
-        # Use RawConfigParser to avoid any interpolation or automatic conversions
-        config = configparser.RawConfigParser(empty_lines_in_values=False)
-        # Override the optionxform method to prevent lowercase conversion of the keys
-        config.optionxform = str  # type: ignore
-
-        config.read(temp_ini.name, encoding="utf-8")
-
-    data = {}
-    for key, value in config["DEFAULT"].items():
-        merged_string = merge_multiline_string(value)
-        data[key] = merged_string
-
-    return data
+    return parse_i18n_file(file_path, remove_backslashes=True)
 
 
 def main():
@@ -171,8 +197,24 @@ def main():
             "backslashes used in multiline values."
         ),
     )
+    parser.add_argument(
+        "-c",
+        "--cache_dir",
+        required=False,
+        type=str,
+        help=(
+            "directory to cache the parsed file in. The file is only parsed again "
+            "if it changed since it was last parsed with the same cache directory."
+        ),
+    )
     args = parser.parse_args()
-    result = parse_i18n_file(args.input_file, args.remove_backslashes)
+    cache = None
+    if args.cache_dir is not None:
+        # Import here since the cache is only needed when it is asked for
+        from i18ntools.parse_cache import ParseCache
+
+        cache = ParseCache(cache_dir=args.cache_dir)
+    result = parse_i18n_file(args.input_file, args.remove_backslashes, cache)
     for key, value in result.items():
         print("key", key)
         print("value", value)
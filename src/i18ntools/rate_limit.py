@@ -0,0 +1,283 @@
+"""Keeps the requests to the Azure Cognitive Services Translator within the
+quota of a subscription, and retries the requests that were throttled or
+failed for a transient reason.
+
+The Translator API limits how many characters (counted once per output
+language) and how many requests a subscription may send per minute, and
+answers with status code 429 when they are exceeded. A RateLimiter spreads
+the requests out with a token bucket for each of those limits, so that runs
+send as fast as the quota allows, and waits for the time given in the
+Retry-After header, or backs off exponentially with jitter, before sending
+a failed request again.
+"""
+
+import random
+import threading
+import time
+
+from i18ntools.metrics import record_throttle_wait
+
+# Status codes of responses that are worth sending the request again for.
+retry_status_codes = frozenset({429, 500, 502, 503, 504})
+# Default number of times a request is sent again before giving up.
+default_max_retries = 5
+# Default number of seconds to wait before the first retry.
+default_backoff_base = 1.0
+# Default maximum number of seconds to wait before a retry.
+default_backoff_max = 60.0
+
+
+def parse_retry_after(value, now=None):
+    """Returns the number of seconds a Retry-After header asks to wait,
+    or None if there is no header or it cannot be parsed.
+
+    Keyword arguments:
+    value -- the value of the Retry-After header, either a number of seconds
+        or an HTTP date
+    now -- the current time as a UNIX timestamp. (default time.time())
+    """
+    if value is None:
+        return None
+    value = value.strip()
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    # Only import the email package when it is needed since it is slow
+    # to import and most servers send a number of seconds
+    import email.utils
+
+    try:
+        retry_time = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if now is None:
+        now = time.time()
+    return max(retry_time.timestamp() - now, 0.0)
+
+
+class TokenBucket:
+    """A thread-safe token bucket that refills at a steady rate.
+
+    Callers reserve tokens and are told how long to wait before using them,
+    so that a caller asking for more tokens than are left goes into debt
+    instead of starving, and the callers after it wait for that debt too.
+
+    Keyword arguments:
+    rate_per_minute -- number of tokens added to the bucket each minute
+    capacity -- maximum number of tokens the bucket holds, which is how much
+        can be used in a burst. (default rate_per_minute)
+    clock -- function that returns the current time in seconds.
+        (default time.monotonic)
+    """
+
+    def __init__(self, rate_per_minute, capacity=None, clock=time.monotonic):
+        if rate_per_minute <= 0:
+            raise ValueError("rate_per_minute must be greater than 0")
+        self.rate = rate_per_minute / 60
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self.clock = clock
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount):
+        """Takes amount tokens from the bucket and returns the number of
+        seconds to wait before they may be used.
+
+        Keyword arguments:
+        amount -- the number of tokens to take
+        """
+        with self.lock:
+            self._refill()
+            self.tokens -= amount
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def try_reserve(self, amount):
+        """Takes amount tokens from the bucket if it has them and returns 0,
+        or returns the number of seconds until it will have them without
+        taking any.
+
+        Keyword arguments:
+        amount -- the number of tokens to take
+        """
+        with self.lock:
+            self._refill()
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return 0.0
+            return (amount - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """Schedules the requests sent with one Translator subscription.
+
+    A RateLimiter can be shared by the threads that send requests, so that
+    they all stay within the quota of the subscription together.
+
+    Keyword arguments:
+    characters_per_minute -- maximum number of characters to send per minute,
+        counted once per output language, or None for no limit.
+        (default None)
+    requests_per_minute -- maximum number of requests to send per minute,
+        or None for no limit. (default None)
+    max_retries -- number of times a throttled or failed request is sent
+        again before giving up. (default 5)
+    backoff_base -- number of seconds to wait before the first retry when
+        the response has no Retry-After header. The wait doubles with every
+        retry and a random part of it is used. (default 1.0)
+    backoff_max -- maximum number of seconds to wait before a retry.
+        (default 60.0)
+    clock -- function that returns the current time in seconds.
+        (default time.monotonic)
+    sleep -- function that waits for a number of seconds. (default time.sleep)
+    """
+
+    def __init__(
+        self,
+        characters_per_minute=None,
+        requests_per_minute=None,
+        max_retries=default_max_retries,
+        backoff_base=default_backoff_base,
+        backoff_max=default_backoff_max,
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ):
+        if max_retries < 0:
+            raise ValueError("max_retries must be at least 0")
+        self.character_bucket = None
+        if characters_per_minute is not None:
+            self.character_bucket = TokenBucket(characters_per_minute, clock=clock)
+        self.request_bucket = None
+        if requests_per_minute is not None:
+            self.request_bucket = TokenBucket(requests_per_minute, clock=clock)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.clock = clock
+        self.sleep = sleep
+        self.retries = 0
+        self.paused_until = clock()
+        self.lock = threading.Lock()
+
+    def acquire(self, characters):
+        """Waits until a request with the number of characters may be sent.
+
+        Keyword arguments:
+        characters -- the number of characters the request counts against
+            the quota
+        """
+        wait = 0.0
+        if self.character_bucket is not None:
+            wait = max(wait, self.character_bucket.reserve(characters))
+        if self.request_bucket is not None:
+            wait = max(wait, self.request_bucket.reserve(1))
+        self._wait(wait)
+
+    def wait_for_pause(self):
+        """Waits until the pause after a throttled request is over, without
+        reserving anything from the quota. A request that is sent again
+        already reserved its characters when it was acquired.
+        """
+        self._wait(0.0)
+
+    def _wait(self, wait):
+        with self.lock:
+            wait = max(wait, self.paused_until - self.clock())
+        if wait > 0:
+            record_throttle_wait(wait)
+            self.sleep(wait)
+
+    def retry_delay(self, attempt, retry_after=None):
+        """Returns the number of seconds to wait before sending a request
+        again, which is the Retry-After time if there is one and otherwise
+        a random time up to the exponential backoff of the attempt.
+
+        Keyword arguments:
+        attempt -- the number of times the request was already retried
+        retry_after -- the number of seconds the Retry-After header asks to
+            wait, or None if there was none
+        """
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        backoff = min(self.backoff_base * 2**attempt, self.backoff_max)
+        # Spread the retries of the threads out so they do not all
+        # come back at the same moment
+        return random.uniform(backoff / 2, backoff)
+
+    def backoff(self, attempt, retry_after=None, throttled=False):
+        """Waits before a request is sent again and returns how many seconds
+        were waited.
+
+        A throttled request means the whole subscription is over its quota,
+        so every request sent through this RateLimiter waits too.
+
+        Keyword arguments:
+        attempt -- the number of times the request was already retried
+        retry_after -- the number of seconds the Retry-After header asks to
+            wait, or None if there was none
+        throttled -- true if the response had status code 429
+        """
+        delay = self.retry_delay(attempt, retry_after)
+        with self.lock:
+            self.retries += 1
+            if throttled:
+                self.paused_until = max(self.paused_until, self.clock() + delay)
+        if not throttled:
+            self.sleep(delay)
+        # A throttled request waits for the pause when it is acquired again
+        return delay
+
+
+def add_rate_limit_arguments(parser):
+    """Adds the CLI options for the quota of the subscription to a parser.
+
+    Keyword arguments:
+    parser -- the argparse.ArgumentParser of the CLI script
+    """
+    parser.add_argument(
+        "--characters_per_minute",
+        "--characters-per-minute",
+        required=False,
+        type=int,
+        help=(
+            "maximum number of characters to send to the translator per minute, "
+            "counted once per output language. Defaults to no limit."
+        ),
+    )
+    parser.add_argument(
+        "--requests_per_minute",
+        "--requests-per-minute",
+        required=False,
+        type=int,
+        help="maximum number of requests to send per minute. Defaults to no limit.",
+    )
+    parser.add_argument(
+        "--max_retries",
+        "--max-retries",
+        required=False,
+        type=int,
+        default=default_max_retries,
+        help=(
+            "number of times a throttled or failed request is sent again "
+            f"before giving up. Defaults to {default_max_retries}."
+        ),
+    )
+
+
+def rate_limiter_from_args(args):
+    """Returns a RateLimiter for the options added by add_rate_limit_arguments.
+
+    Keyword arguments:
+    args -- the parsed arguments of the CLI script
+    """
+    return RateLimiter(
+        args.characters_per_minute, args.requests_per_minute, args.max_retries
+    )
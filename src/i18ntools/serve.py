@@ -0,0 +1,440 @@
+#!/usr/bin/env python
+"""This script runs a local translation service that the other tools on a
+network send their requests to instead of the Azure Cognitive Services
+Translator, so that they share its open connections to Azure.
+
+The service answers the translate method of the Translator API v3, so the
+translate, translate-missing and watch scripts can send their requests to it
+with --endpoint, i.e. --endpoint http://127.0.0.1:8766 . The requests for the
+same pair of languages that arrive within --window seconds of each other are
+sent to Azure together, packed into as few requests as the API limits allow,
+and a text that several clients ask for at the same time is only sent once.
+
+Requires the API secret key to be set in an environment variable
+named TRANSLATOR_API_SUBSCRIPTION_KEY . The clients do not need it.
+
+The service only accepts the requests that send its shared token as their
+Ocp-Apim-Subscription-Key header, which the clients send when the token is
+set in an environment variable named TRANSLATOR_ENDPOINT_KEY . A token is
+required to listen on any address other than a loopback address, so that
+the service never translates, and bills, the requests of anyone who can
+reach it.
+"""
+
+import argparse
+import hmac
+import ipaddress
+import os
+import threading
+import time
+from concurrent.futures import Future
+from http.server import ThreadingHTTPServer
+
+from i18ntools.backends import AzureTranslatorBackend, endpoint_key_variable
+from i18ntools.rate_limit import add_rate_limit_arguments, rate_limiter_from_args
+from i18ntools.translate import default_region, default_workers, make_api_call
+from i18ntools.translate_request import TranslateRequestHandler, default_max_body_size
+
+# Default port the service listens on.
+default_port = 8766
+# Default number of seconds the requests for a pair of languages are
+# collected for before they are sent to Azure together.
+default_window = 0.05
+# Default number of seconds a client waits for the batch its texts are sent
+# in before its request fails.
+default_result_timeout = 300.0
+
+
+class RequestCoalescer:
+    """Collects the texts that many threads ask to translate into shared
+    calls to make_api_call.
+
+    The first thread that asks for a pair of languages waits for the window
+    and then sends the texts that every thread asked for in the meantime.
+    A text that is already waiting to be sent, or is being translated, for
+    the same pair of languages is not sent again.
+
+    Keyword arguments:
+    backend -- the TranslatorBackend the texts are translated with
+    cache -- a TranslationCache to reuse earlier translations from.
+        (default None)
+    window -- number of seconds to collect texts for before sending them.
+        (default 0.05)
+    workers -- number of requests to send at the same time when the texts
+        do not fit in one request. (default 1)
+    sleep -- function that waits for a number of seconds. (default time.sleep)
+    result_timeout -- number of seconds to wait for the translations of
+        a batch before giving up on them. (default 300)
+    """
+
+    def __init__(
+        self,
+        backend,
+        cache=None,
+        window=default_window,
+        workers=default_workers,
+        sleep=time.sleep,
+        result_timeout=default_result_timeout,
+    ):
+        self.backend = backend
+        self.cache = cache
+        self.window = window
+        self.workers = workers
+        self.sleep = sleep
+        self.result_timeout = result_timeout
+        self.lock = threading.Lock()
+        # A dictionary of the texts and the Future of their translations
+        # for each pair of languages
+        self.pending = {}
+        self.in_flight = {}
+        self.text_count = 0
+        self.sent_count = 0
+        self.batch_count = 0
+
+    def translate(self, texts, input_lang, output_langs):
+        """Returns a list with a list of the translations of each text, in the
+        order of output_langs, once the batch they are sent in is translated.
+
+        Keyword arguments:
+        texts -- a list of the strings to translate
+        input_lang -- the language of the texts i.e. en for English
+        output_langs -- a list of the languages to translate the texts into
+        """
+        language_pair = (input_lang, tuple(output_langs))
+        with self.lock:
+            self.text_count += len(texts)
+            in_flight = self.in_flight.get(language_pair, {})
+            # The first thread to ask for the pair of languages sends the batch
+            is_leader = language_pair not in self.pending
+            pending = self.pending.setdefault(language_pair, {})
+            futures = []
+            for text in texts:
+                future = in_flight.get(text) or pending.get(text)
+                if future is None:
+                    future = pending[text] = Future()
+                futures.append(future)
+        if is_leader:
+            self.sleep(self.window)
+            self.flush(language_pair)
+        # Wait for each batch, which the other threads send, a limited time
+        # so that a batch that never finishes does not hold the thread forever
+        deadline = time.monotonic() + self.result_timeout
+        return [
+            future.result(timeout=max(deadline - time.monotonic(), 0))
+            for future in futures
+        ]
+
+    def flush(self, language_pair):
+        """Sends the texts waiting for a pair of languages to make_api_call
+        and hands each thread the translations it asked for.
+
+        Keyword arguments:
+        language_pair -- a tuple of the language to translate from and
+            a tuple of the languages to translate into
+        """
+        with self.lock:
+            batch = self.pending.pop(language_pair, {})
+            in_flight = self.in_flight.setdefault(language_pair, {})
+            in_flight.update(batch)
+            if len(batch) > 0:
+                self.batch_count += 1
+                self.sent_count += len(batch)
+        if len(batch) == 0:
+            return
+
+        input_lang, output_langs = language_pair
+        try:
+            response_object = make_api_call(
+                dict(enumerate(batch)),
+                list(output_langs),
+                input_lang,
+                workers=self.workers,
+                cache=self.cache,
+                pack=True,
+                backend=self.backend,
+            )
+            for future, result in zip(batch.values(), response_object, strict=True):
+                future.set_result(
+                    [translation["text"] for translation in result["translations"]]
+                )
+        except Exception as e:
+            # Hand the error to every thread waiting for the batch, so that
+            # none of them waits forever
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            # Nothing, not even an interrupt, may leave a thread waiting
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(RuntimeError("The batch was not translated"))
+            with self.lock:
+                for text, future in batch.items():
+                    if in_flight.get(text) is future:
+                        del in_flight[text]
+
+
+def is_loopback_host(host):
+    """Returns true if an address to listen on only accepts requests from
+    the same machine.
+
+    Keyword arguments:
+    host -- a host name or IP address, i.e. 127.0.0.1
+    """
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class TranslationServiceHandler(TranslateRequestHandler):
+    """Answers the requests sent to a TranslationServer."""
+
+    def do_POST(self):
+        token = self.server.token
+        if token is not None and not hmac.compare_digest(
+            self.headers.get("Ocp-Apim-Subscription-Key", "").encode("utf-8"),
+            token.encode("utf-8"),
+        ):
+            self.send_error_json(
+                401,
+                401000,
+                "The request is not authorized because credentials are "
+                "missing or invalid.",
+            )
+            return
+        translate_request = self.read_translate_request()
+        if translate_request is None:
+            return
+        input_lang, to_langs, texts = translate_request
+        if input_lang is None:
+            self.send_error_json(
+                400, 400035, "The source language (from field) is required."
+            )
+            return
+        try:
+            translations = self.server.coalescer.translate(texts, input_lang, to_langs)
+        except Exception as e:
+            # Only the operator of the service gets to see the details
+            self.log_error("The upstream translator failed: %r", e)
+            self.send_error_json(502, 502000, "The upstream translator failed.")
+            return
+        self.send_translations(translations, to_langs)
+
+    def log_error(self, format, *args):
+        # Errors are logged even when the server is not verbose
+        super(TranslateRequestHandler, self).log_message(format, *args)
+
+
+class TranslationServer(ThreadingHTTPServer):
+    """A local translation service that sends the requests of its clients
+    to a translator backend with a RequestCoalescer.
+
+    The server can be used as a context manager, in which case it is served
+    from a background thread inside the with block.
+
+    Keyword arguments:
+    coalescer -- the RequestCoalescer that translates the texts
+    host -- the address to listen on. (default 127.0.0.1)
+    port -- the port to listen on, or 0 for any free port. (default 8766)
+    verbose -- when true, each request is logged. (default False)
+    token -- the shared token the clients must send as their
+        Ocp-Apim-Subscription-Key header, or None to accept every request.
+        Required when host is not a loopback address. (default None)
+    max_body_size -- maximum number of bytes in the body of a request, above
+        which it is rejected with status code 413. (default 1 MiB)
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        coalescer,
+        host="127.0.0.1",
+        port=default_port,
+        verbose=False,
+        token=None,
+        max_body_size=default_max_body_size,
+    ):
+        if not token and not is_loopback_host(host):
+            raise ValueError(
+                f"A token is required to listen on {host}, since anyone who can "
+                "reach it could send requests billed to the Azure subscription"
+            )
+        super().__init__((host, port), TranslationServiceHandler)
+        self.coalescer = coalescer
+        self.verbose = verbose
+        self.token = token or None
+        self.max_body_size = max_body_size
+        self.thread = None
+
+    @property
+    def endpoint(self):
+        """The base URL to send requests to."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serves requests from a background thread."""
+        self.thread = threading.Thread(
+            target=self.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        )
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Stops serving requests and closes the server."""
+        if self.thread is not None:
+            self.shutdown()
+            self.thread.join()
+            self.thread = None
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+def main():
+    """Build a CLI for running a TranslationServer until it is interrupted."""
+    # Import here since it is only needed to run the service
+    from i18ntools.translation_cache import TranslationCache
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--host",
+        required=False,
+        type=str,
+        default="127.0.0.1",
+        help=(
+            "address to listen on. Defaults to 127.0.0.1, which only accepts "
+            "requests from the same machine. Any other address requires --token."
+        ),
+    )
+    parser.add_argument(
+        "--token",
+        required=False,
+        type=str,
+        default=os.environ.get(endpoint_key_variable),
+        help=(
+            "shared token the clients must send, which they do when it is set "
+            f"in their {endpoint_key_variable} environment variable. "
+            f"Defaults to the {endpoint_key_variable} environment variable."
+        ),
+    )
+    parser.add_argument(
+        "-p",
+        "--port",
+        required=False,
+        type=int,
+        default=default_port,
+        help=f"port to listen on. Defaults to {default_port}",
+    )
+    parser.add_argument(
+        "-r",
+        "--region",
+        required=False,
+        type=str,
+        nargs="?",
+        const=default_region,
+        default=default_region,
+        help="region of the Azure translator resource. Defaults to eastus2",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        required=False,
+        type=int,
+        default=default_workers,
+        help=(
+            "number of requests to send to the Azure translator at the same time "
+            "when a batch is too large for one request. Defaults to 1"
+        ),
+    )
+    parser.add_argument(
+        "--window",
+        required=False,
+        type=float,
+        default=default_window,
+        help=(
+            "number of seconds to collect the requests for a pair of languages "
+            f"before sending them to Azure together. Defaults to {default_window}"
+        ),
+    )
+    parser.add_argument(
+        "--no_cache",
+        "--no-cache",
+        action="store_true",
+        help=(
+            "do not look up or save translations in the translation cache, "
+            "so every text is sent to the Azure translator."
+        ),
+    )
+    parser.add_argument(
+        "--cache_path",
+        "--cache-path",
+        required=False,
+        type=str,
+        help=(
+            "filepath of the translation cache. Defaults to "
+            "translations.sqlite3 in the i18ntools folder of the user's "
+            "cache directory."
+        ),
+    )
+    parser.add_argument(
+        "--max_body_size",
+        "--max-body-size",
+        required=False,
+        type=int,
+        default=default_max_body_size,
+        help=(
+            "maximum number of bytes in the body of a request. Larger requests "
+            f"are rejected without being read. Defaults to {default_max_body_size}"
+        ),
+    )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        action="store_true",
+        help="log each request.",
+    )
+    add_rate_limit_arguments(parser)
+    args = parser.parse_args()
+    if not args.token and not is_loopback_host(args.host):
+        parser.error(
+            f"--token or {endpoint_key_variable} is required to listen on "
+            f"{args.host}"
+        )
+    backend = AzureTranslatorBackend(
+        args.region,
+        workers=args.workers,
+        rate_limiter=rate_limiter_from_args(args),
+    )
+    cache = None if args.no_cache else TranslationCache(args.cache_path)
+    coalescer = RequestCoalescer(backend, cache, args.window, args.workers)
+    server = TranslationServer(
+        coalescer, args.host, args.port, args.verbose, args.token, args.max_body_size
+    )
+    print(f"Translation service listening on {server.endpoint}")
+    print(f"Send requests to it with --endpoint {server.endpoint}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        backend.close()
+        if cache is not None:
+            cache.close()
+        print(
+            f"Translated {coalescer.text_count} texts for clients with "
+            f"{coalescer.sent_count} texts in {coalescer.batch_count} batches"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""Finds the values of i18n messages that do not need to be translated, so
+that they are copied to the output file as they are instead of being sent to
+the Azure Cognitive Services Translator.
+
+A value is not translatable when nothing but simple placeholders, URLs, email
+addresses, numbers, punctuation and whitespace are left in it, i.e. {0},
+{0} / {1}, {0,number,#.##}, %s, 1,000, 50% or https://example.com .
+Choice, plural and select formats are always translated. A skip list file can add
+the keys of messages that are never translated and values that are copied as
+they are, like brand names:
+
+    # Never translate the name of the application
+    key: app.name
+    key: footer.*
+    value: Hypercision
+
+Keys are matched like the --keys option, so a key also matches the keys below
+it and glob patterns are allowed.
+"""
+
+import re
+
+from i18ntools.key_selection import KeyIndex
+
+# Matches the parts of a value that stay the same in every language:
+# simple MessageFormat arguments, printf format specifiers, URLs and emails.
+# The choice, plural and select formats have text in them to translate,
+# so they are left in the value and checked for letters.
+untranslatable_pattern = re.compile(
+    r"\{\s*\w+\s*(?:,\s*(?:number|date|time)\s*(?:,[^{}]*)?)?\}"
+    r"|%(?:\d+\$)?[-#+ 0,(]*\d*(?:\.\d+)?[a-zA-Z%]"
+    r"|\b(?:https?|ftp)://\S+"
+    r"|\bwww\.\S+"
+    r"|[\w.+-]+@[\w-]+(?:\.[\w-]+)+"
+)
+# Matches a letter in any script.
+letter_pattern = re.compile(r"[^\W\d_]")
+
+
+def is_untranslatable(value):
+    """Returns true if a value has no letters outside of its simple
+    placeholders, URLs and email addresses, so its translation would be
+    the same value.
+
+    Keyword arguments:
+    value -- the value of an i18n message
+    """
+    return letter_pattern.search(untranslatable_pattern.sub("", value)) is None
+
+
+class SkipList:
+    """Decides which messages are copied to the output file as they are
+    instead of being translated.
+
+    Keyword arguments:
+    keys -- a list of keys and glob patterns of keys of the messages that
+        are never translated. (default None)
+    values -- a list of values that are never translated. (default None)
+    use_patterns -- when true, values that is_untranslatable finds are
+        skipped too. (default True)
+    """
+
+    def __init__(self, keys=None, values=None, use_patterns=True):
+        self.keys = list(keys or [])
+        self.values = frozenset(values or [])
+        self.use_patterns = use_patterns
+
+    def find_skipped_keys(self, input_data):
+        """Returns a set of the keys of input_data whose values are not
+        translated.
+
+        Keyword arguments:
+        input_data -- a dictionary of the keys and values of the i18n
+            messages. The keys can also be tuples that end with the key of
+            the message, like the ones of translate_jobs.
+        """
+        skipped_keys = set()
+        if self.keys:
+            # Several jobs can have a message with the same key
+            keys_by_message_key = {}
+            for key in input_data:
+                message_key = key[-1] if isinstance(key, tuple) else key
+                keys_by_message_key.setdefault(message_key, []).append(key)
+            key_index = KeyIndex(list(keys_by_message_key))
+            for message_key in key_index.select(self.keys):
+                skipped_keys.update(keys_by_message_key[message_key])
+        for key, value in input_data.items():
+            if key in skipped_keys:
+                continue
+            if value in self.values or (self.use_patterns and is_untranslatable(value)):
+                skipped_keys.add(key)
+        return skipped_keys
+
+
+def read_skip_list(file_path, use_patterns=True):
+    """Returns a SkipList of the keys and values in a skip list file.
+    Empty lines and lines that start with # are skipped.
+
+    Keyword arguments:
+    file_path -- filepath of the skip list file
+    use_patterns -- when true, values that is_untranslatable finds are
+        skipped too. (default True)
+    """
+    keys = []
+    values = []
+    with open(file_path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.rstrip("\r\n")
+            if not line.strip() or line.lstrip().startswith("#"):
+                continue
+            kind, separator, text = line.partition(":")
+            kind = kind.strip()
+            if not separator or kind not in ("key", "value"):
+                raise ValueError(
+                    f"Line {line_number} of {file_path} must start with key: or value:"
+                )
+            if kind == "key":
+                keys.append(text.strip())
+            else:
+                values.append(text.strip())
+    return SkipList(keys, values, use_patterns)
+
+
+def add_skip_list_arguments(parser):
+    """Adds the CLI options for the values that are not translated to a parser.
+
+    Keyword arguments:
+    parser -- the argparse.ArgumentParser of the CLI script
+    """
+    parser.add_argument(
+        "--skip_list",
+        "--skip-list",
+        required=False,
+        type=str,
+        help=(
+            "filepath of a skip list file with a key: or value: line for each "
+            "key or value that is never translated, i.e. value: Hypercision . "
+            "Their values are copied to the output file as they are."
+        ),
+    )
+    parser.add_argument(
+        "--no_skip",
+        "--no-skip",
+        action="store_true",
+        help=(
+            "send the values without letters, like {0}, 1,000 or URLs, to the "
+            "translator instead of copying them to the output file as they are."
+        ),
+    )
+
+
+def skip_list_from_args(args):
+    """Returns a SkipList for the options added by add_skip_list_arguments,
+    or None if no values are skipped.
+
+    Keyword arguments:
+    args -- the parsed arguments of the CLI script
+    """
+    use_patterns = not args.no_skip
+    if args.skip_list is not None:
+        return read_skip_list(args.skip_list, use_patterns)
+    if use_patterns:
+        return SkipList()
+    return None
@@ -4,20 +4,83 @@ so that they are in the same order as the messages in the input
 i18n Java properties file. The output properties file will be overwritten
 with the updated, sorted contents.
 
-Note that this does not work properly for multiline translations
-with an "=" character in them.
+The comments of the input file are copied to the output file. Comments that
+are only in the output file are kept before the message they were above.
 """
 
-# TODO: figure out a way to preserve the comments in the output i18n file
-#  since they could be different from the comments in the input file.
-#  Right now this script delete comments in the output file that are not
-#  present in the input file.
-
 import argparse
 from pathlib import Path
 
-from i18ntools.parse_i18n_file import parse_i18n_file
-from i18ntools.translate import get_default_filepath
+from i18ntools.i18n_document import (
+    I18nDocument,
+    I18nEntry,
+    get_default_filepath,
+    read_i18n_document,
+    write_i18n_document,
+)
+from i18ntools.metrics import add_metrics_arguments, metrics_from_args, phase
+from i18ntools.parse_i18n_file import raise_for_duplicate_keys
+
+
+def sort_i18n_document(input_document, output_document):
+    """Returns a tuple of a new I18nDocument with the messages of
+    output_document in the same order as the messages in input_document,
+    and a list of the keys of input_document missing from output_document.
+    The comments and empty lines of input_document are kept, and so are the
+    comment lines of output_document that are not in input_document.
+
+    Keyword arguments:
+    input_document -- the I18nDocument to reference for the sort order
+    output_document -- the I18nDocument to sort
+    """
+    # Comment lines of the output file that are not anywhere in the input file
+    # were added to the output file on purpose, so they are kept
+    input_comments = {
+        line.strip()
+        for entry in input_document
+        for line in entry.comments
+        if line.startswith("#")
+    }
+    input_comments.update(
+        line.strip() for line in input_document.trailing_lines if line.startswith("#")
+    )
+
+    def output_only_comments(lines):
+        return [
+            line
+            for line in lines
+            if line.startswith("#") and line.strip() not in input_comments
+        ]
+
+    entries = []
+    missing_message_keys = []
+    comments = []
+    for input_entry in input_document:
+        comments.extend(input_entry.comments)
+        output_entry = output_document.get(input_entry.key)
+        if output_entry is None:
+            missing_message_keys.append(input_entry.key)
+            continue
+
+        comments.extend(output_only_comments(output_entry.comments))
+        entries.append(
+            I18nEntry(
+                output_entry.key,
+                output_entry.value,
+                output_entry.start_line,
+                output_entry.end_line,
+                comments,
+                output_entry.raw_lines,
+            )
+        )
+        comments = []
+
+    trailing_lines = (
+        comments
+        + input_document.trailing_lines
+        + output_only_comments(output_document.trailing_lines)
+    )
+    return I18nDocument(entries, trailing_lines), missing_message_keys
 
 
 def sort_i18n_file(input_file_path, output_lang, output_file_path=None):
@@ -26,9 +89,6 @@ def sort_i18n_file(input_file_path, output_lang, output_file_path=None):
     i18n Java properties file. The output properties file will be overwritten
     with the updated, sorted contents.
 
-    Note that this method does not work properly for multiline translations
-    with an "=" character in them.
-
     Keyword arguments:
     input_file_path -- filepath of the i18n Java properties file to reference
             for the sort order
@@ -50,37 +110,16 @@ def sort_i18n_file(input_file_path, output_lang, output_file_path=None):
     if not Path(output_file_path).exists():
         raise FileNotFoundError(f"File {output_file_path} does not exist")
 
-    # Parse the output file into a dictionary
-    output_data = parse_i18n_file(output_file_path)
-
-    # Open the input file in read mode to read its contents
-    with open(input_file_path, "r", encoding="utf-8") as f:
-        input_file_contents = f.readlines()
-
-    new_file_lines = []
-    missing_message_keys = []
-    for line in input_file_contents:
-        # Skip comments and empty lines
-        if line.startswith("#") or line.strip() == "":
-            new_file_lines.append(line)
-            continue
-
-        # Extract the key and value on this line
-        parts = line.strip().split("=", 1)
-        if len(parts) == 1:
-            # Skip this line if it is part of a multiline value
-            continue
-
-        key = parts[0]
-        if key in output_data:
-            translated_text = output_data[key]
-            new_file_lines.append(f"{key}={translated_text}\n")
-        else:
-            missing_message_keys.append(key)
-
-    # Open the output file in write mode to write the updated contents
-    with open(output_file_path, "w", encoding="utf-8") as f:
-        f.writelines(new_file_lines)
+    with phase("parse"):
+        input_document = read_i18n_document(input_file_path)
+        output_document = read_i18n_document(output_file_path)
+        raise_for_duplicate_keys(output_file_path, output_document.duplicate_keys())
+    with phase("sort"):
+        sorted_document, missing_message_keys = sort_i18n_document(
+            input_document, output_document
+        )
+    with phase("write"):
+        write_i18n_document(sorted_document, output_file_path)
     print(
         "i18n translation file sorted successfully:",
         output_file_path,
@@ -97,17 +136,21 @@ def sort_i18n_file(input_file_path, output_lang, output_file_path=None):
 
 def main():
     """Build a CLI for calling sort_i18n_file"""
+    # Import here since translate_tree imports this module
+    from i18ntools.translate_tree import add_tree_arguments, sort_mode, translate_tree
+
     parser = argparse.ArgumentParser(description=__doc__)
-    parser.add_argument(
+    input_group = parser.add_mutually_exclusive_group(required=True)
+    input_group.add_argument(
         "-i",
         "--input_file",
-        required=True,
         type=str,
         help=(
             "filename of input Java properties file. "
             "Can be specified as a relative or absolute file path."
         ),
     )
+    add_tree_arguments(parser, input_group)
     parser.add_argument(
         "-t",
         "--to",
@@ -131,12 +174,26 @@ def main():
             "If the file does not exist, the program will exit with an error."
         ),
     )
+    add_metrics_arguments(parser)
     args = parser.parse_args()
-    sort_i18n_file(
-        args.input_file,
-        args.to,
-        args.output_file,
-    )
+    if args.input_dir is not None and args.output_file is not None:
+        parser.error("--output_file cannot be used with --input_dir")
+    with metrics_from_args(args):
+        if args.input_dir is not None:
+            translate_tree(
+                args.input_dir,
+                args.to,
+                sort_mode,
+                include=args.include,
+                exclude=args.exclude,
+                processes=args.processes,
+            )
+        else:
+            sort_i18n_file(
+                args.input_file,
+                args.to,
+                args.output_file,
+            )
 
 
 if __name__ == "__main__":
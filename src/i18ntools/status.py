@@ -0,0 +1,328 @@
+#!/usr/bin/env python
+"""This script reports which messages are missing from, extra in, or
+duplicated in the translations of every i18n Java properties bundle in a
+directory tree, in a single run.
+
+The translations of a base bundle, i.e. messages.properties, are the files
+next to it with a language appended to its name, i.e. messages_de.properties
+and messages_pt_BR.properties . The languages are the ones found next to any
+of the base bundles, or the ones given with --to.
+
+Each bundle is read by a pool of processes, which index the keys of the base
+bundle with a bitset of the languages that have them, and the report of the
+whole tree is printed as text or JSON.
+"""
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+from i18ntools.i18n_document import get_default_filepath, iter_i18n_entries
+from i18ntools.translate import split_languages
+
+# Version of the format of the JSON report.
+status_format_version = 1
+
+
+def scan_keys(file_path):
+    """Reads an i18n Java properties file and returns a tuple of a list of its
+    keys, in the order they first appear, and a sorted list of the keys that
+    appear more than once.
+
+    Keyword arguments:
+    file_path -- filepath of the i18n Java properties file
+    """
+    keys = {}
+    duplicate_keys = set()
+    for entry in iter_i18n_entries(file_path):
+        if entry.key is None:
+            continue
+        if entry.key in keys:
+            duplicate_keys.add(entry.key)
+        keys[entry.key] = None
+    return list(keys), sorted(duplicate_keys)
+
+
+def find_languages(input_file_path):
+    """Returns a sorted list of the languages of the translations next to
+    a base bundle.
+
+    Keyword arguments:
+    input_file_path -- filepath of the base bundle
+    """
+    base_path = Path(input_file_path)
+    prefix = f"{base_path.stem}_"
+    languages = []
+    for file_path in base_path.parent.glob(f"{prefix}*{base_path.suffix}"):
+        lang = file_path.name[len(prefix) : len(file_path.name) - len(file_path.suffix)]
+        # Only count the files that get_default_filepath would name
+        if get_default_filepath(input_file_path, lang) == str(file_path):
+            languages.append(lang)
+    return sorted(languages)
+
+
+def index_bundle(input_file_path, languages):
+    """Reads a base bundle and its translations and returns a dictionary with
+    the keys of the base bundle, a bitset for each key of the languages that
+    have it, where bit i stands for languages[i], and the extra and duplicate
+    keys of each file.
+
+    This runs in a worker process, so its arguments and result are pickled.
+
+    Keyword arguments:
+    input_file_path -- filepath of the base bundle
+    languages -- a list of the languages of the translations
+    """
+    keys, duplicate_keys = scan_keys(input_file_path)
+    presence = dict.fromkeys(keys, 0)
+    translations = {}
+    for bit, lang in enumerate(languages):
+        output_file_path = get_default_filepath(input_file_path, lang)
+        if not Path(output_file_path).exists():
+            translations[lang] = None
+            continue
+        output_keys, output_duplicate_keys = scan_keys(output_file_path)
+        extra_keys = []
+        for key in output_keys:
+            if key in presence:
+                presence[key] |= 1 << bit
+            else:
+                extra_keys.append(key)
+        translations[lang] = {
+            "file": output_file_path,
+            "extra_keys": extra_keys,
+            "duplicate_keys": output_duplicate_keys,
+        }
+    return {
+        "file": input_file_path,
+        "keys": keys,
+        "presence": [presence[key] for key in keys],
+        "duplicate_keys": duplicate_keys,
+        "translations": translations,
+    }
+
+
+def get_bundle_status(bundle_index, languages):
+    """Returns a dictionary of the status of a bundle and each of its
+    languages, with the keys missing from each translation.
+
+    Keyword arguments:
+    bundle_index -- the dictionary returned by index_bundle
+    languages -- the list of languages the bundle was indexed with
+    """
+    keys = bundle_index["keys"]
+    presence = bundle_index["presence"]
+    complete_mask = (1 << len(languages)) - 1
+    languages_status = {}
+    for bit, lang in enumerate(languages):
+        translation = bundle_index["translations"][lang]
+        if translation is None:
+            languages_status[lang] = {
+                "file": None,
+                "missing_keys": list(keys),
+                "extra_keys": [],
+                "duplicate_keys": [],
+            }
+            continue
+        languages_status[lang] = {
+            "file": translation["file"],
+            "missing_keys": [
+                key for key, mask in zip(keys, presence) if not mask & (1 << bit)
+            ],
+            "extra_keys": translation["extra_keys"],
+            "duplicate_keys": translation["duplicate_keys"],
+        }
+    return {
+        "file": bundle_index["file"],
+        "key_count": len(keys),
+        "complete_key_count": sum(1 for mask in presence if mask == complete_mask),
+        "duplicate_keys": bundle_index["duplicate_keys"],
+        "languages": languages_status,
+    }
+
+
+def get_status(input_dir, output_lang=None, include=None, exclude=None, processes=None):
+    """Returns a dictionary of the status of the translations of every base
+    bundle in a directory tree, which can be saved as JSON.
+
+    Keyword arguments:
+    input_dir -- the directory to search for base bundles
+    output_lang -- the languages to report on, as a comma separated string or
+        a list. Defaults to every language with a translation next to any of
+        the base bundles.
+    include -- a list of glob patterns of the files to include.
+        (default ["*.properties"])
+    exclude -- a list of glob patterns of the files to skip. (default None)
+    processes -- number of processes that read the files.
+        Defaults to the number of CPUs.
+    """
+    # Import here so that the processes are only started when they are needed
+    from concurrent.futures import ProcessPoolExecutor
+
+    from i18ntools.translate_tree import find_base_bundles
+
+    bundles = find_base_bundles(input_dir, include, exclude)
+    if output_lang is not None:
+        languages = split_languages(output_lang)
+    else:
+        languages = sorted(
+            {
+                lang
+                for input_file_path in bundles
+                for lang in find_languages(input_file_path)
+            }
+        )
+
+    with ProcessPoolExecutor(max_workers=processes) as process_pool:
+        bundle_indexes = list(
+            process_pool.map(index_bundle, bundles, [languages] * len(bundles))
+        )
+    return {
+        "version": status_format_version,
+        "input_dir": str(input_dir),
+        "languages": languages,
+        "bundles": [
+            get_bundle_status(bundle_index, languages)
+            for bundle_index in bundle_indexes
+        ],
+    }
+
+
+def count_problems(status):
+    """Returns the number of missing, extra and duplicate keys in a status.
+
+    Keyword arguments:
+    status -- the dictionary returned by get_status
+    """
+    problem_count = 0
+    for bundle in status["bundles"]:
+        problem_count += len(bundle["duplicate_keys"])
+        for language_status in bundle["languages"].values():
+            problem_count += len(language_status["missing_keys"])
+            problem_count += len(language_status["extra_keys"])
+            problem_count += len(language_status["duplicate_keys"])
+    return problem_count
+
+
+def format_status(status):
+    """Returns the status as text, with a table of the share of the keys of
+    each bundle that each language has, followed by the keys that are
+    missing, extra or duplicated.
+
+    Keyword arguments:
+    status -- the dictionary returned by get_status
+    """
+    languages = status["languages"]
+    names = [
+        Path(os.path.relpath(bundle["file"], status["input_dir"])).as_posix()
+        for bundle in status["bundles"]
+    ]
+    name_width = max([len("bundle"), *(len(name) for name in names)])
+    lines = [
+        f"{len(status['bundles'])} bundles in {len(languages)} languages",
+        " ".join(
+            [f"{'bundle':<{name_width}}", f"{'keys':>6}"]
+            + [f"{lang:>8}" for lang in languages]
+        ),
+    ]
+    for name, bundle in zip(names, status["bundles"]):
+        cells = [f"{name:<{name_width}}", f"{bundle['key_count']:>6}"]
+        for lang in languages:
+            language_status = bundle["languages"][lang]
+            if language_status["file"] is None:
+                cells.append(f"{'no file':>8}")
+                continue
+            present = bundle["key_count"] - len(language_status["missing_keys"])
+            share = present / bundle["key_count"] if bundle["key_count"] else 1
+            cells.append(f"{share:>8.1%}")
+        lines.append(" ".join(cells))
+
+    for name, bundle in zip(names, status["bundles"]):
+        if bundle["duplicate_keys"]:
+            lines.append(
+                f"{name} duplicate keys: {', '.join(bundle['duplicate_keys'])}"
+            )
+        for lang, language_status in bundle["languages"].items():
+            if language_status["file"] is None:
+                continue
+            for problem in ("missing", "extra", "duplicate"):
+                problem_keys = language_status[f"{problem}_keys"]
+                if problem_keys:
+                    lines.append(
+                        f"{name} [{lang}] {len(problem_keys)} {problem} keys: "
+                        f"{', '.join(problem_keys)}"
+                    )
+    return "\n".join(lines)
+
+
+def main():
+    """Build a CLI for calling get_status"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "-d",
+        "--input_dir",
+        required=True,
+        type=str,
+        help="directory to search for base bundles, i.e. messages.properties.",
+    )
+    parser.add_argument(
+        "-t",
+        "--to",
+        required=False,
+        type=str,
+        help=(
+            "comma separated languages to report on, i.e. de,fr,es . Bundles "
+            "without a file for a language are reported as missing it. Defaults "
+            "to every language with a file next to any of the base bundles."
+        ),
+    )
+    parser.add_argument(
+        "--include",
+        action="append",
+        type=str,
+        help=(
+            "glob pattern of the files in --input_dir to include. "
+            "Can be used more than once. Defaults to *.properties"
+        ),
+    )
+    parser.add_argument(
+        "--exclude",
+        action="append",
+        type=str,
+        help=(
+            "glob pattern of the files in --input_dir to skip. "
+            "Can be used more than once."
+        ),
+    )
+    parser.add_argument(
+        "--processes",
+        required=False,
+        type=int,
+        help="number of processes that read the files. Defaults to the number of CPUs.",
+    )
+    parser.add_argument(
+        "--json",
+        action="store_true",
+        help="print the status as JSON instead of text.",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="exit with status 1 if any key is missing, extra or duplicated.",
+    )
+    args = parser.parse_args()
+    status = get_status(
+        args.input_dir, args.to, args.include, args.exclude, args.processes
+    )
+    if args.json:
+        print(json.dumps(status, indent=2, ensure_ascii=False))
+    else:
+        print(format_status(status))
+    if args.check and count_problems(status) > 0:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
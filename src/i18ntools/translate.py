@@ -6,45 +6,154 @@ by making REST API calls to Microsoft Azure Cognitive Services Translator.
 Requires the API secret key to be set in an environment variable
 named TRANSLATOR_API_SUBSCRIPTION_KEY .
 If --output_file already exists, then the file will be overwritten.
-
-Note that this does not work properly for multiline translations
-with an "=" character in them.
 """
 
 import argparse
 import os
-import re
+import sys
+from contextlib import ExitStack
 from pathlib import Path
 
-import requests
-from i18ntools.parse_i18n_file import parse_i18n_file
+from i18ntools.backends import (
+    AzureTranslatorBackend,
+    add_endpoint_arguments,
+    backend_from_args,
+)
+from i18ntools.i18n_document import (
+    I18nDocument,
+    get_default_filepath,
+    iter_i18n_entries,
+    read_i18n_document,
+    write_i18n_document,
+)
+from i18ntools.job_journal import JobJournal, get_journal_filepath
+from i18ntools.key_selection import (
+    add_key_selection_arguments,
+    key_patterns_from_args,
+)
+from i18ntools.metrics import (
+    add_metrics_arguments,
+    metrics_from_args,
+    phase,
+    record_cache_lookups,
+)
+from i18ntools.parse_i18n_file import merge_multiline_string, raise_for_duplicate_keys
+from i18ntools.rate_limit import add_rate_limit_arguments, rate_limiter_from_args
+from i18ntools.skip_list import add_skip_list_arguments, skip_list_from_args
 
 # Default region for the Azure translator resource.
 default_region = "eastus2"
 # Default language to translate from.
 default_lang = "en"
+# Maximum number of array elements the Translator API accepts in one request.
+default_max_elements = 1000
+# Maximum number of characters the Translator API accepts in one request.
+default_max_characters = 50000
+# Default number of requests sent to the Translator API at the same time.
+default_workers = 1
+# Suffix of the file the translations are written to until a file is complete.
+partial_suffix = ".partial"
+
+
+def split_languages(output_lang):
+    """Returns a list of the languages in output_lang.
+
+    Keyword arguments:
+    output_lang -- a language i.e. de for German, a comma separated string
+        of languages i.e. de,fr,es or a list of languages
+    """
+    if isinstance(output_lang, str):
+        output_lang = output_lang.split(",")
+    languages = [lang.strip() for lang in output_lang if lang.strip()]
+    if len(languages) == 0:
+        raise ValueError("At least one output language is required")
+    return languages
+
+
+def batch_texts(
+    texts,
+    max_elements=default_max_elements,
+    max_characters=default_max_characters,
+):
+    """Splits the texts into batches that each fit within the request limits
+    of the Translator API and returns a list of batches.
+    Each batch is a list of indexes into texts and the batches preserve
+    the order of texts.
+
+    A single text longer than max_characters is put in a batch by itself.
+
+    Keyword arguments:
+    texts -- a list of the strings to translate
+    max_elements -- maximum number of texts in a batch. (default 1000)
+    max_characters -- maximum total number of characters in a batch.
+        (default 50000)
+    """
+    if max_elements < 1 or max_characters < 1:
+        raise ValueError("max_elements and max_characters must be at least 1")
+
+    batches = []
+    batch = []
+    batch_characters = 0
+    for index, text in enumerate(texts):
+        text_length = len(text)
+        if batch and (
+            len(batch) >= max_elements
+            or batch_characters + text_length > max_characters
+        ):
+            # This text does not fit in the current batch, so start a new one
+            batches.append(batch)
+            batch = []
+            batch_characters = 0
+        batch.append(index)
+        batch_characters += text_length
 
+    if batch:
+        batches.append(batch)
+    return batches
 
-def get_default_filepath(input_file_path, output_lang):
-    """Returns the filepath for a new i18n Java properties file
-    based on the filepath of the input file and the output language.
 
-    The filepath returned will be in the same directory as the input file.
-    The filename will be the same as the input file but with the
-    output_lang appended to it. For example, "/dir/messages.properties"
-    would become "/dir/messages_de.properties"
-    and "/dir/messages_zh.properties" would become "/dir/messages_de.properties".
+def pack_texts(
+    texts,
+    max_elements=default_max_elements,
+    max_characters=default_max_characters,
+):
+    """Packs the texts into as few batches as possible that each fit within
+    the request limits of the Translator API and returns a list of batches.
+    Each batch is a list of indexes into texts.
+
+    Unlike batch_texts, the texts are not kept in order. The longest texts are
+    packed first, each into the first batch it fits in, so that short texts
+    fill up the room left in the batches of the long ones.
+    A single text longer than max_characters is put in a batch by itself.
 
     Keyword arguments:
-    input_file_path -- filepath of the file to translate
-    output_lang -- language of the output file i.e. de for German
+    texts -- a list of the strings to translate
+    max_elements -- maximum number of texts in a batch. (default 1000)
+    max_characters -- maximum total number of characters in a batch.
+        (default 50000)
     """
-    parts = os.path.splitext(input_file_path)
-    file_path_without_extension = parts[0]
-    # Use regex string replace to remove the language code
-    # from the filename, if there is one.
-    file_path_without_extension = re.sub("_.*$", "", file_path_without_extension)
-    return f"{file_path_without_extension}_{output_lang}{parts[1]}"
+    if max_elements < 1 or max_characters < 1:
+        raise ValueError("max_elements and max_characters must be at least 1")
+
+    batches = []
+    batch_characters = []
+    longest_first = sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
+    for index in longest_first:
+        text_length = len(texts[index])
+        for batch_index, batch in enumerate(batches):
+            if (
+                len(batch) < max_elements
+                and batch_characters[batch_index] + text_length <= max_characters
+            ):
+                batch.append(index)
+                batch_characters[batch_index] += text_length
+                break
+        else:
+            batches.append([index])
+            batch_characters.append(text_length)
+
+    # Keep each batch, and the batches, in the order of texts where possible
+    return sorted(sorted(batch) for batch in batches)
 
 
 def make_api_call(
@@ -52,55 +161,405 @@ def make_api_call(
     output_lang,
     input_lang=default_lang,
     translator_region=default_region,
+    max_elements=default_max_elements,
+    max_characters=default_max_characters,
+    workers=default_workers,
+    session=None,
+    cache=None,
+    pack=False,
+    rate_limiter=None,
+    backend=None,
+    skip_list=None,
 ):
-    """Returns the JSON response of the API call as a dictionary.
+    """Returns the JSON response of the API call as a list with one
+    translation result for each value in input_data, in the same order.
+    Each result has one translation for each output language,
+    in the same order as the output languages.
+
+    Values that are the same are only sent once, and their translation
+    is returned for each of them.
+    The values are sent in as many requests as needed to stay within
+    max_elements and max_characters per request.
+    Up to workers of those requests are sent at the same time.
 
     Keyword arguments:
     input_data -- a dictionary of the keys and values of the i18n translations
     output_lang -- the language of the output file i.e. de for German.
+        Can also be a comma separated string or a list of several languages
+        to translate each value into all of them with the same requests.
     input_lang -- the language of the input file i.e. de for German. (default en)
     translator_region -- the region of the Azure translator resource. (default eastus2)
+    max_elements -- maximum number of values sent in one request. (default 1000)
+    max_characters -- maximum number of characters sent in one request,
+        counting the characters once per output language. (default 50000)
+    workers -- number of requests to send at the same time. (default 1)
+    session -- a requests.Session to send the requests with. If this is left
+        as None, then a new session is created and closed for this call.
+    cache -- a TranslationCache to look up values in before sending them,
+        and to save the new translations in. (default None)
+    pack -- when true, the values are packed into as few requests as
+        possible with pack_texts instead of being sent in order. (default False)
+    rate_limiter -- a RateLimiter that keeps the requests within the quota
+        of the subscription and retries throttled or failed requests. If this
+        is left as None, then requests are retried without a quota.
+    backend -- the TranslatorBackend that translates each batch. If this is
+        left as None, then an AzureTranslatorBackend is created for this call
+        with translator_region, session and rate_limiter.
+    skip_list -- a SkipList of the values that are not sent, and are returned
+        as their own translation instead. (default None)
     """
-    # Set up the Translator API endpoint and subscription key
-    translator_endpoint = (
-        "https://api.cognitive.microsofttranslator.com"
-        "/translate?api-version=3.0&from={0}&to={1}"
-    ).format(input_lang, output_lang)
-    # Read the API key from an environment variable
-    subscription_key = os.environ["TRANSLATOR_API_SUBSCRIPTION_KEY"]
-
-    # Set up the REST API request headers
-    headers = {
-        "Content-Type": "application/json",
-        "Ocp-Apim-Subscription-Key": subscription_key,
-        "Ocp-Apim-Subscription-Region": translator_region,
-    }
+    if workers < 1:
+        raise ValueError("workers must be at least 1")
+    output_langs = split_languages(output_lang)
+
+    owns_backend = backend is None
+    if owns_backend:
+        backend = AzureTranslatorBackend(
+            translator_region,
+            session=session,
+            workers=workers,
+            rate_limiter=rate_limiter,
+        )
 
     message_count = len(input_data.keys())
     print(f"About to translate {message_count} messages")
 
-    # Set up the REST API request payload
-    request_payload = []
+    skipped_keys = set()
+    if skip_list is not None:
+        skipped_keys = skip_list.find_skipped_keys(input_data)
+        if len(skipped_keys) > 0:
+            print(
+                f"{len(skipped_keys)} messages do not need to be translated "
+                "and are copied as they are"
+            )
+
+    texts = [value for key, value in input_data.items() if key not in skipped_keys]
+    # Translate each distinct value only once and copy its translation
+    # to every key that has the same value
+    unique_texts = list(dict.fromkeys(texts))
+    duplicate_count = len(texts) - len(unique_texts)
+    if duplicate_count > 0:
+        print(f"{duplicate_count} messages have the same value as another message")
+
+    unique_results = [None] * len(unique_texts)
+    # Only send the values that are not already in the cache
+    pending_indexes = []
+    for index, text in enumerate(unique_texts):
+        cached_translations = None
+        if cache is not None:
+            cached_translations = cache.lookup(text, input_lang, output_langs)
+        if cached_translations is None:
+            pending_indexes.append(index)
+        else:
+            unique_results[index] = {
+                "translations": [
+                    {"text": translation, "to": lang}
+                    for translation, lang in zip(cached_translations, output_langs)
+                ]
+            }
+    if cache is not None:
+        record_cache_lookups(
+            len(unique_texts) - len(pending_indexes), len(pending_indexes)
+        )
+        print(
+            f"Found {len(unique_texts) - len(pending_indexes)} of "
+            f"{len(unique_texts)} messages in the translation cache"
+        )
+
+    pending_texts = [unique_texts[index] for index in pending_indexes]
+    # The Translator API counts the characters of a request once for each
+    # language they are translated into
+    split_texts = pack_texts if pack else batch_texts
+    batches = split_texts(
+        pending_texts, max_elements, max(max_characters // len(output_langs), 1)
+    )
+    if len(batches) > 1:
+        print(f"Sending the messages in {len(batches)} requests")
+
+    # Set up the texts of each batch
+    batch_texts_list = [[pending_texts[index] for index in batch] for batch in batches]
+
+    def send(texts):
+        return backend.translate_batch(texts, input_lang, output_langs)
+
+    try:
+        if workers == 1 or len(batch_texts_list) <= 1:
+            batch_responses = [send(texts) for texts in batch_texts_list]
+        else:
+            # Import here since it is only needed for concurrent requests
+            from concurrent.futures import ThreadPoolExecutor
+
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # executor.map yields the responses in the order of the
+                # batches, no matter which request finishes first
+                batch_responses = list(executor.map(send, batch_texts_list))
+    finally:
+        if owns_backend:
+            backend.close()
+
+    # The results of each response are in the order of its batch,
+    # so put each of them back in the place of its text
+    pending_results = [None] * len(pending_texts)
+    for batch, batch_response in zip(batches, batch_responses):
+        # Check every response before anything is stored in the cache, so a
+        # short response never pairs translations with the wrong texts
+        if len(batch_response) != len(batch):
+            raise ValueError(
+                f"The translator returned {len(batch_response)} translations "
+                f"for a request of {len(batch)} texts"
+            )
+        for index, translations in zip(batch, batch_response):
+            pending_results[index] = {
+                "translations": [
+                    {"text": translation, "to": lang}
+                    for translation, lang in zip(translations, output_langs)
+                ]
+            }
+
+    for index, result in zip(pending_indexes, pending_results):
+        unique_results[index] = result
+        if cache is not None:
+            cache.store(
+                unique_texts[index],
+                input_lang,
+                output_langs,
+                [translation["text"] for translation in result["translations"]],
+            )
+    if cache is not None:
+        cache.save()
+
+    # Fan the results back out so they line up with input_data again
+    results_by_text = dict(zip(unique_texts, unique_results))
+    return [
+        (
+            {"translations": [{"text": value, "to": lang} for lang in output_langs]}
+            if key in skipped_keys
+            else results_by_text[value]
+        )
+        for key, value in input_data.items()
+    ]
+
+
+def iter_entry_chunks(entries, max_elements, max_characters):
+    """Groups I18nEntry messages into lists and yields each list once it has
+    max_elements messages or at least max_characters characters in its values.
+
+    Keyword arguments:
+    entries -- an iterable of I18nEntry messages, i.e. from iter_i18n_entries
+    max_elements -- maximum number of messages in a list
+    max_characters -- number of characters after which a list is yielded
+    """
+    chunk = []
+    chunk_characters = 0
+    for entry in entries:
+        chunk.append(entry)
+        chunk_characters += len(entry.value or "")
+        if len(chunk) >= max_elements or chunk_characters >= max_characters:
+            yield chunk
+            chunk = []
+            chunk_characters = 0
+
+    if chunk:
+        yield chunk
+
+
+def make_journaled_api_call(input_data, output_langs, journal, **kwargs):
+    """Returns the translation results of make_api_call for input_data,
+    taking the messages that are already in the journal from it and
+    appending the new translations to it.
+
+    Keyword arguments:
+    input_data -- a dictionary of the keys and values of the i18n translations
+    output_langs -- a list of the output languages
+    journal -- the JobJournal of the job, or None to only call make_api_call
+    kwargs -- the other keyword arguments of make_api_call
+    """
+    if journal is None:
+        return make_api_call(input_data, output_langs, **kwargs)
+    journaled = {key: journal.lookup(key, value) for key, value in input_data.items()}
+    pending_data = {
+        key: value for key, value in input_data.items() if journaled[key] is None
+    }
+    pending_results = iter([])
+    if len(pending_data) > 0:
+        pending_results = iter(make_api_call(pending_data, output_langs, **kwargs))
+
+    response_object = []
+    new_translations = {}
     for key, value in input_data.items():
-        # Add text to translate to the REST API request payload
-        request_payload.append({"text": value})
+        translations = journaled[key]
+        if translations is None:
+            result = next(pending_results)
+            translations = [
+                translation["text"] for translation in result["translations"]
+            ]
+            new_translations[key] = (value, translations)
+        response_object.append(
+            {
+                "translations": [
+                    {"text": translation, "to": lang}
+                    for translation, lang in zip(translations, output_langs)
+                ]
+            }
+        )
+    journal.record(new_translations)
+    return response_object
+
+
+def write_translated_entries(output_file, entries, response_object, lang_index=0):
+    """Writes the comments of each I18nEntry and its key with its translation
+    to an open output file.
+
+    Keyword arguments:
+    output_file -- the open i18n Java properties file to write to
+    entries -- a list of I18nEntry messages from the input file
+    response_object -- the translation results returned by make_api_call
+        for the messages in entries that have a key
+    lang_index -- the position of the output language in the languages
+        passed to make_api_call. (default 0)
+    """
+    results = iter(response_object)
+    for entry in entries:
+        # Keep the comments and empty lines of the input file
+        output_file.writelines(entry.comments)
+        if entry.key is not None:
+            # Extract the translated text from the response
+            translated_text = next(results)["translations"][lang_index]["text"]
+            output_file.write(f"{entry.key}={translated_text}\n")
+
+
+def check_duplicate_keys(input_file_path):
+    """Reads an i18n Java properties file and raises a SyntaxWarning if any
+    of its keys appear more than once. Only the keys are kept in memory.
+
+    Keyword arguments:
+    input_file_path -- filepath of the i18n Java properties file
+    """
+    keys = set()
+    duplicate_keys = set()
+    for entry in iter_i18n_entries(input_file_path):
+        if entry.key in keys:
+            duplicate_keys.add(entry.key)
+        keys.add(entry.key)
+    raise_for_duplicate_keys(input_file_path, duplicate_keys)
+
+
+def iter_payload_chunks(input_file_path, output_langs, workers, remove_backslashes):
+    """Streams an i18n Java properties file and yields a tuple of each chunk
+    of its I18nEntry messages and a dictionary of the keys and values to
+    translate in it, the way translate_file sends them.
 
-    # Make the REST API call to Translator API to translate the values
-    # https://learn.microsoft.com/en-us/azure/cognitive-services/translator/reference/v3-0-translate
-    response = requests.post(
-        translator_endpoint, headers=headers, json=request_payload, timeout=30
+    A chunk is as many messages as the workers can send at once, so only one
+    chunk has to be kept in memory.
+
+    Keyword arguments:
+    input_file_path -- filepath of the i18n Java properties file
+    output_langs -- a list of the output languages
+    workers -- number of requests to send at the same time
+    remove_backslashes -- when true, backslashes from multiline values are
+        not included in the text that gets translated.
+    """
+    chunks = iter_entry_chunks(
+        iter_i18n_entries(input_file_path),
+        default_max_elements * workers,
+        default_max_characters * workers // len(output_langs),
     )
-    # Exit with an error if the REST API call was not successful
-    if response.status_code != 200:
-        status_code_message = (
-            f"Translation failed with status code: {response.status_code}"
+    for chunk in chunks:
+        input_data = {
+            entry.key: (
+                merge_multiline_string(entry.value)
+                if remove_backslashes
+                else entry.value
+            )
+            for entry in chunk
+            if entry.key is not None
+        }
+        yield chunk, input_data
+
+
+def get_selected_messages(input_file_path, keys, remove_backslashes=False):
+    """Reads an i18n Java properties file and returns a dictionary of the keys
+    and values of the messages selected by keys, in the order they appear.
+
+    Keyword arguments:
+    input_file_path -- filepath of the i18n Java properties file
+    keys -- a list of keys and glob patterns of keys, see key_selection
+    remove_backslashes -- when true, backslashes from multiline values are
+        not included in the values returned.
+    """
+    input_document = read_i18n_document(input_file_path)
+    raise_for_duplicate_keys(input_file_path, input_document.duplicate_keys())
+    payload_data = {}
+    for key in input_document.select_keys(keys):
+        value = input_document.get(key).value
+        payload_data[key] = (
+            merge_multiline_string(value) if remove_backslashes else value
         )
-        print(status_code_message)
-        print("Response:", response.text)
-        print("translator_region:", translator_region)
-        raise requests.HTTPError(status_code_message, response)
+    return payload_data
 
-    return response.json()
+
+def translate_selected_messages(
+    input_file_path,
+    keys,
+    output_langs,
+    lang_file_paths,
+    input_lang=default_lang,
+    translator_region=default_region,
+    remove_backslashes=False,
+    workers=default_workers,
+    cache=None,
+    rate_limiter=None,
+    backend=None,
+    skip_list=None,
+):
+    """Translates the messages of an i18n Java properties file that are
+    selected by keys and replaces them in place in the output files,
+    leaving their other lines as they are. An output file that does not
+    exist yet is created with only the selected messages.
+
+    Keyword arguments:
+    input_file_path -- filepath of the i18n Java properties file to translate
+    keys -- a list of keys and glob patterns of keys, see key_selection
+    output_langs -- a list of the languages to translate into
+    lang_file_paths -- a list of the filepaths of the output files,
+        one for each of output_langs
+    The other arguments are the same as the ones of translate_file.
+    """
+    with phase("parse"):
+        payload_data = get_selected_messages(input_file_path, keys, remove_backslashes)
+    if len(payload_data) == 0:
+        print(f"No messages in {input_file_path} match the keys:", " ".join(keys))
+        return
+
+    print(f"About to translate {len(payload_data)} selected messages")
+    with phase("translate"):
+        response_object = make_api_call(
+            payload_data,
+            output_langs,
+            input_lang,
+            translator_region,
+            workers=workers,
+            cache=cache,
+            rate_limiter=rate_limiter,
+            backend=backend,
+            skip_list=skip_list,
+        )
+
+    for lang_index, lang_file_path in enumerate(lang_file_paths):
+        with phase("parse"):
+            if Path(lang_file_path).exists():
+                output_document = read_i18n_document(lang_file_path)
+            else:
+                output_document = I18nDocument(file_path=lang_file_path)
+        for key, result in zip(payload_data, response_object):
+            output_document.set_value(key, result["translations"][lang_index]["text"])
+        with phase("write"):
+            write_i18n_document(output_document, lang_file_path)
+        print(
+            f"Translation completed successfully. {len(payload_data)} selected "
+            "messages saved to:",
+            lang_file_path,
+        )
 
 
 def translate_file(
@@ -110,69 +569,199 @@ def translate_file(
     input_lang=default_lang,
     translator_region=default_region,
     remove_backslashes=False,
+    workers=default_workers,
+    cache=None,
+    rate_limiter=None,
+    resume=False,
+    backend=None,
+    keys=None,
+    skip_list=None,
+    journal=False,
 ):
+    """Translates an i18n Java properties file into new i18n Java properties
+    file(s) of different language(s).
+
+    Keyword arguments:
+    input_file_path -- filepath of the i18n Java properties file to translate
+    output_lang -- language of the output file i.e. de for German.
+        Can also be a comma separated string or a list of several languages,
+        in which case the input file is parsed and sent only once and one
+        output file is saved for each language.
+    output_file_path -- filepath of the output file. If this is left as None,
+        then it defaults to the input_file with the output language appended
+        to it. It must be None when translating into several languages.
+    input_lang -- the language of the input file. (default en)
+    translator_region -- the region of the Azure translator resource.
+        (default eastus2)
+    remove_backslashes -- when true, backslashes from multiline values are
+        not included in the text that gets translated.
+    workers -- number of requests to send at the same time. (default 1)
+    cache -- a TranslationCache to reuse earlier translations from.
+        (default None)
+    rate_limiter -- a RateLimiter that keeps the requests within the quota
+        of the subscription. (default RateLimiter() without a quota)
+    resume -- when true, the messages in the journal of an earlier run that
+        failed partway through are not sent again, and the run keeps a
+        journal too. (default False)
+    backend -- the TranslatorBackend that translates the messages.
+        (default AzureTranslatorBackend(translator_region))
+    keys -- a list of keys and glob patterns of keys. When given, only the
+        messages they select are translated, and they are replaced in, or
+        added to, the existing output files. (default None)
+    skip_list -- a SkipList of the values that are copied to the output
+        files as they are instead of being translated. (default None)
+    journal -- when true, the translations of each chunk of messages are
+        appended to a journal next to the first output file as they arrive,
+        which is deleted once the output files are complete, so a run that
+        fails partway through can be resumed. (default False)
+
+    The input file is streamed through the translator, so memory use stays
+    close to what is needed for the messages sent at the same time,
+    no matter how large the input file is.
+    """
     if not Path(input_file_path).exists():
         raise FileNotFoundError(f"File {input_file_path} does not exist")
 
-    if output_file_path is None:
-        # Make output_file_path be the input_file_path with the
-        # output_lang appended to it. For example, "/dir/messages.properties"
-        # would become "/dir/messages_de.properties".
-        output_file_path = get_default_filepath(input_file_path, output_lang)
+    output_langs = split_languages(output_lang)
+    if output_file_path is not None and len(output_langs) > 1:
+        raise ValueError(
+            "output_file_path cannot be used when translating into several languages"
+        )
 
-    # Parse the input file into a dictionary
-    input_data = parse_i18n_file(input_file_path, remove_backslashes)
+    lang_file_paths = []
+    for lang in output_langs:
+        lang_file_path = output_file_path
+        if lang_file_path is None:
+            # Make output_file_path be the input_file_path with the
+            # output_lang appended to it. For example, "/dir/messages.properties"
+            # would become "/dir/messages_de.properties".
+            lang_file_path = get_default_filepath(input_file_path, lang)
+        lang_file_paths.append(lang_file_path)
 
-    # Open the input file in read mode to read its contents
-    with open(input_file_path, "r", encoding="utf-8") as f:
-        file_contents = f.readlines()
+    if keys is not None:
+        translate_selected_messages(
+            input_file_path,
+            keys,
+            output_langs,
+            lang_file_paths,
+            input_lang,
+            translator_region,
+            remove_backslashes,
+            workers,
+            cache,
+            rate_limiter,
+            backend,
+            skip_list,
+        )
+        return
 
-    response_object = make_api_call(
-        input_data, output_lang, input_lang, translator_region
-    )
+    # Check the input file for duplicate keys before anything is translated
+    with phase("parse"):
+        check_duplicate_keys(input_file_path)
 
-    index = 0
-    new_file_lines = []
-    for line in file_contents:
-        # Skip comments and empty lines
-        if line.startswith("#") or line.strip() == "":
-            new_file_lines.append(line)
-            continue
-
-        # Extract the key and value on this line
-        parts = line.strip().split("=", 1)
-        if len(parts) == 1:
-            # Skip this line if it is part of a multiline value
-            continue
-
-        key = parts[0]
-        # Extract the translated text from the response
-        translated_text = response_object[index]["translations"][0]["text"]
-        new_file_lines.append(f"{key}={translated_text}\n")
-        index += 1
-
-    # Create a new i18n Java properties file in the specified output language
-    with open(output_file_path, "w", encoding="utf-8") as f:
-        f.writelines(new_file_lines)
-    print(
-        "Translation completed successfully. Translated file saved to:",
-        output_file_path,
-    )
+    # The translations are written to partial files that replace the output
+    # files once the whole input file has been translated
+    partial_file_paths = [f"{path}{partial_suffix}" for path in lang_file_paths]
+
+    owns_backend = backend is None
+    if owns_backend:
+        # Share one backend between the chunks so its connections stay warm
+        # and a pause after a throttled request holds for the next chunk too
+        backend = AzureTranslatorBackend(
+            translator_region, workers=workers, rate_limiter=rate_limiter
+        )
+    job_journal = None
+    if journal or resume:
+        job_journal = JobJournal(
+            get_journal_filepath(lang_file_paths[0]), input_lang, output_langs, resume
+        )
+    try:
+        with ExitStack() as stack:
+            output_files = [
+                stack.enter_context(open(path, "w", encoding="utf-8"))
+                for path in partial_file_paths
+            ]
+            chunks = iter_payload_chunks(
+                input_file_path, output_langs, workers, remove_backslashes
+            )
+            while True:
+                # Reading the next chunk streams it from the input file
+                with phase("parse"):
+                    next_chunk = next(chunks, None)
+                if next_chunk is None:
+                    break
+                chunk, input_data = next_chunk
+                response_object = []
+                if len(input_data) > 0:
+                    with phase("translate"):
+                        response_object = make_journaled_api_call(
+                            input_data,
+                            output_langs,
+                            job_journal,
+                            input_lang=input_lang,
+                            translator_region=translator_region,
+                            workers=workers,
+                            cache=cache,
+                            backend=backend,
+                            skip_list=skip_list,
+                        )
+                with phase("write"):
+                    for lang_index, output_file in enumerate(output_files):
+                        write_translated_entries(
+                            output_file, chunk, response_object, lang_index
+                        )
+    except BaseException:
+        for path in partial_file_paths:
+            Path(path).unlink(missing_ok=True)
+        if job_journal is not None:
+            job_journal.close()
+            print(
+                "The messages translated so far are saved in",
+                job_journal.file_path,
+                "- run again with --resume to only translate the rest",
+            )
+        raise
+    finally:
+        if owns_backend:
+            backend.close()
+
+    if job_journal is not None:
+        job_journal.remove()
+
+    for partial_file_path, lang_file_path in zip(partial_file_paths, lang_file_paths):
+        os.replace(partial_file_path, lang_file_path)
+        print(
+            "Translation completed successfully. Translated file saved to:",
+            lang_file_path,
+        )
 
 
 def main():
     """Build a CLI for calling translate_file"""
+    # Import here since dry_run and translate_tree import this module
+    from i18ntools.dry_run import (
+        add_dry_run_arguments,
+        get_plan,
+        open_read_only_cache,
+        plan_translate_file,
+        plan_translate_tree,
+        report_plan,
+    )
+    from i18ntools.translate_tree import add_tree_arguments, translate_tree
+    from i18ntools.translation_cache import TranslationCache
+
     parser = argparse.ArgumentParser(description=__doc__)
-    parser.add_argument(
+    input_group = parser.add_mutually_exclusive_group(required=True)
+    input_group.add_argument(
         "-i",
         "--input_file",
-        required=True,
         type=str,
         help=(
             "filename of input Java properties file to translate. "
             "Can be specified as a relative or absolute file path."
         ),
     )
+    add_tree_arguments(parser, input_group)
     parser.add_argument(
         "-f",
         "--from_lang",
@@ -190,7 +779,9 @@ def main():
         type=str,
         help=(
             "Language of the output file. "
-            "For example, use de to translate to German."
+            "For example, use de to translate to German. "
+            "Several languages can be separated by commas, i.e. de,fr,es "
+            "to save one output file for each of them."
         ),
     )
     parser.add_argument(
@@ -202,7 +793,8 @@ def main():
             "filename of the output properties file. Can be specified as a "
             "relative or absolute file path. Defaults to the input_file with "
             "the output language appended to it. For example, messages.properties "
-            "would become messages_de.properties"
+            "would become messages_de.properties . "
+            "Cannot be used with several output languages."
         ),
     )
     parser.add_argument(
@@ -224,15 +816,141 @@ def main():
             "will not be included in the text that gets translated."
         ),
     )
-    args = parser.parse_args()
-    translate_file(
-        args.input_file,
-        args.to,
-        args.output_file,
-        args.from_lang,
-        args.region,
-        args.remove_backslashes,
+    parser.add_argument(
+        "-w",
+        "--workers",
+        required=False,
+        type=int,
+        default=default_workers,
+        help=(
+            "number of requests to send to the Azure translator at the same time "
+            "when the input file is too large for one request. Defaults to 1"
+        ),
     )
+    parser.add_argument(
+        "--no_cache",
+        "--no-cache",
+        action="store_true",
+        help=(
+            "do not look up or save translations in the translation cache, "
+            "so every message is sent to the Azure translator."
+        ),
+    )
+    parser.add_argument(
+        "--cache_path",
+        "--cache-path",
+        required=False,
+        type=str,
+        help=(
+            "filepath of the translation cache. Defaults to "
+            "translations.sqlite3 in the i18ntools folder of the user's "
+            "cache directory."
+        ),
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help=(
+            "do not translate the messages that an earlier run, which failed "
+            "partway through, saved in its journal next to the output file."
+        ),
+    )
+    add_key_selection_arguments(parser)
+    add_skip_list_arguments(parser)
+    add_dry_run_arguments(parser)
+    add_endpoint_arguments(parser)
+    add_rate_limit_arguments(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    if args.input_dir is not None and args.output_file is not None:
+        parser.error("--output_file cannot be used with --input_dir")
+    keys = key_patterns_from_args(args)
+    if args.input_dir is not None and keys is not None:
+        parser.error("--keys and --keys_from cannot be used with --input_dir")
+    skip_list = skip_list_from_args(args)
+    if args.character_budget is not None and not args.dry_run:
+        parser.error("--character_budget can only be used with --dry_run")
+    if args.dry_run:
+        cache = None if args.no_cache else open_read_only_cache(args.cache_path)
+        try:
+            if args.input_dir is not None:
+                dry_run_backend = plan_translate_tree(
+                    args.input_dir,
+                    args.to,
+                    include=args.include,
+                    exclude=args.exclude,
+                    input_lang=args.from_lang,
+                    remove_backslashes=args.remove_backslashes,
+                    workers=args.workers,
+                    cache=cache,
+                    skip_list=skip_list,
+                )
+            else:
+                dry_run_backend = plan_translate_file(
+                    args.input_file,
+                    args.to,
+                    args.from_lang,
+                    args.remove_backslashes,
+                    args.workers,
+                    cache,
+                    keys,
+                    skip_list,
+                )
+        finally:
+            if cache is not None:
+                cache.close()
+        plan = get_plan(
+            dry_run_backend,
+            args.workers,
+            args.characters_per_minute,
+            args.requests_per_minute,
+        )
+        if not report_plan(plan, args.plan_json, args.character_budget):
+            sys.exit(1)
+        return
+    rate_limiter = rate_limiter_from_args(args)
+    backend = backend_from_args(args, rate_limiter)
+    cache = None if args.no_cache else TranslationCache(args.cache_path)
+    try:
+        with metrics_from_args(args):
+            if args.input_dir is not None:
+                translate_tree(
+                    args.input_dir,
+                    args.to,
+                    include=args.include,
+                    exclude=args.exclude,
+                    input_lang=args.from_lang,
+                    translator_region=args.region,
+                    remove_backslashes=args.remove_backslashes,
+                    workers=args.workers,
+                    processes=args.processes,
+                    cache=cache,
+                    rate_limiter=rate_limiter,
+                    backend=backend,
+                    skip_list=skip_list,
+                )
+                return
+            translate_file(
+                args.input_file,
+                args.to,
+                args.output_file,
+                args.from_lang,
+                args.region,
+                args.remove_backslashes,
+                args.workers,
+                cache,
+                rate_limiter,
+                args.resume,
+                backend,
+                keys,
+                skip_list,
+                journal=True,
+            )
+    finally:
+        if backend is not None:
+            backend.close()
+        if cache is not None:
+            cache.close()
 
 
 if __name__ == "__main__":
@@ -5,22 +5,113 @@ by making REST API calls to Microsoft Azure Cognitive Services Translator.
 
 Requires the API secret key to be set in an environment variable
 named TRANSLATOR_API_SUBSCRIPTION_KEY .
-
-Note that this does not work properly for multiline translations
-with an "=" character in them.
 """
 
 import argparse
+import hashlib
+import json
+import sys
 from pathlib import Path
 
 import i18ntools.translate
-from i18ntools.parse_i18n_file import parse_i18n_file
-from i18ntools.sort_i18n_file import sort_i18n_file
+from i18ntools.backends import add_endpoint_arguments, backend_from_args
+from i18ntools.i18n_document import read_i18n_document, write_i18n_document
+from i18ntools.key_selection import (
+    add_key_selection_arguments,
+    key_patterns_from_args,
+)
+from i18ntools.metrics import add_metrics_arguments, metrics_from_args, phase
+from i18ntools.rate_limit import add_rate_limit_arguments, rate_limiter_from_args
+from i18ntools.skip_list import add_skip_list_arguments, skip_list_from_args
+from i18ntools.sort_i18n_file import sort_i18n_document
+from i18ntools.translation_cache import TranslationCache
 
 # Default region for the Azure translator resource.
 default_region = "eastus2"
 # Default language to translate from.
 default_lang = "en"
+# Suffix added to the output filepath to get the filepath of its manifest.
+manifest_suffix = ".manifest.json"
+
+
+def get_manifest_filepath(output_file_path):
+    """Returns the filepath of the manifest that records which source values
+    the messages in output_file_path were translated from.
+    For example, "/dir/messages_de.properties" would become
+    "/dir/messages_de.properties.manifest.json".
+
+    Keyword arguments:
+    output_file_path -- filepath of the translated i18n Java properties file
+    """
+    return f"{output_file_path}{manifest_suffix}"
+
+
+def hash_value(value):
+    """Returns a short hash of a source value for use in a manifest.
+
+    Keyword arguments:
+    value -- the source value of an i18n message
+    """
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()[:16]
+
+
+def read_manifest(manifest_path):
+    """Returns a dictionary of the keys and source value hashes saved in
+    the manifest, or None if the manifest does not exist.
+
+    Keyword arguments:
+    manifest_path -- filepath of the manifest
+    """
+    if not Path(manifest_path).exists():
+        return None
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        return json.load(f)["hashes"]
+
+
+def write_manifest(manifest_path, hashes):
+    """Saves the keys and source value hashes in the manifest.
+
+    Keyword arguments:
+    manifest_path -- filepath of the manifest
+    hashes -- a dictionary of the keys and the hashes of their source values
+    """
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump({"version": 1, "hashes": hashes}, f, indent=0, sort_keys=True)
+        f.write("\n")
+
+
+def find_pending_messages(
+    input_data, output_data, selected_keys, manifest=None, source_hashes=None
+):
+    """Returns a tuple of a list of the keys missing from the output data,
+    a list of the keys whose source value changed since they were translated,
+    and a dictionary of the keys and values of both to translate.
+
+    Keyword arguments:
+    input_data -- a dictionary of the keys and values of the input file
+    output_data -- a dictionary of the keys and values of the output file
+    selected_keys -- the keys of input_data to look at
+    manifest -- a dictionary of the keys and the hashes of the values they
+        were translated from, or None to not look for changed messages.
+        (default None)
+    source_hashes -- a dictionary of the keys and the hashes of their
+        values in input_data, needed with a manifest. (default None)
+    """
+    missing_message_keys = []
+    changed_message_keys = []
+    payload_data = {}
+    for key in selected_keys:
+        if key not in output_data:
+            missing_message_keys.append(key)
+            payload_data[key] = input_data[key]
+        elif (
+            manifest is not None
+            and key in manifest
+            and manifest[key] != source_hashes[key]
+        ):
+            changed_message_keys.append(key)
+            payload_data[key] = input_data[key]
+    return missing_message_keys, changed_message_keys, payload_data
 
 
 def translate_missing_messages(
@@ -31,7 +122,47 @@ def translate_missing_messages(
     input_lang=default_lang,
     translator_region=default_region,
     remove_backslashes=False,
+    workers=i18ntools.translate.default_workers,
+    cache=None,
+    incremental=False,
+    rate_limiter=None,
+    backend=None,
+    keys=None,
+    skip_list=None,
 ):
+    """Translates the messages in the input i18n Java properties file that are
+    missing from the output i18n Java properties file and adds them to it.
+
+    Keyword arguments:
+    input_file_path -- filepath of the i18n Java properties file to translate
+    output_lang -- language of the output file i.e. de for German
+    sort_file -- when true, the output file is sorted in the same order as
+        the input file. Otherwise the missing messages are appended at the end.
+    output_file_path -- filepath of the output file. If this is left as None,
+        then it defaults to the input_file with the output language appended
+        to it.
+    input_lang -- the language of the input file. (default en)
+    translator_region -- the region of the Azure translator resource.
+        (default eastus2)
+    remove_backslashes -- when true, backslashes from multiline values are
+        not included in the text that gets translated.
+    workers -- number of requests to send at the same time. (default 1)
+    cache -- a TranslationCache to reuse earlier translations from.
+        (default None)
+    incremental -- when true, messages whose value in the input file changed
+        since they were translated are translated again and replaced in the
+        output file. The hashes of the translated values are kept in a
+        manifest next to the output file. If there is no manifest yet, then
+        the existing messages of the output file are assumed to be up to date.
+    rate_limiter -- a RateLimiter that keeps the requests within the quota
+        of the subscription. (default RateLimiter() without a quota)
+    backend -- the TranslatorBackend that translates the messages.
+        (default AzureTranslatorBackend(translator_region))
+    keys -- a list of keys and glob patterns of keys. When given, only the
+        missing and changed messages they select are translated. (default None)
+    skip_list -- a SkipList of the values that are copied to the output
+        file as they are instead of being translated. (default None)
+    """
     if not Path(input_file_path).exists():
         raise FileNotFoundError(f"File {input_file_path} does not exist")
 
@@ -46,66 +177,131 @@ def translate_missing_messages(
     if not Path(output_file_path).exists():
         raise FileNotFoundError(f"File {output_file_path} does not exist")
 
-    # Parse the input file and output file into a dictionary
-    input_data = parse_i18n_file(input_file_path, remove_backslashes)
-    output_data = parse_i18n_file(output_file_path, remove_backslashes)
+    # Read the input file and output file once and get their data
+    # as a dictionary
+    with phase("parse"):
+        input_document = read_i18n_document(input_file_path)
+        output_document = read_i18n_document(output_file_path)
+        input_data = input_document.to_dict(remove_backslashes)
+        output_data = output_document.to_dict(remove_backslashes)
+        selected_keys = input_data
+        if keys is not None:
+            selected_keys = input_document.select_keys(keys)
 
-    # Find any i18n messages missing from the output file
-    # and put those keys and values in the payload_data dictionary
-    missing_message_keys = []
-    payload_data = {}
-    for key in input_data:
-        if key not in output_data:
-            missing_message_keys.append(key)
-            payload_data[key] = input_data[key]
+    source_hashes = {}
+    manifest = None
+    if incremental:
+        source_hashes = {key: hash_value(value) for key, value in input_data.items()}
+        manifest_path = get_manifest_filepath(output_file_path)
+        manifest = read_manifest(manifest_path)
+        if manifest is None:
+            print(
+                f"No manifest found for {output_file_path}, so its existing "
+                "messages are assumed to be up to date"
+            )
 
-    message_count = len(missing_message_keys)
+    # Find any i18n messages missing from the output file, and in
+    # incremental mode any messages whose source value changed since they
+    # were translated, and put those keys and values in payload_data
+    missing_message_keys, changed_message_keys, payload_data = find_pending_messages(
+        input_data, output_data, selected_keys, manifest, source_hashes
+    )
+
+    if incremental and keys is not None and manifest is not None:
+        # The messages that were not selected keep the hashes of the values
+        # they were translated from, so a later run still finds them changed
+        source_hashes = {
+            key: (
+                manifest.get(key, source_hash)
+                if key not in payload_data
+                else source_hash
+            )
+            for key, source_hash in source_hashes.items()
+        }
+
+    message_count = len(payload_data)
     if message_count == 0:
+        if incremental:
+            write_manifest(manifest_path, source_hashes)
         print(
             f"No messages to translate. \n{output_file_path} already has all the "
             f"same messages as {input_file_path}"
         )
         return
 
-    print(f"About to translate {message_count} missing messages")
+    print(f"About to translate {len(missing_message_keys)} missing messages")
+    if incremental:
+        print(f"About to translate {len(changed_message_keys)} changed messages")
 
-    response_object = i18ntools.translate.make_api_call(
-        payload_data, output_lang, input_lang, translator_region
-    )
-
-    # Open the output file in read mode to read its contents
-    with open(output_file_path, "r", encoding="utf-8") as f:
-        output_file_contents = f.readlines()
+    with phase("translate"):
+        response_object = i18ntools.translate.make_api_call(
+            payload_data,
+            output_lang,
+            input_lang,
+            translator_region,
+            workers=workers,
+            cache=cache,
+            rate_limiter=rate_limiter,
+            backend=backend,
+            skip_list=skip_list,
+        )
+    # Extract the translated text from the response
+    translations = {
+        key: response_object[index]["translations"][0]["text"]
+        for index, key in enumerate(payload_data)
+    }
 
-    for index, key in enumerate(missing_message_keys):
-        # Extract the translated text from the response
-        translated_text = response_object[index]["translations"][0]["text"]
-        output_file_contents.append(f"{key}={translated_text}\n")
+    # Replace the changed messages in place and add the missing messages
+    # at the end of the output file
+    for key in payload_data:
+        output_document.set_value(key, translations[key])
+    if sort_file:
+        with phase("sort"):
+            output_document, _ = sort_i18n_document(input_document, output_document)
 
-    # Open the output file in write mode to write the updated contents
-    with open(output_file_path, "w", encoding="utf-8") as f:
-        f.writelines(output_file_contents)
+    # Write the updated contents to the output file
+    with phase("write"):
+        write_i18n_document(output_document, output_file_path)
+        if incremental:
+            write_manifest(manifest_path, source_hashes)
     print(
         "Translation completed successfully. Translated messages added to file:",
         output_file_path,
     )
     if sort_file:
-        sort_i18n_file(input_file_path, output_lang, output_file_path)
+        print("i18n translation file sorted successfully:", output_file_path)
 
 
 def main():
     """Build a CLI for calling translate_missing_messages"""
+    # Import here since dry_run imports this module and translate_tree
+    # imports the translate module
+    from i18ntools.dry_run import (
+        add_dry_run_arguments,
+        get_plan,
+        open_read_only_cache,
+        plan_translate_missing_messages,
+        plan_translate_tree,
+        report_plan,
+    )
+    from i18ntools.translate_tree import (
+        add_tree_arguments,
+        missing_mode,
+        translate_tree,
+    )
+
     parser = argparse.ArgumentParser(description=__doc__)
-    parser.add_argument(
+    input_group = parser.add_mutually_exclusive_group(required=True)
+    input_group.add_argument(
         "-i",
         "--input_file",
-        required=True,
         type=str,
         help=(
             "filename of input Java properties file. "
             "Can be specified as a relative or absolute file path."
         ),
     )
+    add_tree_arguments(parser, input_group)
     parser.add_argument(
         "-f",
         "--from_lang",
@@ -168,16 +364,150 @@ def main():
             "will be appended at the end of the output file."
         ),
     )
-    args = parser.parse_args()
-    translate_missing_messages(
-        args.input_file,
-        args.to,
-        args.sort,
-        args.output_file,
-        args.from_lang,
-        args.region,
-        args.remove_backslashes,
+    parser.add_argument(
+        "-w",
+        "--workers",
+        required=False,
+        type=int,
+        default=i18ntools.translate.default_workers,
+        help=(
+            "number of requests to send to the Azure translator at the same time "
+            "when there are too many missing messages for one request. Defaults to 1"
+        ),
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help=(
+            "also translate the messages whose value in the input file changed "
+            "since they were last translated, and replace them in the output file. "
+            f"The source values are tracked in a {manifest_suffix} file next to "
+            "the output file."
+        ),
+    )
+    parser.add_argument(
+        "--no_cache",
+        "--no-cache",
+        action="store_true",
+        help=(
+            "do not look up or save translations in the translation cache, "
+            "so every missing message is sent to the Azure translator."
+        ),
+    )
+    parser.add_argument(
+        "--cache_path",
+        "--cache-path",
+        required=False,
+        type=str,
+        help=(
+            "filepath of the translation cache. Defaults to "
+            "translations.sqlite3 in the i18ntools folder of the user's "
+            "cache directory."
+        ),
     )
+    add_key_selection_arguments(parser)
+    add_skip_list_arguments(parser)
+    add_dry_run_arguments(parser)
+    add_endpoint_arguments(parser)
+    add_rate_limit_arguments(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    if args.input_dir is not None and args.output_file is not None:
+        parser.error("--output_file cannot be used with --input_dir")
+    if args.input_dir is not None and args.incremental:
+        parser.error("--incremental cannot be used with --input_dir")
+    keys = key_patterns_from_args(args)
+    if args.input_dir is not None and keys is not None:
+        parser.error("--keys and --keys_from cannot be used with --input_dir")
+    skip_list = skip_list_from_args(args)
+    if args.character_budget is not None and not args.dry_run:
+        parser.error("--character_budget can only be used with --dry_run")
+    if args.dry_run:
+        cache = None if args.no_cache else open_read_only_cache(args.cache_path)
+        try:
+            if args.input_dir is not None:
+                dry_run_backend = plan_translate_tree(
+                    args.input_dir,
+                    args.to,
+                    missing_mode,
+                    include=args.include,
+                    exclude=args.exclude,
+                    input_lang=args.from_lang,
+                    remove_backslashes=args.remove_backslashes,
+                    workers=args.workers,
+                    cache=cache,
+                    skip_list=skip_list,
+                )
+            else:
+                dry_run_backend = plan_translate_missing_messages(
+                    args.input_file,
+                    args.to,
+                    args.output_file,
+                    args.from_lang,
+                    args.remove_backslashes,
+                    args.workers,
+                    cache,
+                    args.incremental,
+                    keys,
+                    skip_list,
+                )
+        finally:
+            if cache is not None:
+                cache.close()
+        plan = get_plan(
+            dry_run_backend,
+            args.workers,
+            args.characters_per_minute,
+            args.requests_per_minute,
+        )
+        if not report_plan(plan, args.plan_json, args.character_budget):
+            sys.exit(1)
+        return
+    rate_limiter = rate_limiter_from_args(args)
+    backend = backend_from_args(args, rate_limiter)
+    cache = None if args.no_cache else TranslationCache(args.cache_path)
+    try:
+        with metrics_from_args(args):
+            if args.input_dir is not None:
+                translate_tree(
+                    args.input_dir,
+                    args.to,
+                    missing_mode,
+                    include=args.include,
+                    exclude=args.exclude,
+                    sort_file=args.sort,
+                    input_lang=args.from_lang,
+                    translator_region=args.region,
+                    remove_backslashes=args.remove_backslashes,
+                    workers=args.workers,
+                    processes=args.processes,
+                    cache=cache,
+                    rate_limiter=rate_limiter,
+                    backend=backend,
+                    skip_list=skip_list,
+                )
+                return
+            translate_missing_messages(
+                args.input_file,
+                args.to,
+                args.sort,
+                args.output_file,
+                args.from_lang,
+                args.region,
+                args.remove_backslashes,
+                args.workers,
+                cache,
+                args.incremental,
+                rate_limiter,
+                backend,
+                keys,
+                skip_list,
+            )
+    finally:
+        if backend is not None:
+            backend.close()
+        if cache is not None:
+            cache.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,111 @@
+"""Reads the requests for the translate method of the Translator API v3, for
+the local servers that answer it: the stand-in in i18ntools.fake_translator
+and the translation service of i18ntools.serve.
+
+A request is checked against the same limits the Translator API enforces
+before its texts are handed to the server, and its body is not read at all
+when it is larger than the server accepts.
+"""
+
+import json
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlparse
+
+# Maximum number of array elements the Translator API accepts in one request.
+max_elements = 1000
+# Maximum number of characters the Translator API accepts in one request,
+# counted once per output language.
+max_characters = 50000
+# Default maximum number of bytes in the body of a request. Every character
+# of a request that is within max_characters fits, even escaped as \uXXXX.
+default_max_body_size = 1 << 20
+
+
+class TranslateRequestHandler(BaseHTTPRequestHandler):
+    """Reads requests for the translate method of the Translator API v3 and
+    answers them with JSON, like the Translator API does.
+
+    The server it is used with needs a verbose attribute and a max_body_size
+    attribute with the maximum number of bytes in the body of a request.
+    """
+
+    def read_translate_request(self):
+        """Returns a tuple of the language to translate from, the list of the
+        languages to translate into and the list of the texts of the request,
+        or None if the request is not valid, in which case the error was
+        already sent. The language to translate from is None if the request
+        does not have one.
+        """
+        url = urlparse(self.path)
+        if url.path.rstrip("/") != "/translate":
+            self.send_error_json(404, 404000, "The requested resource was not found.")
+            return None
+        query = parse_qs(url.query)
+        to_langs = query.get("to", [])
+        if len(to_langs) == 0:
+            self.send_error_json(400, 400036, "The target language is not valid.")
+            return None
+
+        try:
+            content_length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            content_length = -1
+        if content_length < 0:
+            self.send_error_json(400, 400074, "The body of the request is not valid.")
+            return None
+        if content_length > self.server.max_body_size:
+            # The body is left unread, so the connection cannot be reused
+            self.close_connection = True
+            self.send_error_json(413, 413000, "The request is too large.")
+            return None
+        try:
+            request_payload = json.loads(self.rfile.read(content_length))
+            texts = [item.get("text", item.get("Text")) for item in request_payload]
+        except (ValueError, AttributeError, TypeError):
+            texts = None
+        if texts is None or any(not isinstance(text, str) for text in texts):
+            self.send_error_json(400, 400074, "The body of the request is not valid.")
+            return None
+        characters = sum(len(text) for text in texts) * len(to_langs)
+        if len(texts) > max_elements or characters > max_characters:
+            self.send_error_json(400, 400077, "The maximum request size was exceeded.")
+            return None
+        return query.get("from", [None])[0], to_langs, texts
+
+    def send_translations(self, translations, to_langs):
+        """Answers with the translations of each text.
+
+        Keyword arguments:
+        translations -- a list with a list of the translations of each text,
+            in the order of to_langs
+        to_langs -- a list of the languages the texts were translated into
+        """
+        self.send_json(
+            200,
+            [
+                {
+                    "translations": [
+                        {"text": text, "to": lang}
+                        for text, lang in zip(text_translations, to_langs)
+                    ]
+                }
+                for text_translations in translations
+            ],
+        )
+
+    def send_json(self, status, body, headers=None):
+        encoded_body = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(encoded_body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(encoded_body)
+
+    def send_error_json(self, status, code, message, headers=None):
+        self.send_json(status, {"error": {"code": code, "message": message}}, headers)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
@@ -0,0 +1,319 @@
+"""Translates, translates the missing messages of, or sorts every i18n Java
+properties bundle in a directory tree.
+
+A base bundle is a .properties file without a language code at the end of
+its name, i.e. messages.properties and error_messages.properties but not
+messages_de.properties. The output file of
+each base bundle and language is found with get_default_filepath.
+
+Reading, comparing and writing the files is spread over a pool of processes,
+while the messages of all the files are packed into shared requests to the
+Azure translator by translate_jobs.
+"""
+
+import fnmatch
+import os
+from pathlib import Path
+
+from i18ntools.i18n_document import (
+    has_language_suffix,
+    read_i18n_document,
+    write_i18n_document,
+)
+from i18ntools.metrics import phase
+from i18ntools.sort_i18n_file import sort_i18n_document
+from i18ntools.translate import (
+    default_lang,
+    default_region,
+    default_workers,
+    get_default_filepath,
+    partial_suffix,
+    split_languages,
+)
+
+# Translate every message of each base bundle into a new file.
+translate_mode = "translate"
+# Translate the messages missing from the existing output files.
+missing_mode = "missing"
+# Sort the messages of the existing output files.
+sort_mode = "sort"
+# Files considered when no include patterns are given.
+default_include = ("*.properties",)
+
+
+def find_base_bundles(input_dir, include=None, exclude=None):
+    """Returns a sorted list of the filepaths of the base bundles in
+    the directory tree.
+
+    Keyword arguments:
+    input_dir -- the directory to search
+    include -- a list of glob patterns, matched against the path relative to
+        input_dir, that a file must match. (default ["*.properties"])
+    exclude -- a list of glob patterns, matched against the path relative to
+        input_dir, of files to skip. (default None)
+    """
+    if not Path(input_dir).is_dir():
+        raise FileNotFoundError(f"Directory {input_dir} does not exist")
+
+    include = include or default_include
+    exclude = exclude or ()
+    bundles = []
+    for directory, directory_names, filenames in os.walk(input_dir):
+        # Walk the tree in a stable order
+        directory_names.sort()
+        for filename in sorted(filenames):
+            file_path = os.path.join(directory, filename)
+            relative_path = Path(os.path.relpath(file_path, input_dir)).as_posix()
+            if not any(
+                fnmatch.fnmatch(relative_path, pattern)
+                or fnmatch.fnmatch(filename, pattern)
+                for pattern in include
+            ):
+                continue
+            if any(
+                fnmatch.fnmatch(relative_path, pattern)
+                or fnmatch.fnmatch(filename, pattern)
+                for pattern in exclude
+            ):
+                continue
+            # Files named with a language code are translations
+            if has_language_suffix(filename):
+                continue
+            bundles.append(file_path)
+    return bundles
+
+
+def plan_bundle(input_file_path, output_langs, mode, remove_backslashes, sort_file):
+    """Reads a base bundle and its output files and returns a list of
+    (output_lang, output_file_path, payload_data) tuples for the messages
+    that need to be translated. Files that only need sorting are sorted here.
+
+    This runs in a worker process, so its arguments and result are pickled.
+
+    Keyword arguments:
+    input_file_path -- filepath of the base bundle
+    output_langs -- a list of the output languages
+    mode -- one of translate_mode, missing_mode or sort_mode
+    remove_backslashes -- when true, backslashes from multiline values are
+        not included in the text that gets translated.
+    sort_file -- when true, output files are sorted like the base bundle.
+    """
+    input_document = read_i18n_document(input_file_path)
+    input_data = input_document.to_dict(remove_backslashes)
+    plans = []
+    for lang in output_langs:
+        output_file_path = get_default_filepath(input_file_path, lang)
+        if mode == translate_mode:
+            plans.append((lang, output_file_path, input_data))
+            continue
+
+        if not Path(output_file_path).exists():
+            print(f"Skipping {output_file_path} since it does not exist")
+            continue
+        output_document = read_i18n_document(output_file_path)
+        if mode == sort_mode:
+            sorted_document, _ = sort_i18n_document(input_document, output_document)
+            write_i18n_document(sorted_document, output_file_path)
+            print("i18n translation file sorted successfully:", output_file_path)
+            continue
+
+        output_data = output_document.to_dict(remove_backslashes)
+        payload_data = {
+            key: value for key, value in input_data.items() if key not in output_data
+        }
+        if len(payload_data) > 0 or sort_file:
+            plans.append((lang, output_file_path, payload_data))
+    return plans
+
+
+def write_bundle(input_file_path, output_file_path, mode, translations, sort_file):
+    """Writes the translations of a base bundle to its output file.
+
+    The file is written to a partial file first, which replaces the output
+    file once it is complete, so an output file is never left half written.
+    This runs in a worker process, so its arguments are pickled.
+
+    Keyword arguments:
+    input_file_path -- filepath of the base bundle
+    output_file_path -- filepath of the output file
+    mode -- translate_mode or missing_mode
+    translations -- a dictionary of the keys and their translated values
+    sort_file -- when true, the output file is sorted like the base bundle.
+    """
+    input_document = read_i18n_document(input_file_path)
+    if mode == translate_mode:
+        output_document = input_document.with_values(
+            [translations[key] for key in input_document.keys()]
+        )
+    else:
+        output_document = read_i18n_document(output_file_path)
+        for key, value in translations.items():
+            output_document.set_value(key, value)
+        if sort_file:
+            output_document, _ = sort_i18n_document(input_document, output_document)
+    partial_file_path = f"{output_file_path}{partial_suffix}"
+    try:
+        write_i18n_document(output_document, partial_file_path)
+    except BaseException:
+        Path(partial_file_path).unlink(missing_ok=True)
+        raise
+    os.replace(partial_file_path, output_file_path)
+    print("Translated file saved to:", output_file_path)
+
+
+def translate_tree(
+    input_dir,
+    output_lang,
+    mode=translate_mode,
+    include=None,
+    exclude=None,
+    sort_file=False,
+    input_lang=default_lang,
+    translator_region=default_region,
+    remove_backslashes=False,
+    workers=default_workers,
+    processes=None,
+    cache=None,
+    rate_limiter=None,
+    backend=None,
+    skip_list=None,
+):
+    """Translates, translates the missing messages of, or sorts every base
+    bundle in a directory tree.
+
+    Keyword arguments:
+    input_dir -- the directory to search for base bundles
+    output_lang -- language of the output files i.e. de for German. Can also
+        be a comma separated string or a list of several languages.
+    mode -- translate_mode to translate every message into new output files,
+        missing_mode to translate the messages missing from existing output
+        files, or sort_mode to sort existing output files.
+        (default translate_mode)
+    include -- a list of glob patterns of the files to include.
+        (default ["*.properties"])
+    exclude -- a list of glob patterns of the files to skip. (default None)
+    sort_file -- in missing_mode, sort the output files like the base bundles.
+    input_lang -- the language of the base bundles. (default en)
+    translator_region -- the region of the Azure translator resource.
+        (default eastus2)
+    remove_backslashes -- when true, backslashes from multiline values are
+        not included in the text that gets translated.
+    workers -- number of requests to send at the same time. (default 1)
+    processes -- number of processes that read and write the files.
+        Defaults to the number of CPUs.
+    cache -- a TranslationCache to reuse earlier translations from.
+        (default None)
+    rate_limiter -- a RateLimiter that keeps the requests within the quota
+        of the subscription. (default RateLimiter() without a quota)
+    backend -- the TranslatorBackend that translates the messages.
+        (default AzureTranslatorBackend(translator_region))
+    skip_list -- a SkipList of the values that are copied to the output
+        files as they are instead of being translated. (default None)
+    """
+    if mode not in (translate_mode, missing_mode, sort_mode):
+        raise ValueError(f"Unknown mode: {mode}")
+    # Import here so that the scripts only import what they need for
+    # translating a directory tree when they are asked to
+    from concurrent.futures import ProcessPoolExecutor
+
+    from i18ntools.job_planner import translate_jobs
+
+    output_langs = split_languages(output_lang)
+    bundles = find_base_bundles(input_dir, include, exclude)
+    print(f"Found {len(bundles)} base bundles in {input_dir}")
+
+    with ProcessPoolExecutor(max_workers=processes) as process_pool:
+        # Read and compare the files in parallel
+        with phase("plan"):
+            bundle_plans = list(
+                process_pool.map(
+                    plan_bundle,
+                    bundles,
+                    [output_langs] * len(bundles),
+                    [mode] * len(bundles),
+                    [remove_backslashes] * len(bundles),
+                    [sort_file] * len(bundles),
+                )
+            )
+        if mode == sort_mode:
+            return
+
+        jobs = [
+            (input_file_path, lang, output_file_path, payload_data)
+            for input_file_path, plans in zip(bundles, bundle_plans)
+            for lang, output_file_path, payload_data in plans
+        ]
+
+        # Pack the messages of every file with the same output language
+        # into shared requests, sent through one pooled session
+        with phase("translate"):
+            translations = translate_jobs(
+                [(lang, payload_data) for _, lang, _, payload_data in jobs],
+                input_lang,
+                translator_region,
+                workers=workers,
+                cache=cache,
+                rate_limiter=rate_limiter,
+                backend=backend,
+                skip_list=skip_list,
+            )
+
+        # Write the files in parallel
+        with phase("write"):
+            list(
+                process_pool.map(
+                    write_bundle,
+                    [job[0] for job in jobs],
+                    [job[2] for job in jobs],
+                    [mode] * len(jobs),
+                    translations,
+                    [sort_file] * len(jobs),
+                )
+            )
+    print(f"Translation completed successfully for {len(jobs)} files")
+
+
+def add_tree_arguments(parser, input_group):
+    """Adds the CLI options for translating a directory tree to a parser.
+
+    Keyword arguments:
+    parser -- the argparse.ArgumentParser of the CLI script
+    input_group -- the mutually exclusive group of the --input_file option
+    """
+    input_group.add_argument(
+        "-d",
+        "--input_dir",
+        type=str,
+        help=(
+            "directory to search for base bundles, i.e. messages.properties, "
+            "instead of using a single input file. Each output file is the "
+            "base bundle with the output language appended to it."
+        ),
+    )
+    parser.add_argument(
+        "--include",
+        action="append",
+        type=str,
+        help=(
+            "glob pattern of the files in --input_dir to include. "
+            "Can be used more than once. Defaults to *.properties"
+        ),
+    )
+    parser.add_argument(
+        "--exclude",
+        action="append",
+        type=str,
+        help=(
+            "glob pattern of the files in --input_dir to skip. "
+            "Can be used more than once."
+        ),
+    )
+    parser.add_argument(
+        "--processes",
+        required=False,
+        type=int,
+        help=(
+            "number of processes that read and write the files in --input_dir. "
+            "Defaults to the number of CPUs."
+        ),
+    )
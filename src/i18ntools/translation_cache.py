@@ -0,0 +1,198 @@
+"""A persistent translation memory that remembers the translations returned
+by the Azure Cognitive Services Translator, so the same text does not have
+to be sent (and billed) again.
+
+The translations are stored in a SQLite database keyed on the source text,
+the language it was translated from and the language it was translated to.
+The source text is normalized to Unicode NFC form before it is used as a key,
+but whitespace is kept as is because it is part of the i18n value.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+
+# Default maximum number of translations kept in the cache.
+default_max_entries = 1_000_000
+# Default number of days a translation is kept in the cache.
+default_max_age_days = 365
+
+
+def get_default_cache_path():
+    """Returns the filepath of the translation cache used by the CLI scripts.
+
+    The cache is saved in the user's cache directory, which is
+    $XDG_CACHE_HOME (or ~/.cache) on Linux and macOS and
+    %LOCALAPPDATA% on Windows.
+    """
+    cache_dir = os.environ.get("XDG_CACHE_HOME") or os.environ.get("LOCALAPPDATA")
+    if not cache_dir:
+        cache_dir = Path.home() / ".cache"
+    return Path(cache_dir) / "i18ntools" / "translations.sqlite3"
+
+
+def normalize_text(text):
+    """Returns the text in the form used as a key in the translation cache.
+
+    Keyword arguments:
+    text -- the source text of a translation
+    """
+    return unicodedata.normalize("NFC", text)
+
+
+class TranslationCache:
+    """A translation memory saved in a SQLite database.
+
+    The cache can be used as a context manager, in which case it is closed
+    (and old translations are evicted) when the with block exits.
+
+    Keyword arguments:
+    cache_path -- filepath of the SQLite database. It is created if it
+        does not exist. (default get_default_cache_path())
+    max_entries -- maximum number of translations to keep. The least recently
+        used translations are evicted first. (default 1000000)
+    max_age_days -- number of days after which a translation is evicted.
+        (default 365)
+    read_only -- when true, the database must already exist and is opened
+        read-only: translations can be looked up, but nothing is written to
+        it, not even when they were last used. (default False)
+    """
+
+    def __init__(
+        self,
+        cache_path=None,
+        max_entries=default_max_entries,
+        max_age_days=default_max_age_days,
+        read_only=False,
+    ):
+        if cache_path is None:
+            cache_path = get_default_cache_path()
+        self.cache_path = cache_path
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.read_only = read_only
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.RLock()
+        if read_only:
+            # Let SQLite refuse every write, and never create the file
+            uri = f"{Path(cache_path).resolve().as_uri()}?mode=ro"
+            self.connection = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            return
+
+        Path(cache_path).parent.mkdir(parents=True, exist_ok=True)
+        # The cache may be shared by the threads that send requests,
+        # so every use of the connection holds the lock
+        self.connection = sqlite3.connect(cache_path, check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            " source TEXT NOT NULL,"
+            " from_lang TEXT NOT NULL,"
+            " to_lang TEXT NOT NULL,"
+            " translation TEXT NOT NULL,"
+            " created REAL NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " PRIMARY KEY (source, from_lang, to_lang))"
+        )
+        self.connection.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def lookup(self, text, from_lang, to_langs):
+        """Returns a list with the cached translation of text into each
+        of to_langs, or None if any of them is not in the cache.
+
+        Keyword arguments:
+        text -- the source text to look up
+        from_lang -- the language of the source text i.e. en for English
+        to_langs -- a list of the languages to look up i.e. ["de", "fr"]
+        """
+        source = normalize_text(text)
+        translations = []
+        with self.lock:
+            for to_lang in to_langs:
+                row = self.connection.execute(
+                    "SELECT translation FROM translations"
+                    " WHERE source = ? AND from_lang = ? AND to_lang = ?",
+                    (source, from_lang, to_lang),
+                ).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                translations.append(row[0])
+
+            self.hits += 1
+            if self.read_only:
+                return translations
+            self.connection.execute(
+                "UPDATE translations SET last_used = ?"
+                " WHERE source = ? AND from_lang = ?",
+                (time.time(), source, from_lang),
+            )
+        return translations
+
+    def store(self, text, from_lang, to_langs, translations):
+        """Saves the translations of text into each of to_langs.
+
+        Keyword arguments:
+        text -- the source text that was translated
+        from_lang -- the language of the source text i.e. en for English
+        to_langs -- a list of the languages text was translated into
+        translations -- a list of the translations, in the order of to_langs
+        """
+        now = time.time()
+        source = normalize_text(text)
+        with self.lock:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO translations"
+                " (source, from_lang, to_lang, translation, created, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (source, from_lang, to_lang, translation, now, now)
+                    for to_lang, translation in zip(to_langs, translations)
+                ],
+            )
+
+    def save(self):
+        """Saves the translations stored since the last save to the database."""
+        with self.lock:
+            self.connection.commit()
+
+    def evict(self):
+        """Removes translations older than max_age_days and then the least
+        recently used translations until at most max_entries remain.
+        """
+        oldest_allowed = time.time() - self.max_age_days * 24 * 60 * 60
+        with self.lock:
+            self.connection.execute(
+                "DELETE FROM translations WHERE created < ?", (oldest_allowed,)
+            )
+            self.connection.execute(
+                "DELETE FROM translations WHERE rowid IN ("
+                " SELECT rowid FROM translations"
+                " ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self.connection.commit()
+
+    def __len__(self):
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT COUNT(*) FROM translations"
+            ).fetchone()
+        return row[0]
+
+    def close(self):
+        """Evicts old translations, saves the cache and closes the database.
+        A read-only cache is only closed."""
+        if not self.read_only:
+            self.evict()
+        with self.lock:
+            self.connection.close()
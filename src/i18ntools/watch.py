@@ -0,0 +1,544 @@
+#!/usr/bin/env python
+"""This script watches i18n Java properties files and translates the messages
+that are added or changed in them into their output files as they are saved,
+by making REST API calls to Microsoft Azure Cognitive Services Translator.
+
+The output file of each input file and language is the input file with the
+language appended to it, i.e. messages.properties would become
+messages_de.properties . Output files that do not exist yet are created.
+
+When it starts, the messages missing from the output files are translated.
+Afterwards, each saved input file is compared with how it was before, and only
+its new and changed messages are translated. Saves that follow each other
+closely are handled together, and all the requests are sent over one pool of
+connections that is kept open.
+
+Requires the API secret key to be set in an environment variable
+named TRANSLATOR_API_SUBSCRIPTION_KEY .
+"""
+
+import argparse
+import os
+import time
+from pathlib import Path
+
+from i18ntools.backends import (
+    AzureTranslatorBackend,
+    add_endpoint_arguments,
+    backend_from_args,
+)
+from i18ntools.i18n_document import (
+    get_default_filepath,
+    read_i18n_document,
+    write_i18n_document,
+)
+from i18ntools.job_planner import translate_jobs
+from i18ntools.rate_limit import (
+    RateLimiter,
+    add_rate_limit_arguments,
+    rate_limiter_from_args,
+)
+from i18ntools.skip_list import add_skip_list_arguments, skip_list_from_args
+from i18ntools.sort_i18n_file import sort_i18n_document
+from i18ntools.translate import (
+    default_lang,
+    default_region,
+    default_workers,
+    split_languages,
+)
+from i18ntools.translate_missing import (
+    get_manifest_filepath,
+    hash_value,
+    read_manifest,
+    write_manifest,
+)
+
+# Default number of seconds between checks of the input files.
+default_poll_interval = 0.5
+# Default number of seconds an input file must be left unchanged before it
+# is translated, so that a burst of saves is handled together.
+default_debounce = 1.0
+
+
+def get_file_signature(file_path):
+    """Returns the modification time and size of a file, which change when
+    the file is saved, or None if the file does not exist.
+
+    Keyword arguments:
+    file_path -- filepath of the file
+    """
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def diff_messages(previous_data, input_data):
+    """Returns a list of the keys in input_data that are new or whose value
+    changed since previous_data, in the order of input_data.
+
+    Keyword arguments:
+    previous_data -- a dictionary of the keys and values before the change
+    input_data -- a dictionary of the keys and values after the change
+    """
+    return [
+        key
+        for key, value in input_data.items()
+        if key not in previous_data or previous_data[key] != value
+    ]
+
+
+class BundleWatcher:
+    """Translates the new and changed messages of i18n Java properties files
+    into their output files whenever the files are saved.
+
+    The watcher can be used as a context manager, in which case its
+    connections are closed when the with block exits.
+
+    Keyword arguments:
+    input_file_paths -- a list of the filepaths of the files to watch
+    output_lang -- language of the output files i.e. de for German. Can also
+        be a comma separated string or a list of several languages.
+    input_lang -- the language of the input files. (default en)
+    translator_region -- the region of the Azure translator resource.
+        (default eastus2)
+    remove_backslashes -- when true, backslashes from multiline values are
+        not included in the text that gets translated.
+    sort_file -- when true, the output files are sorted like the input files.
+        Otherwise new messages are appended at the end of the output files.
+    workers -- number of requests to send at the same time. (default 1)
+    cache -- a TranslationCache to reuse earlier translations from.
+        (default None)
+    rate_limiter -- a RateLimiter that keeps the requests within the quota
+        of the subscription. (default RateLimiter() without a quota)
+    backend -- the TranslatorBackend that translates the messages. If this
+        is left as None, then an AzureTranslatorBackend is created and kept
+        open until the watcher is closed.
+    debounce -- number of seconds an input file must be left unchanged
+        before it is translated. (default 1.0)
+    clock -- function that returns the current time in seconds.
+        (default time.monotonic)
+    skip_list -- a SkipList of the values that are copied to the output
+        files as they are instead of being translated. (default None)
+    document_cache -- a DocumentCache to reuse the documents of the files
+        that did not change since the last sync from, instead of parsing
+        them again. (default None)
+    """
+
+    def __init__(
+        self,
+        input_file_paths,
+        output_lang,
+        input_lang=default_lang,
+        translator_region=default_region,
+        remove_backslashes=False,
+        sort_file=False,
+        workers=default_workers,
+        cache=None,
+        rate_limiter=None,
+        backend=None,
+        debounce=default_debounce,
+        clock=time.monotonic,
+        skip_list=None,
+        document_cache=None,
+    ):
+        for input_file_path in input_file_paths:
+            if not Path(input_file_path).exists():
+                raise FileNotFoundError(f"File {input_file_path} does not exist")
+        self.input_file_paths = list(input_file_paths)
+        self.output_langs = split_languages(output_lang)
+        self.input_lang = input_lang
+        self.translator_region = translator_region
+        self.workers = workers
+        self.remove_backslashes = remove_backslashes
+        self.sort_file = sort_file
+        self.cache = cache
+        self.debounce = debounce
+        self.clock = clock
+        self.skip_list = skip_list
+        self.document_cache = document_cache
+        self.owns_backend = backend is None
+        if backend is None:
+            # Keep one backend, and so one pool of connections, for the
+            # whole time the files are watched
+            backend = AzureTranslatorBackend(
+                translator_region,
+                workers=workers,
+                rate_limiter=RateLimiter() if rate_limiter is None else rate_limiter,
+            )
+        self.backend = backend
+        # The signature and parsed messages of each input file when it was
+        # last translated, and when a change to it was last seen
+        self.signatures = {}
+        self.previous_data = {}
+        self.changed_at = {}
+
+    def poll(self):
+        """Checks the input files for changes and returns a list of the
+        filepaths of the ones that changed and were then left unchanged
+        for the debounce time.
+        """
+        now = self.clock()
+        ready = []
+        for input_file_path in self.input_file_paths:
+            signature = get_file_signature(input_file_path)
+            if signature is None:
+                # The file is being replaced, i.e. by an editor saving it
+                continue
+            if signature != self.signatures.get(input_file_path):
+                self.signatures[input_file_path] = signature
+                self.changed_at[input_file_path] = now
+            elif (
+                input_file_path in self.changed_at
+                and now - self.changed_at[input_file_path] >= self.debounce
+            ):
+                del self.changed_at[input_file_path]
+                ready.append(input_file_path)
+        return ready
+
+    def sync(self, input_file_paths):
+        """Translates the new and changed messages of the input files, and
+        the messages missing from their output files, into every output
+        language and returns the number of messages translated.
+
+        Keyword arguments:
+        input_file_paths -- a list of the filepaths of the input files to sync
+        """
+        parsed_data = {}
+        updates = []
+        jobs = []
+        for input_file_path in input_file_paths:
+            input_document = read_i18n_document(input_file_path, self.document_cache)
+            input_data = input_document.to_dict(self.remove_backslashes)
+            parsed_data[input_file_path] = input_data
+            changed_keys = set(
+                diff_messages(
+                    self.previous_data.get(input_file_path, input_data), input_data
+                )
+            )
+            for lang in self.output_langs:
+                output_file_path = get_default_filepath(input_file_path, lang)
+                output_document = None
+                output_keys = set()
+                if Path(output_file_path).exists():
+                    output_document = read_i18n_document(
+                        output_file_path, self.document_cache
+                    )
+                    output_keys = set(output_document.keys())
+                payload_data = {
+                    key: value
+                    for key, value in input_data.items()
+                    if key in changed_keys or key not in output_keys
+                }
+                updates.append(
+                    (input_document, input_data, output_document, output_file_path)
+                )
+                jobs.append((lang, payload_data))
+
+        # Translate the messages of every file and language together
+        translations = translate_jobs(
+            jobs,
+            self.input_lang,
+            self.translator_region,
+            workers=self.workers,
+            cache=self.cache,
+            backend=self.backend,
+            skip_list=self.skip_list,
+        )
+        for update, values in zip(updates, translations):
+            if len(values) > 0:
+                self.write_output(*update, values)
+
+        # Only remember the messages once they are translated, so that the
+        # changes of a file that failed are translated with its next change
+        self.previous_data.update(parsed_data)
+        return sum(len(values) for values in translations)
+
+    def write_output(
+        self, input_document, input_data, output_document, output_file_path, values
+    ):
+        """Writes the translated values to an output file, creating it if
+        there is no output_document.
+
+        Keyword arguments:
+        input_document -- the I18nDocument of the input file
+        input_data -- a dictionary of the keys and values of the input file
+        output_document -- the I18nDocument of the output file, or None if
+            it does not exist yet
+        output_file_path -- filepath of the output file
+        values -- a dictionary of the keys and their translated values
+        """
+        if output_document is None:
+            output_document = input_document.with_values(
+                [values[key] for key in input_document.keys()]
+            )
+        else:
+            for key, value in values.items():
+                output_document.set_value(key, value)
+            if self.sort_file:
+                output_document, _ = sort_i18n_document(input_document, output_document)
+        write_i18n_document(output_document, output_file_path, self.document_cache)
+
+        # Keep the manifest of translate_missing --incremental up to date,
+        # so it does not translate these messages again
+        manifest_path = get_manifest_filepath(output_file_path)
+        manifest = read_manifest(manifest_path)
+        if manifest is not None:
+            manifest.update({key: hash_value(input_data[key]) for key in values})
+            write_manifest(manifest_path, manifest)
+        print(f"Translated {len(values)} messages into {output_file_path}")
+
+    def run(self, poll_interval=default_poll_interval, stop=None, sleep=time.sleep):
+        """Translates the messages missing from the output files, then checks
+        the input files for changes every poll_interval seconds and translates
+        the ones that changed, until stop returns true or it is interrupted.
+
+        A change that cannot be read or translated, i.e. because the file was
+        saved with a duplicate key, is reported and translated with the next
+        change of the file.
+
+        Keyword arguments:
+        poll_interval -- number of seconds between checks of the input files.
+            (default 0.5)
+        stop -- function that returns true when watching should stop.
+            (default None, to watch until interrupted)
+        sleep -- function that waits for a number of seconds.
+            (default time.sleep)
+        """
+        # Start from the files as they are now
+        self.poll()
+        self.changed_at.clear()
+        self.sync_and_report(self.input_file_paths)
+        print(f"Watching {len(self.input_file_paths)} files for changes")
+        while stop is None or not stop():
+            sleep(poll_interval)
+            ready = self.poll()
+            if len(ready) > 0:
+                self.sync_and_report(ready)
+
+    def sync_and_report(self, input_file_paths):
+        """Syncs the input files and prints the error if it fails, so that
+        watching can go on."""
+        try:
+            message_count = self.sync(input_file_paths)
+        except (OSError, ValueError, SyntaxWarning) as e:
+            # requests.RequestException is an OSError too, and duplicate
+            # keys raise a SyntaxWarning
+            print(f"Could not translate {', '.join(input_file_paths)}: {e}")
+            return
+        if message_count == 0:
+            print(f"No messages to translate in {', '.join(input_file_paths)}")
+
+    def close(self):
+        """Closes the connections of the backend if the watcher created it."""
+        if self.owns_backend:
+            self.backend.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def main():
+    """Build a CLI for watching files with a BundleWatcher"""
+    # Import here since translate_tree imports the translate module
+    from i18ntools.translate_tree import find_base_bundles
+    from i18ntools.translation_cache import TranslationCache
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    input_group = parser.add_mutually_exclusive_group(required=True)
+    input_group.add_argument(
+        "-i",
+        "--input_file",
+        type=str,
+        nargs="+",
+        help=(
+            "filenames of the input Java properties files to watch. "
+            "Can be specified as relative or absolute file paths."
+        ),
+    )
+    input_group.add_argument(
+        "-d",
+        "--input_dir",
+        type=str,
+        help=(
+            "directory whose base bundles, i.e. messages.properties, are watched "
+            "instead of the input files. Bundles added later are not watched."
+        ),
+    )
+    parser.add_argument(
+        "--include",
+        action="append",
+        type=str,
+        help=(
+            "glob pattern of the files in --input_dir to watch. "
+            "Can be used more than once. Defaults to *.properties"
+        ),
+    )
+    parser.add_argument(
+        "--exclude",
+        action="append",
+        type=str,
+        help=(
+            "glob pattern of the files in --input_dir to skip. "
+            "Can be used more than once."
+        ),
+    )
+    parser.add_argument(
+        "-f",
+        "--from_lang",
+        required=False,
+        type=str,
+        nargs="?",
+        const=default_lang,
+        default=default_lang,
+        help="Language of the input files. Defaults to en",
+    )
+    parser.add_argument(
+        "-t",
+        "--to",
+        required=True,
+        type=str,
+        help=(
+            "Language(s) of the output files. For example, use de to translate "
+            "to German, or de,fr,es to keep a file of each language up to date."
+        ),
+    )
+    parser.add_argument(
+        "-r",
+        "--region",
+        required=False,
+        type=str,
+        nargs="?",
+        const=default_region,
+        default=default_region,
+        help="region of the Azure translator resource. Defaults to eastus2",
+    )
+    parser.add_argument(
+        "-rbs",
+        "--remove_backslashes",
+        action="store_true",
+        help=(
+            "any backslashes from multiline values in the input files "
+            "will not be included in the text that gets translated."
+        ),
+    )
+    parser.add_argument(
+        "-s",
+        "--sort",
+        action="store_true",
+        help=(
+            "sort the messages in the output files in the same order as the "
+            "input files. If this is not specified, then new messages "
+            "will be appended at the end of the output files."
+        ),
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        required=False,
+        type=int,
+        default=default_workers,
+        help=(
+            "number of requests to send to the Azure translator at the same time "
+            "when there are too many messages for one request. Defaults to 1"
+        ),
+    )
+    parser.add_argument(
+        "--poll_interval",
+        "--poll-interval",
+        required=False,
+        type=float,
+        default=default_poll_interval,
+        help=(
+            "number of seconds between checks of the input files. "
+            f"Defaults to {default_poll_interval}"
+        ),
+    )
+    parser.add_argument(
+        "--debounce",
+        required=False,
+        type=float,
+        default=default_debounce,
+        help=(
+            "number of seconds a file must be left unchanged after it is saved "
+            f"before it is translated. Defaults to {default_debounce}"
+        ),
+    )
+    parser.add_argument(
+        "--no_cache",
+        "--no-cache",
+        action="store_true",
+        help=(
+            "do not look up or save translations in the translation cache, "
+            "so every message is sent to the Azure translator."
+        ),
+    )
+    parser.add_argument(
+        "--cache_path",
+        "--cache-path",
+        required=False,
+        type=str,
+        help=(
+            "filepath of the translation cache. Defaults to "
+            "translations.sqlite3 in the i18ntools folder of the user's "
+            "cache directory."
+        ),
+    )
+    parser.add_argument(
+        "--cache_documents",
+        "--cache-documents",
+        action="store_true",
+        help=(
+            "keep the parsed files in memory while watching, so the files that "
+            "did not change are not parsed again on every change."
+        ),
+    )
+    add_endpoint_arguments(parser)
+    add_skip_list_arguments(parser)
+    add_rate_limit_arguments(parser)
+    args = parser.parse_args()
+    if args.input_dir is not None:
+        input_file_paths = find_base_bundles(args.input_dir, args.include, args.exclude)
+    else:
+        input_file_paths = args.input_file
+    rate_limiter = rate_limiter_from_args(args)
+    backend = backend_from_args(args, rate_limiter)
+    cache = None if args.no_cache else TranslationCache(args.cache_path)
+    document_cache = None
+    if args.cache_documents:
+        # Import here since the cache is only needed when it is asked for
+        from i18ntools.parse_cache import DocumentCache
+
+        document_cache = DocumentCache()
+    try:
+        with BundleWatcher(
+            input_file_paths,
+            args.to,
+            args.from_lang,
+            args.region,
+            args.remove_backslashes,
+            args.sort,
+            args.workers,
+            cache,
+            rate_limiter,
+            backend,
+            debounce=args.debounce,
+            skip_list=skip_list_from_args(args),
+            document_cache=document_cache,
+        ) as watcher:
+            watcher.run(args.poll_interval)
+    except KeyboardInterrupt:
+        print("Stopped watching")
+    finally:
+        if backend is not None:
+            backend.close()
+        if cache is not None:
+            cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,7 @@
+from urllib.parse import parse_qs, urlparse
+
 import pytest
+import requests
 
 
 @pytest.fixture
@@ -11,3 +14,84 @@ def fake_german_i18n_data_without_backslashes():
         encoding="utf-8",
     ) as f:
         return f.read()
+
+
+class FakeResponse:
+    """Stand-in for a successful requests.Response from the Translator API."""
+
+    status_code = 200
+    text = ""
+
+    def __init__(self, results):
+        self.results = results
+
+    def json(self):
+        return self.results
+
+
+class FakeTranslatorAPI:
+    """Stand-in for the Translator API that requests.Session.post sends the
+    requests to. It echoes back the texts it was sent in upper case, prefixed
+    with the output language when a request has several output languages,
+    and records every request.
+
+    The tests can set:
+    prefix_langs -- when true, the translations are prefixed with the output
+        language even when a request has only one. (default False)
+    on_request -- a function called with the payload of each request before
+        it is answered, which can raise to make the request fail, or return
+        the items of the payload to answer instead of all of them.
+        (default None)
+    """
+
+    def __init__(self):
+        self.urls = []
+        self.payloads = []
+        self.sessions = set()
+        self.prefix_langs = False
+        self.on_request = None
+
+    def post(self, session, url, headers, json, timeout):
+        """Records a request and returns a FakeResponse to it."""
+        self.urls.append(url)
+        self.payloads.append(json)
+        self.sessions.add(session)
+        items = json
+        if self.on_request is not None:
+            answered = self.on_request(json)
+            if answered is not None:
+                items = answered
+        langs = parse_qs(urlparse(url).query)["to"]
+        prefix = self.prefix_langs or len(langs) > 1
+        return FakeResponse(
+            [
+                {
+                    "translations": [
+                        {
+                            "text": (
+                                f"{lang}:{item['text'].upper()}"
+                                if prefix
+                                else item["text"].upper()
+                            ),
+                            "to": lang,
+                        }
+                        for lang in langs
+                    ]
+                }
+                for item in items
+            ]
+        )
+
+
+@pytest.fixture
+def translator_api(monkeypatch):
+    """Fixture that sends the requests of requests.Session.post to a
+    FakeTranslatorAPI and returns it."""
+    monkeypatch.setenv("TRANSLATOR_API_SUBSCRIPTION_KEY", "not-an-actual-api-key")
+    api = FakeTranslatorAPI()
+
+    def fake_post(session, url, headers, json, timeout):
+        return api.post(session, url, headers, json, timeout)
+
+    monkeypatch.setattr(requests.Session, "post", fake_post)
+    return api
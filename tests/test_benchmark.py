@@ -0,0 +1,72 @@
+from i18ntools.benchmark import (
+    check_startup_budget,
+    compare_results,
+    generate_bundle,
+    run_benchmarks,
+    run_startup_benchmarks,
+)
+from i18ntools.parse_i18n_file import parse_i18n_file
+
+
+def test_generate_bundle(tmp_path):
+    bundle = tmp_path / "messages.properties"
+    generate_bundle(bundle, 500, multiline_ratio=0.5, duplicate_ratio=0.5)
+    data = parse_i18n_file(bundle)
+    assert len(data) == 500
+    assert any("\\\n" in value for value in data.values())
+    assert len(set(data.values())) < 400
+
+    # The same bundle is generated every time
+    other_bundle = tmp_path / "other.properties"
+    generate_bundle(other_bundle, 500, multiline_ratio=0.5, duplicate_ratio=0.5)
+    assert bundle.read_text(encoding="utf-8") == other_bundle.read_text(
+        encoding="utf-8"
+    )
+
+
+def test_run_benchmarks():
+    results = run_benchmarks([100], repeat=1)
+    assert sorted(results) == [
+        "parse_i18n_file[100]",
+        "parse_i18n_file_without_backslashes[100]",
+        "sort_i18n_file[100]",
+        "translate_file[100]",
+    ]
+    for result in results.values():
+        assert result["seconds"] > 0
+        assert result["peak_bytes"] > 0
+
+
+def test_compare_results():
+    baseline = {
+        "parse_i18n_file[100]": {"seconds": 1.0, "peak_bytes": 1000},
+        "sort_i18n_file[100]": {"seconds": 1.0, "peak_bytes": 1000},
+    }
+    results = {
+        "parse_i18n_file[100]": {"seconds": 1.1, "peak_bytes": 1000},
+        "sort_i18n_file[100]": {"seconds": 1.5, "peak_bytes": 2000},
+        "translate_file[100]": {"seconds": 9.0, "peak_bytes": 9000},
+        "startup[sort]": {"seconds": 0.01},
+    }
+    baseline["startup[sort]"] = {"seconds": 0.01}
+    assert compare_results(results, baseline, threshold=0.2) == [
+        "sort_i18n_file[100] seconds went from 1 to 1.5 (+50%)",
+        "sort_i18n_file[100] peak_bytes went from 1000 to 2000 (+100%)",
+    ]
+
+
+def test_run_startup_benchmarks():
+    results = run_startup_benchmarks(["parse"], repeat=1)
+    assert list(results) == ["startup[parse]"]
+    assert results["startup[parse]"]["seconds"] >= 0
+
+
+def test_check_startup_budget():
+    results = {
+        "startup[parse]": {"seconds": 0.02},
+        "startup[sort]": {"seconds": 0.15},
+        "startup[translate]": {"seconds": 0.3},
+    }
+    assert check_startup_budget(results, budget=0.1) == [
+        "startup[sort] took 150.0 ms, more than the budget of 100 ms"
+    ]
@@ -0,0 +1,45 @@
+import subprocess
+import sys
+
+import pytest
+from i18ntools.cli import main, run_command
+
+
+def test_run_command(capsys):
+    """Subcommands run the main function of their script with their arguments,
+    by their name or the name of the old script"""
+    run_command("parse", ["-i", "tests/resources/example.properties"])
+    output = capsys.readouterr().out
+    run_command("parse-i18n-file", ["-i", "tests/resources/example.properties"])
+    assert capsys.readouterr().out == output
+    assert "key default.invalid.min.message" in output
+
+
+def test_main_help(capsys):
+    with pytest.raises(SystemExit):
+        main(["sort", "--help"])
+    assert capsys.readouterr().out.startswith("usage: i18ntools sort")
+
+    with pytest.raises(SystemExit):
+        main(["nope"])
+    assert "unknown command nope" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("command", ["parse", "sort"])
+def test_local_commands_do_not_import_requests(command):
+    """The subcommands that work on local files do not pay for importing
+    the modules only needed for translating"""
+    code = (
+        "import sys\n"
+        "from i18ntools.cli import main\n"
+        "try:\n"
+        f"    main([{command!r}, '--help'])\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        "heavy_modules = ['requests', 'urllib3', 'sqlite3', 'multiprocessing']\n"
+        "print([module for module in heavy_modules if module in sys.modules])\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.splitlines()[-1] == "[]"
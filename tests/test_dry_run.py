@@ -0,0 +1,218 @@
+import json
+import sqlite3
+
+import pytest
+import requests
+from i18ntools.cli import run_command
+from i18ntools.dry_run import (
+    DryRunBackend,
+    estimate_wall_time,
+    get_plan,
+    open_read_only_cache,
+    plan_translate_file,
+    plan_translate_missing_messages,
+    plan_translate_tree,
+)
+from i18ntools.translate_tree import missing_mode
+from i18ntools.translation_cache import TranslationCache
+
+
+@pytest.fixture(autouse=True)
+def _no_network(monkeypatch):
+    """Fixture that fails any request sent with requests."""
+
+    def fail_post(session, url, headers, json, timeout):
+        raise AssertionError(f"A dry run sent a request to {url}")
+
+    monkeypatch.setattr(requests.Session, "post", fail_post)
+
+
+def test_dry_run_backend():
+    """DryRunBackend counts the requests and bills the characters once per
+    output language, and returns each text as its translation
+    """
+    backend = DryRunBackend(["de", "fr"])
+    assert backend.translate_batch(["Hello", "Bye"], "en", ["de", "fr"]) == [
+        ["Hello", "Hello"],
+        ["Bye", "Bye"],
+    ]
+    assert backend.request_count == 1
+    assert backend.text_count == 2
+    assert backend.billed_characters == {"de": 8, "fr": 8}
+
+
+def test_plan_translate_file(tmp_path):
+    """plan_translate_file sends each distinct value once, splits the values
+    into requests like translate_file does, and writes no files
+    """
+    input_file = tmp_path / "messages.properties"
+    input_file.write_text("# Greetings\na=Hello\nb=Hello\nc=Goodbye\n")
+    backend = plan_translate_file(str(input_file), "de,fr")
+    assert backend.message_count == 3
+    assert backend.text_count == 2
+    assert backend.request_count == 1
+    assert backend.billed_characters == {"de": 12, "fr": 12}
+    assert [path.name for path in tmp_path.iterdir()] == ["messages.properties"]
+
+    backend = plan_translate_file(str(input_file), "de", keys=["c"])
+    assert backend.message_count == 1
+    assert backend.billed_characters == {"de": 7}
+
+
+def test_plan_translate_file_with_cache(tmp_path):
+    """The values in the translation cache are not billed, and the dry run
+    does not add its values to the cache
+    """
+    input_file = tmp_path / "messages.properties"
+    input_file.write_text("a=Hello\nb=Goodbye\n")
+    with TranslationCache(tmp_path / "cache.sqlite3") as cache:
+        cache.store("Hello", "en", ["de"], ["Hallo"])
+        cache.save()
+        backend = plan_translate_file(str(input_file), "de", cache=cache)
+        assert backend.text_count == 1
+        assert backend.billed_characters == {"de": 7}
+        assert len(cache) == 1
+
+
+def test_plan_translate_file_with_cache_between_chunks(tmp_path, monkeypatch):
+    """A value that repeats in a later chunk is found in the translations
+    stored by the dry run, like it is in the cache of a real run"""
+    # Send each message in its own chunk
+    monkeypatch.setattr("i18ntools.translate.default_max_elements", 1)
+    input_file = tmp_path / "messages.properties"
+    input_file.write_text("a=Hello\nb=Goodbye\nc=Hello\n")
+    with TranslationCache(tmp_path / "cache.sqlite3") as cache:
+        backend = plan_translate_file(str(input_file), "de", cache=cache)
+        assert backend.request_count == 2
+        assert backend.billed_characters == {"de": 12}
+        assert len(cache) == 0
+
+    backend = plan_translate_file(str(input_file), "de")
+    assert backend.request_count == 3
+    assert backend.billed_characters == {"de": 17}
+
+
+def test_plan_translate_missing_messages(tmp_path):
+    """plan_translate_missing_messages only plans the missing messages"""
+    input_file = tmp_path / "messages.properties"
+    output_file = tmp_path / "messages_de.properties"
+    input_file.write_text("a=Hello\nb=Goodbye\nc=Thanks\n")
+    output_file.write_text("a=Hallo\n")
+    backend = plan_translate_missing_messages(str(input_file), "de")
+    assert backend.message_count == 2
+    assert backend.billed_characters == {"de": 13}
+    assert output_file.read_text() == "a=Hallo\n"
+
+    with pytest.raises(FileNotFoundError):
+        plan_translate_missing_messages(str(input_file), "fr")
+
+
+def test_estimate_wall_time():
+    """The wall time is the longest of the time the workers take to send the
+    requests and the time the quota makes them wait
+    """
+    assert estimate_wall_time(10, 1000) == 10
+    assert estimate_wall_time(10, 1000, workers=4) == 3
+    assert estimate_wall_time(10, 1000, request_latency=0.5) == 5
+    # Two minutes of characters over the first minute of the quota
+    assert estimate_wall_time(10, 3000, characters_per_minute=1000) == 120
+    assert estimate_wall_time(10, 3000, requests_per_minute=5) == 60
+    assert estimate_wall_time(0, 0) == 0
+
+
+def test_get_plan():
+    """get_plan reports the counts of a DryRunBackend and its wall time"""
+    backend = DryRunBackend(["de", "fr"])
+    backend.message_count = 3
+    backend.translate_batch(["Hello", "Bye"], "en", ["de", "fr"])
+    assert get_plan(backend, characters_per_minute=8) == {
+        "version": 1,
+        "messages": 3,
+        "texts": 2,
+        "requests": 1,
+        "billed_characters": {"de": 8, "fr": 8},
+        "total_billed_characters": 16,
+        "estimated_seconds": 60.0,
+    }
+
+
+def test_dry_run_cli(tmp_path, capsys):
+    """--dry_run prints the plan, saves it with --plan_json and exits with
+    status 1 when it is over --character_budget
+    """
+    input_file = tmp_path / "messages.properties"
+    input_file.write_text("a=Hello\nb=Goodbye\n")
+    plan_json = tmp_path / "plan.json"
+    run_command(
+        "translate",
+        ["-i", str(input_file), "-t", "de,fr", "--dry-run", "--no_cache"]
+        + ["--plan_json", str(plan_json), "--character_budget", "24"],
+    )
+    output = capsys.readouterr().out
+    assert "2 messages would be sent as 2 texts in 1 requests" in output
+    assert "Billed characters: de 12, fr 12 (total 24)" in output
+    with open(plan_json, encoding="utf-8") as f:
+        assert json.load(f)["total_billed_characters"] == 24
+    assert not (tmp_path / "messages_de.properties").exists()
+
+    with pytest.raises(SystemExit) as exc_info:
+        run_command(
+            "translate",
+            ["-i", str(input_file), "-t", "de,fr", "--plan", "--no_cache"]
+            + ["--character_budget", "23"],
+        )
+    assert exc_info.value.code == 1
+    assert "over the budget of 23" in capsys.readouterr().out
+
+
+def test_open_read_only_cache(tmp_path):
+    """A dry run opens the cache read-only, without creating it or writing
+    when its translations were last used"""
+    cache_path = tmp_path / "cache" / "cache.sqlite3"
+    assert open_read_only_cache(cache_path) is None
+    assert not (tmp_path / "cache").exists()
+
+    with TranslationCache(cache_path) as cache:
+        cache.store("Hello", "en", ["de"], ["Hallo"])
+        cache.save()
+    with TranslationCache(cache_path, read_only=True) as cache:
+        last_used = cache.connection.execute(
+            "SELECT last_used FROM translations"
+        ).fetchone()
+    cache = open_read_only_cache(cache_path)
+    assert cache.lookup("Hello", "en", ["de"]) == ["Hallo"]
+    with pytest.raises(sqlite3.OperationalError, match="readonly"):
+        cache.store("Bye", "en", ["de"], ["Tschüss"])
+    cache.close()
+    with TranslationCache(cache_path) as cache:
+        assert len(cache) == 1
+        assert (
+            cache.connection.execute("SELECT last_used FROM translations").fetchone()
+            == last_used
+        )
+
+
+def test_plan_translate_tree(tmp_path, capsys):
+    """plan_translate_tree plans the requests of every base bundle in a
+    directory tree, and --dry_run uses it with --input_dir"""
+    (tmp_path / "admin").mkdir()
+    (tmp_path / "messages.properties").write_text("a=Hello\nb=Goodbye\n")
+    (tmp_path / "admin" / "admin.properties").write_text("a=Hello\nc=Thanks\n")
+    (tmp_path / "messages_de.properties").write_text("a=Hallo\n")
+
+    backend = plan_translate_tree(str(tmp_path), "de,fr")
+    assert backend.message_count == 8
+    # Hello is sent once for both files
+    assert backend.billed_characters == {"de": 18, "fr": 18}
+
+    backend = plan_translate_tree(str(tmp_path), "de", missing_mode)
+    assert backend.message_count == 1
+    assert backend.billed_characters == {"de": 7}
+
+    run_command(
+        "translate",
+        ["-d", str(tmp_path), "-t", "de,fr", "--dry_run", "--no_cache"],
+    )
+    assert "Billed characters: de 18, fr 18 (total 36)" in capsys.readouterr().out
+    assert (tmp_path / "messages_de.properties").read_text() == "a=Hallo\n"
+    assert not (tmp_path / "messages_fr.properties").exists()
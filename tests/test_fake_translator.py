@@ -0,0 +1,137 @@
+import pytest
+import requests
+from i18ntools.backends import AzureTranslatorBackend
+from i18ntools.fake_translator import FakeTranslatorServer, pseudo_translate
+from i18ntools.rate_limit import RateLimiter
+from i18ntools.translate import make_api_call
+
+
+def test_pseudo_translate():
+    assert pseudo_translate("Hello", "de") == "[de] Héllö"
+    assert (
+        pseudo_translate("Value {0} of <b>%s</b> is invalid", "fr")
+        == "[fr] Vàlûé {0} öf <b>%s</b> îs învàlîd"
+    )
+    assert pseudo_translate("", "es") == "[es] "
+
+
+def test_fake_translator_backend():
+    """AzureTranslatorBackend translates a batch with the fake server"""
+    with FakeTranslatorServer(port=0) as server:
+        backend = AzureTranslatorBackend(
+            endpoint=server.endpoint, subscription_key="not-an-actual-api-key"
+        )
+        try:
+            translations = backend.translate_batch(["Yes", "No"], "en", ["de", "fr"])
+        finally:
+            backend.close()
+
+    assert translations == [["[de] Yés", "[fr] Yés"], ["[de] Nö", "[fr] Nö"]]
+    assert server.request_count == 1
+    assert server.character_count == 10
+
+
+def test_fake_translator_errors():
+    """The fake server rejects requests like the Translator API does,
+    but accepts any subscription key"""
+    headers = {"Ocp-Apim-Subscription-Key": "not-an-actual-api-key"}
+    with FakeTranslatorServer(port=0, characters_per_minute=60) as server:
+        url = f"{server.endpoint}/translate?api-version=3.0&from=en&to=de"
+        response = requests.post(url, json=[{"text": "a"}], timeout=5)
+        assert response.status_code == 200
+        response = requests.post(
+            url,
+            headers={"Ocp-Apim-Subscription-Key": ""},
+            json=[{"text": "a"}],
+            timeout=5,
+        )
+        assert response.status_code == 200
+        response = requests.post(
+            url, headers=headers, json=[{"text": "a"}] * 1001, timeout=5
+        )
+        assert response.status_code == 400
+        response = requests.post(
+            url, headers=headers, json=[{"text": "a" * 48}], timeout=5
+        )
+        assert response.status_code == 200
+        # The quota of 60 characters per minute is used up
+        response = requests.post(
+            url, headers=headers, json=[{"text": "a" * 50}], timeout=5
+        )
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) >= 1
+        assert server.throttled_count == 1
+
+    with FakeTranslatorServer(port=0, error_rate=1) as server:
+        url = f"{server.endpoint}/translate?api-version=3.0&from=en&to=de"
+        response = requests.post(url, headers=headers, json=[{"text": "a"}], timeout=5)
+        assert response.status_code == 500
+
+
+def test_make_api_call_load(monkeypatch):
+    """make_api_call translates many messages with several workers through
+    a flaky server, retrying the requests that fail"""
+    input_data = {
+        f"message.{index}": f"Message number {index}" for index in range(5000)
+    }
+    monkeypatch.setenv("TRANSLATOR_ENDPOINT_KEY", "not-an-actual-api-key")
+    with FakeTranslatorServer(port=0, latency=0.01, error_rate=0.3, seed=1) as server:
+        monkeypatch.setenv("TRANSLATOR_API_ENDPOINT", server.endpoint)
+        response_object = make_api_call(
+            input_data,
+            "de",
+            max_elements=100,
+            workers=8,
+            rate_limiter=RateLimiter(max_retries=20, backoff_base=0.001),
+        )
+
+    assert [result["translations"][0]["text"] for result in response_object] == [
+        pseudo_translate(value, "de") for value in input_data.values()
+    ]
+    assert server.error_count > 0
+    assert server.request_count == 50 + server.error_count
+
+
+@pytest.mark.parametrize("error_rate", [0.0, 0.5])
+def test_fake_translator_is_deterministic(error_rate):
+    """Servers with the same seed fail the same requests"""
+    outcomes = []
+    for _ in range(2):
+        with FakeTranslatorServer(port=0, error_rate=error_rate, seed=7) as server:
+            outcomes.append([server.admit(1)[0] for _ in range(20)])
+    assert outcomes[0] == outcomes[1]
+    assert (500 in outcomes[0]) == (error_rate > 0)
+
+
+def test_backend_only_sends_azure_key_to_azure(monkeypatch):
+    """The Azure key is only sent to the Azure endpoint, with or without
+    a trailing slash, and other endpoints get their own key"""
+    monkeypatch.setenv("TRANSLATOR_API_SUBSCRIPTION_KEY", "azure-key")
+    monkeypatch.delenv("TRANSLATOR_ENDPOINT_KEY", raising=False)
+    backend = AzureTranslatorBackend(
+        endpoint="https://api.cognitive.microsofttranslator.com/"
+    )
+    assert backend.headers["Ocp-Apim-Subscription-Key"] == "azure-key"
+    backend.close()
+
+    backend = AzureTranslatorBackend(endpoint="http://translation-host:8766")
+    assert "Ocp-Apim-Subscription-Key" not in backend.headers
+    backend.close()
+
+    monkeypatch.setenv("TRANSLATOR_ENDPOINT_KEY", "service-token")
+    backend = AzureTranslatorBackend(endpoint="http://translation-host:8766")
+    assert backend.headers["Ocp-Apim-Subscription-Key"] == "service-token"
+    backend.close()
+
+
+def test_backend_warns_about_endpoint_variable(monkeypatch, capsys):
+    """A warning is printed when TRANSLATOR_API_ENDPOINT sends the requests
+    somewhere other than Azure"""
+    monkeypatch.setenv("TRANSLATOR_API_ENDPOINT", "http://127.0.0.1:8765")
+    AzureTranslatorBackend().close()
+    assert "Warning: sending the requests to http://127.0.0.1:8765" in (
+        capsys.readouterr().err
+    )
+
+    AzureTranslatorBackend(endpoint="http://127.0.0.1:8765").close()
+    assert capsys.readouterr().err == ""
@@ -0,0 +1,112 @@
+import pytest
+from i18ntools.i18n_document import (
+    I18nEntry,
+    iter_i18n_entries,
+    read_i18n_document,
+    write_i18n_document,
+)
+from i18ntools.parse_i18n_file import parse_i18n_file
+
+
+def test_read_i18n_document():
+    document = read_i18n_document("tests/resources/example.properties")
+    assert len(document) == 8
+    assert document.keys() == list(
+        parse_i18n_file("tests/resources/example.properties").keys()
+    )
+    entry = document.get("TheBeths.YourSide.lyrics")
+    assert entry.start_line == 4
+    assert entry.end_line == 6
+    assert entry.comments == ["\n", "# Track 4 on Expert In A Dying Field\n"]
+    assert "missing.key" not in document
+    assert document.get("missing.key") is None
+
+
+def test_to_dict():
+    document = read_i18n_document("tests/resources/example.properties")
+    assert document.to_dict() == parse_i18n_file("tests/resources/example.properties")
+    assert document.to_dict(remove_backslashes=True) == parse_i18n_file(
+        "tests/resources/example.properties", remove_backslashes=True
+    )
+
+    document = read_i18n_document("tests/resources/duplicate.properties")
+    assert document.duplicate_keys() == {"ItemInfoAttendancePolicies"}
+    with pytest.raises(SyntaxWarning):
+        document.to_dict()
+
+
+def test_write_unchanged_document(tmp_path):
+    """A document that was not changed is written back out as it was read"""
+    output_file = tmp_path / "example.properties"
+    document = read_i18n_document("tests/resources/example2.properties")
+    write_i18n_document(document, output_file)
+    with open("tests/resources/example2.properties", encoding="utf-8") as f:
+        assert output_file.read_text(encoding="utf-8") == f.read()
+
+
+def test_set_value_and_append(tmp_path):
+    input_file = tmp_path / "messages.properties"
+    input_file.write_text(
+        "# comment\nfirst=one \\\n    still one\nsecond=two", encoding="utf-8"
+    )
+    document = read_i18n_document(input_file)
+    document.set_value("first", "1")
+    document.set_value("third", "3")
+    document.append(I18nEntry("fourth", "4", comments=["\n"]))
+    write_i18n_document(document, input_file)
+    assert input_file.read_text(encoding="utf-8") == (
+        "# comment\nfirst=1\nsecond=two\nthird=3\n\nfourth=4\n"
+    )
+
+
+def test_key_with_whitespace(tmp_path):
+    """Whitespace before the "=" of a key is kept in the key, like
+    parse_i18n_file always did, and written back out with the key"""
+    input_file = tmp_path / "messages.properties"
+    input_file.write_text("  first = one\nsecond=two\n", encoding="utf-8")
+    assert parse_i18n_file(input_file) == {"first ": " one", "second": "two"}
+
+    document = read_i18n_document(input_file)
+    assert document.keys() == ["first ", "second"]
+    write_i18n_document(document.with_values(["1", "2"]), input_file)
+    assert input_file.read_text(encoding="utf-8") == "first =1\nsecond=2\n"
+    assert parse_i18n_file(input_file) == {"first ": "1", "second": "2"}
+
+
+def test_with_values():
+    document = read_i18n_document("tests/resources/example2.properties")
+    translated_document = document.with_values(["a", "b", "c", "d"])
+    assert translated_document.lines() == [
+        "handshake.register.mobileDeviceLimitReached.error=a\n",
+        "# The parameter will be a segmentID i.e. 54\n",
+        "recordAttendance.segment.notFound.error=b\n",
+        "\n",
+        "me=c\n",
+        "clientHelpText=d\n",
+    ]
+    with pytest.raises(ValueError, match="zip"):
+        document.with_values(["a"])
+
+
+def test_iter_i18n_entries(tmp_path):
+    input_file = tmp_path / "messages.properties"
+    input_file.write_text(
+        "first=one\n# comment\nsecond=two \\\n    more\n\n# the end", encoding="utf-8"
+    )
+    entries = iter_i18n_entries(input_file)
+    entry = next(entries)
+    assert (entry.key, entry.value, entry.start_line, entry.end_line) == (
+        "first",
+        "one",
+        1,
+        1,
+    )
+    entry = next(entries)
+    assert (entry.key, entry.start_line, entry.end_line) == ("second", 3, 4)
+    assert entry.comments == ["# comment\n"]
+    # The lines after the last message are yielded without a key
+    entry = next(entries)
+    assert entry.key is None
+    assert entry.comments == ["\n", "# the end\n"]
+    with pytest.raises(StopIteration):
+        next(entries)
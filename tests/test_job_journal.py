@@ -0,0 +1,36 @@
+from i18ntools.job_journal import JobJournal, get_journal_filepath
+
+
+def test_get_journal_filepath():
+    assert (
+        get_journal_filepath("/dir/messages_de.properties")
+        == "/dir/messages_de.properties.journal"
+    )
+
+
+def test_job_journal(tmp_path):
+    journal_path = tmp_path / "messages_de.properties.journal"
+    with JobJournal(journal_path, "en", ["de", "fr"]) as journal:
+        journal.record({"a": ("Hello", ["Hallo", "Bonjour"])})
+        journal.record({"b": ("Bye", ["Tschüss", "Au revoir"])})
+    # The job was killed while it wrote the next line
+    with open(journal_path, "a", encoding="utf-8") as f:
+        f.write('{"c": ["Yes", ["Ja"')
+
+    with JobJournal(journal_path, "en", ["de", "fr"], resume=True) as journal:
+        assert journal.lookup("a", "Hello") == ["Hallo", "Bonjour"]
+        assert journal.lookup("b", "Bye") == ["Tschüss", "Au revoir"]
+        # The source value changed since it was translated
+        assert journal.lookup("a", "Hi") is None
+        assert journal.lookup("c", "Yes") is None
+        journal.record({"c": ("Yes", ["Ja", "Oui"])})
+    with JobJournal(journal_path, "en", ["de", "fr"], resume=True) as journal:
+        assert journal.lookup("a", "Hello") == ["Hallo", "Bonjour"]
+        assert journal.lookup("c", "Yes") == ["Ja", "Oui"]
+
+    # A journal of a different job is not resumed from
+    with JobJournal(journal_path, "en", ["de"], resume=True) as journal:
+        assert journal.lookup("a", "Hello") is None
+    with JobJournal(journal_path, "en", ["de"], resume=True) as journal:
+        journal.remove()
+    assert not journal_path.exists()
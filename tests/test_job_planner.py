@@ -0,0 +1,94 @@
+from urllib.parse import parse_qs, urlparse
+
+from i18ntools.job_planner import (
+    group_jobs_by_language,
+    group_languages_by_payload,
+    translate_jobs,
+)
+
+
+def get_requests_sent(translator_api):
+    """Returns a list of the output languages and payload of each request
+    sent to a FakeTranslatorAPI."""
+    return [
+        (parse_qs(urlparse(url).query)["to"], payload)
+        for url, payload in zip(translator_api.urls, translator_api.payloads)
+    ]
+
+
+def test_group_jobs_by_language():
+    jobs = [("de", {}), ("fr", {}), ("de", {}), ("es", {})]
+    assert group_jobs_by_language(jobs) == {"de": [0, 2], "fr": [1], "es": [3]}
+
+
+def test_group_languages_by_payload():
+    messages = {"a": "Hello"}
+    jobs = [
+        ("de", messages),
+        ("fr", {"a": "Hello"}),
+        ("de", {}),
+        ("fr", {}),
+        ("es", messages),
+        ("es", {"b": "Bye"}),
+    ]
+    assert group_languages_by_payload(jobs, group_jobs_by_language(jobs)) == [
+        (["de", "fr"], [[0, 2], [1, 3]]),
+        (["es"], [[4, 5]]),
+    ]
+
+
+def test_translate_jobs_with_the_same_messages(translator_api):
+    """Languages whose jobs have the same messages, like the files of a tree
+    translated in translate mode, share their requests"""
+    translator_api.prefix_langs = True
+    first = {"greeting": "Hello", "farewell": "Bye"}
+    second = {"greeting": "Welcome"}
+    jobs = [
+        (lang, payload) for payload in (first, second) for lang in "de fr es".split()
+    ]
+    translations = translate_jobs(jobs)
+
+    assert get_requests_sent(translator_api) == [
+        (["de", "fr", "es"], [{"text": "Hello"}, {"text": "Bye"}, {"text": "Welcome"}])
+    ]
+    for (lang, payload_data), translation in zip(jobs, translations):
+        assert translation == {
+            key: f"{lang}:{value.upper()}" for key, value in payload_data.items()
+        }
+
+
+def test_translate_jobs(translator_api):
+    """translate_jobs packs the messages of many small files into shared
+    requests and routes each translation back to its file and key
+    """
+    translator_api.prefix_langs = True
+    jobs = [
+        (
+            "de",
+            {
+                f"file{file_index}.key{key_index}": f"text {file_index}.{key_index}"
+                for key_index in range(5)
+            },
+        )
+        for file_index in range(20)
+    ]
+    jobs.append(("fr", {"file0.key0": "text 0.0", "same": "text 1.1"}))
+    # Both files have the same key with a different value
+    jobs.append(("es", {"shared": "one"}))
+    jobs.append(("es", {"shared": "two"}))
+    jobs.append(("es", {}))
+    translations = translate_jobs(jobs, max_elements=40)
+
+    # 100 German messages fit in three requests instead of twenty
+    requests_sent = get_requests_sent(translator_api)
+    assert sorted((langs, len(payload)) for langs, payload in requests_sent) == [
+        (["de"], 20),
+        (["de"], 40),
+        (["de"], 40),
+        (["es"], 2),
+        (["fr"], 2),
+    ]
+    for (lang, payload_data), translation in zip(jobs, translations):
+        assert translation == {
+            key: f"{lang}:{value.upper()}" for key, value in payload_data.items()
+        }
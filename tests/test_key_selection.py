@@ -0,0 +1,192 @@
+import json
+
+import pytest
+from i18ntools.i18n_document import read_i18n_document
+from i18ntools.key_selection import KeyIndex, get_literal_prefix, read_key_patterns
+from i18ntools.translate import translate_file
+from i18ntools.translate_missing import (
+    get_manifest_filepath,
+    translate_missing_messages,
+)
+
+keys = [
+    "handshake.register.suspended.error",
+    "instructorService.removeSession.success",
+    "handshake.registerAgain",
+    "handshake.register.disabledException.error",
+    "instructorService.addSession.success",
+    "instructorService.addSession.error",
+    "associatedGroupMessageText",
+]
+
+
+class RecordingBackend:
+    """A translator backend that translates texts into upper case and
+    records the texts it is asked to translate."""
+
+    def __init__(self):
+        self.texts = []
+
+    def translate_batch(self, texts, input_lang, output_langs):
+        self.texts.extend(texts)
+        return [[f"{lang}:{text.upper()}" for lang in output_langs] for text in texts]
+
+    def close(self):
+        pass
+
+
+def test_get_literal_prefix():
+    """get_literal_prefix returns the part of a pattern before its wildcards"""
+    assert get_literal_prefix("instructorService.*.success") == "instructorService."
+    assert get_literal_prefix("handshake.register.[sd]*") == "handshake.register."
+    assert get_literal_prefix("handshake.register") == "handshake.register"
+    assert get_literal_prefix("*") == ""
+
+
+def test_key_index_with_prefix():
+    """KeyIndex.with_prefix returns only the keys that start with the prefix"""
+    key_index = KeyIndex(keys)
+    assert key_index.with_prefix("handshake.") == [
+        "handshake.register.disabledException.error",
+        "handshake.register.suspended.error",
+        "handshake.registerAgain",
+    ]
+    assert key_index.with_prefix("nothing") == []
+    assert len(key_index.with_prefix("")) == len(keys)
+
+
+def test_key_index_select():
+    """A key selects itself and the keys below it, glob patterns select the
+    keys they match, and the keys are returned in document order
+    """
+    key_index = KeyIndex(keys)
+    assert key_index.select(["handshake.register"]) == [
+        "handshake.register.suspended.error",
+        "handshake.register.disabledException.error",
+    ]
+    assert key_index.select(["instructorService.*.success"]) == [
+        "instructorService.removeSession.success",
+        "instructorService.addSession.success",
+    ]
+    assert key_index.select(
+        ["associatedGroupMessageText", "instructorService.addSession.*"]
+    ) == [
+        "instructorService.addSession.success",
+        "instructorService.addSession.error",
+        "associatedGroupMessageText",
+    ]
+    assert key_index.select(["handshake.register*", "handshake.registerAgain"]) == [
+        "handshake.register.suspended.error",
+        "handshake.registerAgain",
+        "handshake.register.disabledException.error",
+    ]
+    assert key_index.select(["missing.key", "Handshake.*"]) == []
+
+
+def test_read_key_patterns(tmp_path):
+    """read_key_patterns skips empty lines and comments"""
+    keys_file = tmp_path / "keys.txt"
+    keys_file.write_text("# Copy changed in the register page\n\nhandshake.*  \n")
+    assert read_key_patterns(keys_file) == ["handshake.*"]
+
+
+def test_document_select_keys():
+    """I18nDocument.select_keys selects from the keys of the document and
+    sees the messages added to it
+    """
+    document = read_i18n_document("tests/resources/example.properties")
+    assert document.select_keys(["handshake.register"]) == [
+        "handshake.register.suspended.error",
+        "handshake.register.disabledException.error",
+    ]
+    document.set_value("handshake.register.new", "New")
+    assert document.select_keys(["handshake.register.n*"]) == ["handshake.register.new"]
+
+
+def test_translate_file_with_keys(tmp_path):
+    """translate_file with keys only sends the selected messages and replaces
+    them in place, leaving the other lines of the output files as they are
+    """
+    input_file = tmp_path / "messages.properties"
+    input_file.write_text(
+        "# Greetings\ngreeting=Hello\nfarewell=Goodbye\n"
+        "handshake.register.error=Registration failed\nadded.key=Added\n"
+    )
+    output_de = tmp_path / "messages_de.properties"
+    output_de.write_text(
+        "# Checked by Anna\ngreeting=Hallo \\\n    du\n\n"
+        "handshake.register.error=Alt\nfarewell = Tschüss\n"
+    )
+    backend = RecordingBackend()
+
+    translate_file(
+        str(input_file),
+        "de,fr",
+        backend=backend,
+        keys=["handshake.register", "added.*"],
+    )
+    assert backend.texts == ["Registration failed", "Added"]
+    assert output_de.read_text() == (
+        "# Checked by Anna\ngreeting=Hallo \\\n    du\n\n"
+        "handshake.register.error=de:REGISTRATION FAILED\nfarewell = Tschüss\n"
+        "added.key=de:ADDED\n"
+    )
+    # An output file that does not exist gets only the selected messages
+    assert (tmp_path / "messages_fr.properties").read_text() == (
+        "handshake.register.error=fr:REGISTRATION FAILED\nadded.key=fr:ADDED\n"
+    )
+
+
+def test_translate_file_with_keys_that_match_nothing(tmp_path, capsys):
+    """translate_file with keys that match no message sends nothing"""
+    backend = RecordingBackend()
+    translate_file(
+        "tests/resources/example.properties",
+        "de",
+        str(tmp_path / "messages_de.properties"),
+        backend=backend,
+        keys=["missing.key"],
+    )
+    assert backend.texts == []
+    assert not (tmp_path / "messages_de.properties").exists()
+    assert "No messages" in capsys.readouterr().out
+
+
+def test_translate_file_with_keys_and_duplicate_keys(tmp_path):
+    """translate_file with keys still refuses an input file with duplicate keys"""
+    with pytest.raises(SyntaxWarning):
+        translate_file(
+            "tests/resources/duplicate.properties",
+            "de",
+            str(tmp_path / "duplicate_de.properties"),
+            backend=RecordingBackend(),
+            keys=["*"],
+        )
+
+
+def test_translate_missing_messages_with_keys(tmp_path):
+    """translate_missing_messages with keys only translates the selected
+    missing and changed messages, and the messages that were not selected
+    are still found changed by a later run
+    """
+    input_file = tmp_path / "messages.properties"
+    output_file = tmp_path / "messages_de.properties"
+    input_file.write_text("a.one=One\na.two=Two\nb.one=Three\n")
+    output_file.write_text("a.one=Eins\n")
+    backend = RecordingBackend()
+    translate_missing_messages(str(input_file), "de", incremental=True, backend=backend)
+    assert backend.texts == ["Two", "Three"]
+
+    backend.texts.clear()
+    input_file.write_text("a.one=One!\na.two=Two!\nb.one=Three!\nb.two=Four\n")
+    translate_missing_messages(
+        str(input_file), "de", incremental=True, backend=backend, keys=["a.*"]
+    )
+    assert backend.texts == ["One!", "Two!"]
+    assert output_file.read_text() == "a.one=de:ONE!\na.two=de:TWO!\nb.one=de:THREE\n"
+
+    backend.texts.clear()
+    translate_missing_messages(str(input_file), "de", incremental=True, backend=backend)
+    assert backend.texts == ["Three!", "Four"]
+    with open(get_manifest_filepath(output_file), encoding="utf-8") as f:
+        assert len(json.load(f)["hashes"]) == 4
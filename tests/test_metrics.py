@@ -0,0 +1,109 @@
+import json
+import time
+
+import i18ntools.metrics
+import i18ntools.translate
+from i18ntools.fake_translator import FakeTranslatorServer
+from i18ntools.metrics import collect_metrics, percentile, phase, record_request
+from i18ntools.rate_limit import RateLimiter
+from i18ntools.sort_i18n_file import sort_i18n_file
+from i18ntools.translate import translate_file
+from i18ntools.translation_cache import TranslationCache
+
+
+def test_percentile():
+    assert percentile([], 50) is None
+    assert percentile([3.0], 99) == 3.0
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 90) == 90
+    assert percentile(values, 99) == 99
+    assert percentile(values, 100) == 100
+    assert percentile(values, 0) == 1
+
+
+def test_metrics_turned_off():
+    """Nothing is recorded outside of collect_metrics"""
+    assert i18ntools.metrics.active_metrics is None
+    with phase("parse"):
+        pass
+    record_request(0.1, 10, 200)
+    with collect_metrics() as metrics:
+        assert i18ntools.metrics.active_metrics is metrics
+    assert i18ntools.metrics.active_metrics is None
+    assert metrics.to_dict()["requests"]["count"] == 0
+    assert metrics.phases == {}
+
+
+class UpperCaseBackend:
+    """A translator backend that translates texts into upper case."""
+
+    def translate_batch(self, texts, input_lang, output_langs):
+        return [[text.upper() for lang in output_langs] for text in texts]
+
+    def close(self):
+        pass
+
+
+def test_streaming_parse_time(monkeypatch, tmp_path):
+    """The time translate_file spends reading the chunks of the input file
+    is parse time"""
+    iter_payload_chunks = i18ntools.translate.iter_payload_chunks
+
+    def slow_iter_payload_chunks(*args):
+        for chunk in iter_payload_chunks(*args):
+            time.sleep(0.05)
+            yield chunk
+
+    monkeypatch.setattr(
+        i18ntools.translate, "iter_payload_chunks", slow_iter_payload_chunks
+    )
+    input_file = tmp_path / "messages.properties"
+    input_file.write_text("".join(f"key{index}=Value {index}\n" for index in range(5)))
+    with collect_metrics() as metrics:
+        translate_file(str(input_file), "de", backend=UpperCaseBackend())
+    assert metrics.phases["parse"] >= 0.05
+    assert (
+        (tmp_path / "messages_de.properties").read_text().startswith("key0=VALUE 0\n")
+    )
+
+
+def test_collect_metrics(monkeypatch, tmp_path):
+    """The metrics of a translation run through a flaky server are recorded,
+    passed to the hook and saved as JSON"""
+    monkeypatch.setenv("TRANSLATOR_ENDPOINT_KEY", "not-an-actual-api-key")
+    input_file = tmp_path / "messages.properties"
+    input_file.write_text("".join(f"key{index}=Value {index}\n" for index in range(6)))
+    events = []
+    with FakeTranslatorServer(port=0, error_rate=0.5, seed=3) as server:
+        monkeypatch.setenv("TRANSLATOR_API_ENDPOINT", server.endpoint)
+        with TranslationCache(tmp_path / "cache.sqlite3") as cache:
+            with collect_metrics(lambda event, fields: events.append(event)) as metrics:
+                translate_file(
+                    str(input_file),
+                    "de",
+                    cache=cache,
+                    rate_limiter=RateLimiter(max_retries=20, backoff_base=0.001),
+                )
+                # The second run is answered from the cache
+                translate_file(str(input_file), "de", cache=cache)
+                sort_i18n_file(str(input_file), "de")
+
+    result = metrics.to_dict()
+    assert set(result["phases"]) == {"parse", "translate", "sort", "write"}
+    assert result["requests"]["count"] == server.request_count
+    assert result["requests"]["status_codes"]["200"] == 1
+    assert result["requests"]["status_codes"].get("500", 0) == server.error_count
+    assert result["requests"]["characters_sent"] == 6 * len("Value 0") * (
+        server.error_count + 1
+    )
+    assert result["requests"]["latency_seconds"]["p50"] is not None
+    assert result["retries"]["count"] == server.error_count
+    assert result["retries"]["throttled"] == 0
+    assert result["cache"] == {"hits": 6, "misses": 6, "hit_rate": 0.5}
+    assert {"phase", "request", "cache"} <= set(events)
+    assert ("retry" in events) == (server.error_count > 0)
+
+    metrics_file = tmp_path / "metrics.json"
+    metrics.write_json(metrics_file)
+    assert json.loads(metrics_file.read_text())["cache"]["hit_rate"] == 0.5
@@ -0,0 +1,126 @@
+import os
+import shutil
+
+import pytest
+from i18ntools.i18n_document import I18nEntry, read_i18n_document
+from i18ntools.parse_cache import DocumentCache, ParseCache
+from i18ntools.parse_i18n_file import parse_i18n_file
+
+
+def test_parse_cache(tmp_path):
+    input_file = tmp_path / "messages.properties"
+    shutil.copy("tests/resources/example.properties", input_file)
+    cache = ParseCache()
+
+    data = parse_i18n_file(input_file, cache=cache)
+    assert data == parse_i18n_file("tests/resources/example.properties")
+    assert (cache.hits, cache.misses) == (0, 1)
+
+    # The file did not change, so the cached data is used
+    data["changed.by.caller"] = "not cached"
+    assert parse_i18n_file(input_file, cache=cache) == parse_i18n_file(input_file)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # The data without backslashes is cached separately
+    assert parse_i18n_file(
+        input_file, remove_backslashes=True, cache=cache
+    ) == parse_i18n_file(input_file, remove_backslashes=True)
+    assert (cache.hits, cache.misses) == (1, 2)
+
+    # A file that was touched but not changed is not parsed again
+    os.utime(input_file, ns=(0, 0))
+    parse_i18n_file(input_file, cache=cache)
+    assert (cache.hits, cache.misses) == (2, 2)
+
+    # A file that changed is parsed again
+    with open(input_file, "a", encoding="utf-8") as f:
+        f.write("new.message=New\n")
+    assert parse_i18n_file(input_file, cache=cache)["new.message"] == "New"
+    assert (cache.hits, cache.misses) == (2, 3)
+
+
+def test_parse_cache_on_disk(tmp_path):
+    input_file = tmp_path / "messages.properties"
+    shutil.copy("tests/resources/example2.properties", input_file)
+    cache_dir = tmp_path / "cache"
+    ParseCache(cache_dir=cache_dir).parse_i18n_file(input_file)
+    assert len(list(cache_dir.iterdir())) == 1
+
+    # A new cache, i.e. in a later run, reuses the data saved on disk
+    cache = ParseCache(cache_dir=cache_dir)
+    assert cache.parse_i18n_file(input_file) == parse_i18n_file(input_file)
+    assert list(cache.parse_i18n_file(input_file).keys()) == list(
+        parse_i18n_file(input_file).keys()
+    )
+    assert (cache.hits, cache.misses) == (2, 0)
+
+
+def test_parse_cache_max_entries(tmp_path):
+    cache = ParseCache(max_entries=1)
+    cache.parse_i18n_file("tests/resources/example.properties")
+    cache.parse_i18n_file("tests/resources/example2.properties")
+    cache.parse_i18n_file("tests/resources/example.properties")
+    assert (cache.hits, cache.misses) == (0, 3)
+
+
+def test_parse_cache_with_duplicate_keys():
+    """SyntaxWarning is raised every time a file with duplicate keys is parsed"""
+    cache = ParseCache()
+    with pytest.raises(SyntaxWarning):
+        cache.parse_i18n_file("tests/resources/duplicate.properties")
+    with pytest.raises(SyntaxWarning):
+        cache.parse_i18n_file("tests/resources/duplicate.properties")
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_document_cache(tmp_path):
+    """read_i18n_document reuses the document of a file until the file
+    changes, and the document it returns can be changed without changing
+    the cache
+    """
+    input_file = tmp_path / "messages.properties"
+    shutil.copy("tests/resources/example.properties", input_file)
+    os.utime(input_file, ns=(0, 0))
+    cache = DocumentCache()
+
+    document = read_i18n_document(input_file, cache)
+    assert (cache.hits, cache.misses) == (0, 1)
+    document.set_value("associatedGroupMessageText", "changed by caller")
+    document.append(I18nEntry("added.by.caller", "Added"))
+
+    cached_document = read_i18n_document(input_file, cache)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cached_document.lines() == read_i18n_document(input_file, None).lines()
+    assert "added.by.caller" not in cached_document
+
+    # A file that changed is read again
+    with open(input_file, "a", encoding="utf-8") as f:
+        f.write("new.message=New\n")
+    os.utime(input_file, ns=(10**9, 10**9))
+    assert read_i18n_document(input_file, cache).get("new.message").value == "New"
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_document_cache_skips_recently_changed_files(tmp_path):
+    """A file changed in the last seconds is not cached, since another change
+    in the same tick of the clock would not change its modification time
+    """
+    input_file = tmp_path / "messages.properties"
+    input_file.write_text("a=One\n")
+    cache = DocumentCache()
+    read_i18n_document(input_file, cache)
+    input_file.write_text("a=Two\n")
+    assert read_i18n_document(input_file, cache).get("a").value == "Two"
+    assert cache.hits == 0
+
+
+def test_read_i18n_document_without_cache(tmp_path):
+    """read_i18n_document only caches documents when it is given a cache"""
+    input_file = tmp_path / "messages.properties"
+    input_file.write_text("a=One\n")
+    os.utime(input_file, ns=(0, 0))
+    assert read_i18n_document(input_file).get("a").value == "One"
+    # A change that keeps the size and modification time is still seen
+    input_file.write_text("a=Two\n")
+    os.utime(input_file, ns=(0, 0))
+    assert read_i18n_document(input_file).get("a").value == "Two"
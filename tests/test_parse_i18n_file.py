@@ -1,5 +1,9 @@
 import pytest
-from i18ntools.parse_i18n_file import parse_i18n_file
+from i18ntools.parse_i18n_file import (
+    ends_with_continuation,
+    parse_i18n_file,
+    tokenize_i18n_lines,
+)
 
 
 def test_parse_file():
@@ -122,3 +126,47 @@ def test_parse_file_with_duplicate_keys():
         parse_i18n_file("tests/resources/duplicate.properties")
     with pytest.raises(SyntaxWarning):
         parse_i18n_file("tests/resources/duplicate.properties", remove_backslashes=True)
+
+
+def test_ends_with_continuation():
+    assert ends_with_continuation("key=value \\")
+    assert not ends_with_continuation("key=value")
+    # An escaped backslash does not continue the value
+    assert not ends_with_continuation("path=C:\\\\")
+    assert ends_with_continuation("path=C:\\\\\\")
+
+
+def test_tokenize_i18n_lines():
+    lines = [
+        "# comment\n",
+        "first=one \\\n",
+        "    still one\n",
+        "\n",
+        "second=two\n",
+    ]
+    assert list(tokenize_i18n_lines(lines)) == [
+        (None, None, ["# comment\n"]),
+        ("first", "one \\\n    still one", ["first=one \\\n", "    still one\n"]),
+        (None, None, ["\n"]),
+        ("second", "two", ["second=two\n"]),
+    ]
+
+
+def test_parse_file_with_equals_in_multiline_value(tmp_path):
+    """A multiline value can have an "=" character in its continuation lines"""
+    input_file = tmp_path / "messages.properties"
+    input_file.write_text(
+        "formula.help=Enter a formula, \\\n"
+        "    i.e. total=price * quantity\n"
+        "next.message=Next\n"
+    )
+    parsed_data = parse_i18n_file(input_file)
+    assert parsed_data == {
+        "formula.help": "Enter a formula, \\\n    i.e. total=price * quantity",
+        "next.message": "Next",
+    }
+    parsed_data = parse_i18n_file(input_file, remove_backslashes=True)
+    assert parsed_data == {
+        "formula.help": "Enter a formula, i.e. total=price * quantity",
+        "next.message": "Next",
+    }
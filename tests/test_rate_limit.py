@@ -0,0 +1,205 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+from i18ntools.rate_limit import RateLimiter, TokenBucket, parse_retry_after
+from i18ntools.backends import post_translation_request
+
+
+class FakeClock:
+    """A clock that only moves when something sleeps on it."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class ThrottlingHandler(BaseHTTPRequestHandler):
+    """Stub of the Translator API that answers with the queued status codes
+    before it translates the texts into upper case."""
+
+    def do_POST(self):
+        request_payload = json.loads(
+            self.rfile.read(int(self.headers["Content-Length"]))
+        )
+        self.server.requests.append(request_payload)
+        if self.server.statuses:
+            status, headers = self.server.statuses.pop(0)
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = json.dumps(
+            [
+                {"translations": [{"text": item["text"].upper(), "to": "de"}]}
+                for item in request_payload
+            ]
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    """Fixture that runs a throttling stub of the Translator API and
+    returns the server."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ThrottlingHandler)
+    server.requests = []
+    server.statuses = []
+    server.endpoint = f"http://127.0.0.1:{server.server_port}/translate?to=de"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_parse_retry_after():
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("7") == 7.0
+    assert parse_retry_after("0.5") == 0.5
+    assert parse_retry_after("-3") == 0.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:30 GMT", now=1445412500) == 10
+    assert parse_retry_after("soon") is None
+
+
+def test_token_bucket():
+    clock = FakeClock()
+    bucket = TokenBucket(600, clock=clock)
+    # A whole minute of tokens can be used at once
+    assert bucket.reserve(600) == 0
+    # Then the bucket refills at 10 tokens per second
+    assert bucket.reserve(20) == pytest.approx(2)
+    assert bucket.reserve(10) == pytest.approx(3)
+    clock.now += 3
+    assert bucket.reserve(1) == pytest.approx(0.1)
+    with pytest.raises(ValueError, match="greater than 0"):
+        TokenBucket(0)
+
+
+def test_rate_limiter_acquire():
+    clock = FakeClock()
+    rate_limiter = RateLimiter(
+        characters_per_minute=6000,
+        requests_per_minute=2,
+        clock=clock,
+        sleep=clock.sleep,
+    )
+    rate_limiter.acquire(5000)
+    rate_limiter.acquire(1000)
+    assert clock.sleeps == []
+    # Both buckets are empty, so the request bucket's 30 seconds are waited
+    rate_limiter.acquire(1000)
+    assert clock.sleeps == [pytest.approx(30)]
+
+
+def test_rate_limiter_retry_delay():
+    rate_limiter = RateLimiter(backoff_base=1, backoff_max=10)
+    assert rate_limiter.retry_delay(0, retry_after=3) == 3
+    assert rate_limiter.retry_delay(0, retry_after=30) == 10
+    for attempt, backoff in [(0, 1), (1, 2), (2, 4), (5, 10)]:
+        assert backoff / 2 <= rate_limiter.retry_delay(attempt) <= backoff
+
+
+def test_post_translation_request_retries(stub_server):
+    """Throttled and failed requests are sent again after waiting
+    for Retry-After or backing off"""
+    clock = FakeClock()
+    rate_limiter = RateLimiter(clock=clock, sleep=clock.sleep)
+    stub_server.statuses = [
+        (429, {"Retry-After": "7"}),
+        (503, {}),
+        (429, {"Retry-After": "2"}),
+    ]
+    with requests.Session() as session:
+        response_object = post_translation_request(
+            session,
+            stub_server.endpoint,
+            {},
+            [{"text": "hello"}],
+            "eastus2",
+            rate_limiter,
+        )
+
+    assert response_object == [{"translations": [{"text": "HELLO", "to": "de"}]}]
+    assert len(stub_server.requests) == 4
+    assert rate_limiter.retries == 3
+    assert clock.sleeps[0] == 7
+    assert 1 <= clock.sleeps[1] <= 2
+    assert clock.sleeps[2] == 2
+
+
+def test_post_translation_request_reserves_once(stub_server):
+    """A request that is sent again is only counted against the quota once"""
+    clock = FakeClock()
+    rate_limiter = RateLimiter(
+        characters_per_minute=10,
+        requests_per_minute=1,
+        clock=clock,
+        sleep=clock.sleep,
+    )
+    stub_server.statuses = [(429, {"Retry-After": "3"}), (503, {})]
+    with requests.Session() as session:
+        post_translation_request(
+            session,
+            stub_server.endpoint,
+            {},
+            [{"text": "0123456789"}],
+            "eastus2",
+            rate_limiter,
+        )
+
+    assert len(stub_server.requests) == 3
+    # Only the Retry-After pause and the backoff are waited
+    assert clock.sleeps[0] == 3
+    assert len(clock.sleeps) == 2
+    assert rate_limiter.character_bucket.reserve(0) == 0
+    assert rate_limiter.request_bucket.reserve(0) == 0
+
+
+def test_post_translation_request_gives_up(stub_server):
+    """HTTPError is raised when a request is still throttled after
+    max_retries, or fails in a way that is not worth retrying"""
+    clock = FakeClock()
+    rate_limiter = RateLimiter(max_retries=2, clock=clock, sleep=clock.sleep)
+    stub_server.statuses = [(429, {"Retry-After": "1"})] * 3
+    with requests.Session() as session:
+        with pytest.raises(requests.HTTPError):
+            post_translation_request(
+                session,
+                stub_server.endpoint,
+                {},
+                [{"text": "a"}],
+                "eastus2",
+                rate_limiter,
+            )
+        assert len(stub_server.requests) == 3
+
+        stub_server.statuses = [(401, {})]
+        with pytest.raises(requests.HTTPError):
+            post_translation_request(
+                session,
+                stub_server.endpoint,
+                {},
+                [{"text": "a"}],
+                "eastus2",
+                rate_limiter,
+            )
+        assert len(stub_server.requests) == 4
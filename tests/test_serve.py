@@ -0,0 +1,249 @@
+import http.client
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import pytest
+import requests
+from i18ntools.backends import AzureTranslatorBackend
+from i18ntools.rate_limit import RateLimiter
+from i18ntools.serve import RequestCoalescer, TranslationServer, is_loopback_host
+from i18ntools.translate import translate_file
+
+
+class RecordingBackend:
+    """A translator backend that translates texts into upper case and
+    records the batches it is asked to translate."""
+
+    def __init__(self, started=None, release=None, error=None):
+        self.batches = []
+        self.started = started
+        self.release = release
+        self.error = error
+
+    def translate_batch(self, texts, input_lang, output_langs):
+        self.batches.append(sorted(texts))
+        if self.started is not None:
+            self.started.set()
+            self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return [[f"{lang}:{text.upper()}" for lang in output_langs] for text in texts]
+
+    def close(self):
+        pass
+
+
+def client_backend(server):
+    """Returns a backend that sends its requests to the service without
+    an API key and without retrying them."""
+    return AzureTranslatorBackend(
+        endpoint=server.endpoint,
+        subscription_key="",
+        rate_limiter=RateLimiter(max_retries=0),
+    )
+
+
+def test_coalesce_concurrent_requests():
+    """Requests that arrive within the window are sent in one batch,
+    with the texts several clients ask for sent once"""
+    backend = RecordingBackend()
+    coalescer = RequestCoalescer(backend, window=0.3)
+    client_texts = [["Yes", "No"], ["No", "Maybe"], ["Yes", "Yes"]]
+    results = [None] * len(client_texts)
+
+    def translate(index):
+        client = client_backend(server)
+        try:
+            results[index] = client.translate_batch(
+                client_texts[index], "en", ["de", "fr"]
+            )
+        finally:
+            client.close()
+
+    with TranslationServer(coalescer, port=0) as server:
+        threads = [
+            threading.Thread(target=translate, args=(index,))
+            for index in range(len(client_texts))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert backend.batches == [["Maybe", "No", "Yes"]]
+    assert results == [
+        [["de:YES", "fr:YES"], ["de:NO", "fr:NO"]],
+        [["de:NO", "fr:NO"], ["de:MAYBE", "fr:MAYBE"]],
+        [["de:YES", "fr:YES"], ["de:YES", "fr:YES"]],
+    ]
+    assert coalescer.text_count == 6
+    assert coalescer.sent_count == 3
+    assert coalescer.batch_count == 1
+
+
+def test_coalesce_in_flight_texts():
+    """A text that is being translated is not sent again"""
+    started = threading.Event()
+    release = threading.Event()
+    backend = RecordingBackend(started, release)
+    coalescer = RequestCoalescer(backend, window=0)
+    results = {}
+
+    def translate(name, texts):
+        results[name] = coalescer.translate(texts, "en", ["de"])
+
+    first = threading.Thread(target=translate, args=("first", ["Yes"]))
+    first.start()
+    started.wait(5)
+    # The second thread waits for the batch of the first one
+    second = threading.Thread(target=translate, args=("second", ["Yes"]))
+    second.start()
+    second.join(0.2)
+    assert second.is_alive()
+    release.set()
+    first.join()
+    second.join()
+
+    assert backend.batches == [["Yes"]]
+    assert results == {"first": [["de:YES"]], "second": [["de:YES"]]}
+    # Different languages are sent separately
+    assert coalescer.translate(["Yes"], "en", ["fr"]) == [["fr:YES"]]
+    assert backend.batches == [["Yes"], ["Yes"]]
+
+
+class ShortResponseBackend(RecordingBackend):
+    """A translator backend that leaves out the translation of the last text."""
+
+    def translate_batch(self, texts, input_lang, output_langs):
+        return super().translate_batch(texts, input_lang, output_langs)[:-1]
+
+
+def test_coalescer_fails_every_thread_of_a_failed_batch():
+    """Every text of a batch whose translations cannot be handed out gets
+    the error, instead of leaving a thread waiting for it"""
+    coalescer = RequestCoalescer(ShortResponseBackend(), window=0)
+    with pytest.raises(ValueError, match="1 translations for a request of 2"):
+        coalescer.translate(["Yes", "No"], "en", ["de"])
+    assert coalescer.in_flight == {("en", ("de",)): {}}
+
+
+def test_coalescer_result_timeout():
+    """A thread waiting for the batch of another thread gives up after
+    result_timeout seconds"""
+    started = threading.Event()
+    release = threading.Event()
+    coalescer = RequestCoalescer(
+        RecordingBackend(started, release), window=0, result_timeout=0.1
+    )
+    first = threading.Thread(target=coalescer.translate, args=(["Yes"], "en", ["de"]))
+    first.start()
+    started.wait(5)
+    with pytest.raises(FutureTimeoutError):
+        coalescer.translate(["Yes"], "en", ["de"])
+    release.set()
+    first.join()
+
+
+def test_translation_server_errors():
+    backend = RecordingBackend(error=requests.ConnectionError("no network"))
+    with TranslationServer(RequestCoalescer(backend, window=0), port=0) as server:
+        client = client_backend(server)
+        with pytest.raises(requests.HTTPError, match="502"):
+            client.translate_batch(["Yes"], "en", ["de"])
+        response = requests.post(
+            f"{server.endpoint}/translate?api-version=3.0&to=de",
+            json=[{"text": "Yes"}],
+            timeout=5,
+        )
+        assert response.status_code == 400
+        client.close()
+
+
+def test_translation_server_hides_upstream_errors(capsys):
+    """The details of an upstream error are logged on the server, and the
+    clients only get a generic message"""
+    backend = RecordingBackend(error=requests.ConnectionError("secret detail"))
+    with TranslationServer(RequestCoalescer(backend, window=0), port=0) as server:
+        response = requests.post(
+            f"{server.endpoint}/translate?api-version=3.0&from=en&to=de",
+            json=[{"text": "Yes"}],
+            timeout=5,
+        )
+    assert response.status_code == 502
+    assert response.json()["error"]["message"] == "The upstream translator failed."
+    assert "secret detail" in capsys.readouterr().err
+
+
+def test_translation_server_token(monkeypatch):
+    """A server with a token only accepts the requests that send it, and
+    a token is required to listen on other addresses than loopback ones"""
+    assert is_loopback_host("localhost")
+    assert is_loopback_host("127.0.0.1")
+    assert is_loopback_host("::1")
+    assert not is_loopback_host("0.0.0.0")
+    assert not is_loopback_host("translation-host")
+    with pytest.raises(ValueError, match="token is required"):
+        TranslationServer(RequestCoalescer(RecordingBackend()), "0.0.0.0", port=0)
+
+    coalescer = RequestCoalescer(RecordingBackend(), window=0)
+    with TranslationServer(coalescer, port=0, token="shared-token") as server:
+        client = client_backend(server)
+        with pytest.raises(requests.HTTPError, match="401"):
+            client.translate_batch(["Yes"], "en", ["de"])
+        client.close()
+
+        monkeypatch.setenv("TRANSLATOR_ENDPOINT_KEY", "shared-token")
+        client = AzureTranslatorBackend(endpoint=server.endpoint)
+        assert client.translate_batch(["Yes"], "en", ["de"]) == [["de:YES"]]
+        client.close()
+
+
+def test_translation_server_request_limits():
+    """Bodies over max_body_size are rejected without being read, and
+    requests over the element and character limits of the Translator API
+    are rejected before anything is translated"""
+    backend = RecordingBackend()
+    coalescer = RequestCoalescer(backend, window=0)
+    url = "/translate?api-version=3.0&from=en&to=de&to=fr"
+    with TranslationServer(coalescer, port=0, max_body_size=2000) as server:
+        response = requests.post(
+            f"{server.endpoint}{url}", json=[{"text": "x" * 2000}], timeout=5
+        )
+        assert response.status_code == 413
+        server.max_body_size = 100_000
+        response = requests.post(
+            f"{server.endpoint}{url}", json=[{"text": ""}] * 1001, timeout=5
+        )
+        assert response.status_code == 400
+        assert response.json()["error"]["code"] == 400077
+        # The characters are counted once per output language
+        response = requests.post(
+            f"{server.endpoint}{url}", json=[{"text": "x" * 25001}], timeout=5
+        )
+        assert response.status_code == 400
+        assert response.json()["error"]["code"] == 400077
+        connection = http.client.HTTPConnection(*server.server_address[:2], timeout=5)
+        connection.putrequest("POST", url)
+        connection.putheader("Content-Length", "-1")
+        connection.endheaders(b"[]")
+        assert connection.getresponse().status == 400
+        connection.close()
+    assert backend.batches == []
+
+
+def test_translate_file_through_server(monkeypatch, tmp_path):
+    """translate_file sends its requests to the service without an API key"""
+    monkeypatch.delenv("TRANSLATOR_API_SUBSCRIPTION_KEY", raising=False)
+    input_file = tmp_path / "messages.properties"
+    input_file.write_text("yes=Yes\nno=No\n", encoding="utf-8")
+    with TranslationServer(
+        RequestCoalescer(RecordingBackend(), window=0), port=0
+    ) as server:
+        backend = AzureTranslatorBackend(endpoint=server.endpoint)
+        try:
+            translate_file(str(input_file), "de", backend=backend)
+        finally:
+            backend.close()
+    assert (tmp_path / "messages_de.properties").read_text() == (
+        "yes=de:YES\nno=de:NO\n"
+    )
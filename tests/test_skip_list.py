@@ -0,0 +1,159 @@
+import pytest
+from i18ntools.dry_run import plan_translate_file
+from i18ntools.job_planner import translate_jobs
+from i18ntools.skip_list import SkipList, is_untranslatable, read_skip_list
+from i18ntools.translate import make_api_call, translate_file
+
+
+class RecordingBackend:
+    """A translator backend that translates texts into upper case and
+    records the texts it is asked to translate."""
+
+    def __init__(self):
+        self.texts = []
+
+    def translate_batch(self, texts, input_lang, output_langs):
+        self.texts.extend(texts)
+        return [[f"{lang}:{text.upper()}" for lang in output_langs] for text in texts]
+
+    def close(self):
+        pass
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        "{0}",
+        "{0} / {1}",
+        "{name}",
+        "{0,number,#.##} / {1, date, short} {2,time}",
+        "%s",
+        "%1$s: %2$.2f%%",
+        "1,000",
+        "50%",
+        "https://example.com/help?topic=sessions",
+        "support@example.com",
+        "(+1) 555-0100",
+        "",
+    ],
+)
+def test_is_untranslatable(value):
+    """Values without letters outside of placeholders, URLs and emails
+    are not translatable"""
+    assert is_untranslatable(value)
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        "Hello {0}",
+        "Errors: {0}.",
+        "Visit www.example.com for help",
+        "{count, plural, one {# item} other {# items}}",
+        "{0,choice,0#no files|1#one file}",
+        "{gender, select, female {she} other {they}}",
+        "{0,choice,0#|1#{1}}",
+        "Hypercision",
+        "日本語",
+    ],
+)
+def test_is_translatable(value):
+    """Values with letters outside of placeholders are translatable"""
+    assert not is_untranslatable(value)
+
+
+def test_find_skipped_keys():
+    """SkipList skips the listed keys and values and the untranslatable
+    values, and matches the keys of translate_jobs on their message key
+    """
+    input_data = {
+        "app.name": "Attendance",
+        "app.name.short": "ATT",
+        "greeting": "Hello",
+        "brand": "Hypercision",
+        "count": "{0}",
+    }
+    skip_list = SkipList(keys=["app.name"], values=["Hypercision"])
+    assert skip_list.find_skipped_keys(input_data) == {
+        "app.name",
+        "app.name.short",
+        "brand",
+        "count",
+    }
+    assert SkipList(use_patterns=False).find_skipped_keys(input_data) == set()
+    assert SkipList(keys=["app.*"]).find_skipped_keys(
+        {(0, "app.name"): "Attendance", (1, "app.name"): "Anwesenheit", (1, "x"): "X"}
+    ) == {(0, "app.name"), (1, "app.name")}
+
+
+def test_read_skip_list(tmp_path):
+    """read_skip_list reads the keys and values of a skip list file"""
+    skip_list_file = tmp_path / "skip.txt"
+    skip_list_file.write_text(
+        "# Brand names\nvalue: Hypercision\n\nkey: footer.*\nvalue:  {0} GmbH \n"
+    )
+    skip_list = read_skip_list(skip_list_file)
+    assert skip_list.keys == ["footer.*"]
+    assert skip_list.values == {"Hypercision", "{0} GmbH"}
+
+    skip_list_file.write_text("Hypercision\n")
+    with pytest.raises(ValueError, match="Line 1 of"):
+        read_skip_list(skip_list_file)
+
+
+def test_make_api_call_with_skip_list():
+    """make_api_call does not send the skipped values and returns them as
+    their own translation, in the order of input_data
+    """
+    backend = RecordingBackend()
+    response_object = make_api_call(
+        {"a": "{0}", "b": "Hello", "c": "https://example.com", "d": "Hello"},
+        "de,fr",
+        backend=backend,
+        skip_list=SkipList(),
+    )
+    assert backend.texts == ["Hello"]
+    assert [
+        [translation["text"] for translation in result["translations"]]
+        for result in response_object
+    ] == [
+        ["{0}", "{0}"],
+        ["de:HELLO", "fr:HELLO"],
+        ["https://example.com", "https://example.com"],
+        ["de:HELLO", "fr:HELLO"],
+    ]
+
+
+def test_translate_file_with_skip_list(tmp_path):
+    """translate_file copies the skipped values to the output file as they are"""
+    input_file = tmp_path / "messages.properties"
+    input_file.write_text("# Sessions\ncount={0}\nbrand=Hypercision\ntitle=Sessions\n")
+    backend = RecordingBackend()
+    translate_file(
+        str(input_file),
+        "de",
+        backend=backend,
+        skip_list=SkipList(values=["Hypercision"]),
+    )
+    assert backend.texts == ["Sessions"]
+    assert (tmp_path / "messages_de.properties").read_text() == (
+        "# Sessions\ncount={0}\nbrand=Hypercision\ntitle=de:SESSIONS\n"
+    )
+
+
+def test_translate_jobs_and_plan_with_skip_list(tmp_path):
+    """translate_jobs and dry runs skip the same values"""
+    backend = RecordingBackend()
+    translations = translate_jobs(
+        [("de", {"a": "{0}", "b": "Hi"}), ("de", {"a": "42"})],
+        backend=backend,
+        skip_list=SkipList(),
+    )
+    assert backend.texts == ["Hi"]
+    assert translations == [{"a": "{0}", "b": "de:HI"}, {"a": "42"}]
+
+    input_file = tmp_path / "messages.properties"
+    input_file.write_text("a={0}\nb=Hi\n")
+    plan = plan_translate_file(str(input_file), "de", skip_list=SkipList())
+    assert plan.message_count == 2
+    assert plan.billed_characters == {"de": 2}
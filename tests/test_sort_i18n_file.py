@@ -19,3 +19,34 @@ def test_sort_i18n_file(tmp_path):
     assert len(output_file_contents) == 9
     assert output_file_contents[1] == "# Track 4 on Expert In A Dying Field\n"
     assert output_file_contents[2] == "TheBeths.YourSide.lyrics=German Translation\n"
+
+
+def test_sort_i18n_file_keeps_output_only_comments(tmp_path):
+    """Comments that are only in the output file are kept when sorting,
+    and comments that are also in the input file are not repeated
+    """
+    output_file = tmp_path / "output_de.properties"
+    with open(output_file, "w") as f:
+        f.write("handshake.register.suspended.error=ok\n")
+        f.write("# Reviewed by the German translator\n")
+        f.write("instructorService.removeSession.success=hello\n")
+        f.write("# SessionItem.itemID is the first parameter\n")
+        f.write("handshake.register.disabledException.error=world\n")
+        f.write("# End of the German messages\n")
+
+    sort_i18n_file("tests/resources/example.properties", "de", str(output_file))
+
+    with output_file.open() as f:
+        output_file_contents = f.readlines()
+    assert output_file_contents == [
+        "\n",
+        "# Track 4 on Expert In A Dying Field\n",
+        "\n",
+        "# SessionItem.itemID is the first parameter\n",
+        "# Reviewed by the German translator\n",
+        "instructorService.removeSession.success=hello\n",
+        "\n",
+        "handshake.register.suspended.error=ok\n",
+        "handshake.register.disabledException.error=world\n",
+        "# End of the German messages\n",
+    ]
@@ -0,0 +1,97 @@
+import os
+
+from i18ntools.status import (
+    count_problems,
+    find_languages,
+    format_status,
+    get_status,
+    index_bundle,
+    scan_keys,
+)
+
+
+def make_tree(tmp_path):
+    files = {
+        "app/messages.properties": "a=A\nb=B\nc=C\n",
+        "app/messages_de.properties": "a=A\nb=B\nc=C\n",
+        "app/messages_fr.properties": "a=A\nz=Z\nz=Z2\n",
+        "app/messages_pt_BR.properties": "c=C\n",
+        "lib/errors.properties": "# Errors\ne=E\ne=E2\n",
+        "lib/errors_de.properties": "e=E\n",
+        "lib/other.txt": "not a bundle\n",
+    }
+    for name, text in files.items():
+        file_path = tmp_path / name
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text(text, encoding="utf-8")
+
+
+def test_scan_keys(tmp_path):
+    make_tree(tmp_path)
+    assert scan_keys(tmp_path / "app/messages_fr.properties") == (["a", "z"], ["z"])
+
+
+def test_find_languages(tmp_path):
+    make_tree(tmp_path)
+    assert find_languages(str(tmp_path / "app/messages.properties")) == [
+        "de",
+        "fr",
+        "pt_BR",
+    ]
+    assert find_languages(str(tmp_path / "lib/errors.properties")) == ["de"]
+
+
+def test_index_bundle(tmp_path):
+    make_tree(tmp_path)
+    bundle_index = index_bundle(
+        str(tmp_path / "app/messages.properties"), ["de", "fr", "es"]
+    )
+    assert bundle_index["keys"] == ["a", "b", "c"]
+    # Bit 0 is de and bit 1 is fr
+    assert bundle_index["presence"] == [0b11, 0b01, 0b01]
+    assert bundle_index["translations"]["fr"]["extra_keys"] == ["z"]
+    assert bundle_index["translations"]["es"] is None
+
+
+def test_get_status(tmp_path):
+    make_tree(tmp_path)
+    status = get_status(tmp_path, processes=2)
+    assert status["languages"] == ["de", "fr", "pt_BR"]
+    app, lib = status["bundles"]
+    assert app["key_count"] == 3
+    assert app["complete_key_count"] == 0
+    assert app["languages"]["de"]["missing_keys"] == []
+    assert app["languages"]["fr"] == {
+        "file": os.path.join(str(tmp_path), "app", "messages_fr.properties"),
+        "missing_keys": ["b", "c"],
+        "extra_keys": ["z"],
+        "duplicate_keys": ["z"],
+    }
+    assert app["languages"]["pt_BR"]["missing_keys"] == ["a", "b"]
+    assert lib["duplicate_keys"] == ["e"]
+    assert lib["complete_key_count"] == 0
+    assert lib["languages"]["fr"]["file"] is None
+    assert lib["languages"]["fr"]["missing_keys"] == ["e"]
+    assert count_problems(status) == 1 + 2 + 1 + 2 + 1 + 2
+
+    status = get_status(tmp_path, "de", exclude=["lib/*"])
+    assert len(status["bundles"]) == 1
+    assert status["bundles"][0]["complete_key_count"] == 3
+    assert count_problems(status) == 0
+
+
+def test_format_status(tmp_path):
+    make_tree(tmp_path)
+    lines = format_status(get_status(tmp_path, "de,fr")).splitlines()
+    assert lines[:4] == [
+        "2 bundles in 2 languages",
+        "bundle                    keys       de       fr",
+        "app/messages.properties      3   100.0%    33.3%",
+        "lib/errors.properties        1   100.0%  no file",
+    ]
+    assert lines[4:] == [
+        "app/messages.properties [fr] 2 missing keys: b, c",
+        "app/messages.properties [fr] 1 extra keys: z",
+        "app/messages.properties [fr] 1 duplicate keys: z",
+        "lib/errors.properties duplicate keys: e",
+    ]
@@ -1,11 +1,23 @@
 import json
 import os
+import shutil
+import time
+from urllib.parse import parse_qs, urlparse
 
+import i18ntools.translate
 import pytest
 import requests
 import vcr
 from i18ntools.parse_i18n_file import parse_i18n_file
-from i18ntools.translate import get_default_filepath, make_api_call, translate_file
+from i18ntools.rate_limit import RateLimiter
+from i18ntools.translate import (
+    batch_texts,
+    get_default_filepath,
+    make_api_call,
+    pack_texts,
+    split_languages,
+    translate_file,
+)
 
 # Do not record any authorization headers
 filter_headers = ["authorization", "Ocp-Apim-Subscription-Key"]
@@ -44,6 +56,16 @@ def test_get_default_filepath():
         == "/home/docs/i18n_de.properties"
     )
 
+    assert (
+        get_default_filepath("/home/my_docs/i18n_vi.properties", "es")
+        == "/home/my_docs/i18n_es.properties"
+    )
+
+    assert (
+        get_default_filepath("/home/docs/error_messages_zh-Hans.properties", "pt-pt")
+        == "/home/docs/error_messages_pt-pt.properties"
+    )
+
 
 def test_translate_without_api_key():
     """KeyError is raised when environment variable
@@ -59,13 +81,19 @@ def test_translate_without_api_key():
 @vcr.use_cassette(
     "tests/cassettes/test_translate_with_invalid_api_key.yml"
 )  # type: ignore
-def test_translate_with_invalid_api_key():
+def test_translate_with_invalid_api_key(tmp_path):
     """HTTPError is raised when environment variable
     TRANSLATOR_API_SUBSCRIPTION_KEY is set to invalid key
     """
     os.environ["TRANSLATOR_API_SUBSCRIPTION_KEY"] = "three_little_ducks"
     with pytest.raises(requests.exceptions.HTTPError):
-        translate_file("tests/resources/example.properties", "de")
+        translate_file(
+            "tests/resources/example.properties",
+            "de",
+            str(tmp_path / "example_de.properties"),
+        )
+    # Nothing is left behind, since the caller did not ask for a journal
+    assert list(tmp_path.iterdir()) == []
 
 
 @vcr.use_cassette(
@@ -107,5 +135,232 @@ def test_make_api_call(fake_german_translations):
     """make_api_call returns JSON when the API call is successful"""
     os.environ["TRANSLATOR_API_SUBSCRIPTION_KEY"] = "not-an-actual-api-key"
     input_data = parse_i18n_file("tests/resources/example.properties")
+    # The cassette was recorded before the last two messages were added
+    # to example.properties, so only send the first six messages
+    input_data = dict(list(input_data.items())[:6])
     translation_info = make_api_call(input_data, "de")
     assert translation_info == fake_german_translations
+
+
+def test_make_api_call_with_whole_file(translator_api):
+    """make_api_call sends every distinct value of a file once, in batches,
+    and returns a translation for each message in the order of the file
+    """
+    input_data = parse_i18n_file("tests/resources/example.properties")
+    input_data["copy.of.first"] = next(iter(input_data.values()))
+    translation_info = make_api_call(input_data, "de", max_elements=3)
+    sent_texts = [
+        item["text"] for payload in translator_api.payloads for item in payload
+    ]
+    assert [len(payload) for payload in translator_api.payloads] == [3, 3, 2]
+    assert sorted(sent_texts) == sorted(set(input_data.values()))
+    assert translation_info == [
+        {"translations": [{"text": value.upper(), "to": "de"}]}
+        for value in input_data.values()
+    ]
+
+
+def test_batch_texts():
+    texts = ["aaaa", "bb", "cccccc", "d", "eeeeeeeeeeee", "f"]
+    assert batch_texts(texts, max_elements=2, max_characters=100) == [
+        [0, 1],
+        [2, 3],
+        [4, 5],
+    ]
+    assert batch_texts(texts, max_elements=10, max_characters=7) == [
+        [0, 1],
+        [2, 3],
+        [4],
+        [5],
+    ]
+    assert batch_texts([]) == []
+    with pytest.raises(ValueError, match="at least 1"):
+        batch_texts(texts, max_elements=0)
+
+
+def test_pack_texts():
+    texts = ["aaaa", "bb", "cccccc", "d", "eeeeeeeeeeee", "f"]
+    # batch_texts needs four batches for these texts
+    assert pack_texts(texts, max_elements=10, max_characters=12) == [
+        [0, 1, 2],
+        [3, 5],
+        [4],
+    ]
+    assert pack_texts(texts, max_elements=2, max_characters=100) == [
+        [0, 1],
+        [2, 4],
+        [3, 5],
+    ]
+    assert pack_texts(["a" * 20, "b"], max_characters=10) == [[0], [1]]
+    assert pack_texts([]) == []
+    with pytest.raises(ValueError, match="at least 1"):
+        pack_texts(texts, max_characters=0)
+
+
+def test_make_api_call_in_batches(translator_api):
+    """make_api_call splits large inputs into several requests and returns
+    the results in the same order as the input values
+    """
+    payloads = translator_api.payloads
+    input_data = parse_i18n_file("tests/resources/example.properties")
+    translation_info = make_api_call(input_data, "de", max_elements=3)
+    assert len(payloads) == 3
+    assert [len(payload) for payload in payloads] == [3, 3, 2]
+    assert [item["translations"][0]["text"] for item in translation_info] == [
+        value.upper() for value in input_data.values()
+    ]
+
+
+def test_make_api_call_with_workers(translator_api):
+    """make_api_call keeps the results in the order of the input values
+    when the requests are sent concurrently and finish out of order
+    """
+    # Make the requests for the first batches finish last
+    translator_api.on_request = lambda payload: time.sleep(
+        0.05 / len(payload[0]["text"])
+    )
+    input_data = {f"key{index}": "x" * (index + 1) for index in range(8)}
+    translation_info = make_api_call(input_data, "de", max_elements=1, workers=4)
+    assert [item["translations"][0]["text"] for item in translation_info] == [
+        value.upper() for value in input_data.values()
+    ]
+    # All the requests were sent with the same session
+    assert len(translator_api.sessions) == 1
+
+
+def test_split_languages():
+    assert split_languages("de") == ["de"]
+    assert split_languages("de, fr,es,") == ["de", "fr", "es"]
+    assert split_languages(["pt", "zh"]) == ["pt", "zh"]
+    with pytest.raises(ValueError, match="At least one"):
+        split_languages(",")
+
+
+def test_translate_file_into_several_languages(tmp_path, translator_api):
+    """translate_file sends each value once for all the output languages
+    and saves one output file for each language
+    """
+    urls = translator_api.urls
+    input_file = tmp_path / "messages.properties"
+    shutil.copy("tests/resources/example2.properties", input_file)
+    translate_file(str(input_file), "de,fr")
+
+    assert len(urls) == 1
+    assert parse_qs(urlparse(urls[0]).query)["to"] == ["de", "fr"]
+    german_data = parse_i18n_file(tmp_path / "messages_de.properties")
+    french_data = parse_i18n_file(tmp_path / "messages_fr.properties")
+    assert german_data["me"] == "de:FIRST!"
+    assert french_data["me"] == "fr:FIRST!"
+    assert list(french_data.keys()) == list(parse_i18n_file(input_file).keys())
+
+    with pytest.raises(ValueError, match="output_file_path"):
+        translate_file(
+            str(input_file), "de,fr", output_file_path=tmp_path / "out.properties"
+        )
+
+
+def test_make_api_call_with_duplicate_values(translator_api):
+    """make_api_call sends each distinct value once and returns its
+    translation for every key that has that value
+    """
+    payloads = translator_api.payloads
+    input_data = {
+        "save.button": "Save",
+        "cancel.button": "Cancel",
+        "dialog.save": "Save",
+        "dialog.cancel": "Cancel",
+        "name.label": "Name",
+    }
+    translation_info = make_api_call(input_data, "de")
+    assert payloads == [[{"text": "Save"}, {"text": "Cancel"}, {"text": "Name"}]]
+    assert [item["translations"][0]["text"] for item in translation_info] == [
+        "SAVE",
+        "CANCEL",
+        "SAVE",
+        "CANCEL",
+        "NAME",
+    ]
+
+
+def test_translate_file_in_chunks(tmp_path, monkeypatch, translator_api):
+    """translate_file streams a large input file through the translator
+    in several chunks and writes the same file as for a single chunk
+    """
+    payloads = translator_api.payloads
+    monkeypatch.setattr(i18ntools.translate, "default_max_elements", 3)
+    input_file = tmp_path / "messages.properties"
+    shutil.copy("tests/resources/example.properties", input_file)
+    translate_file(str(input_file), "de")
+
+    assert [len(payload) for payload in payloads] == [3, 3, 2]
+    output_file = tmp_path / "messages_de.properties"
+    assert not (tmp_path / "messages_de.properties.partial").exists()
+    input_data = parse_i18n_file(input_file)
+    assert parse_i18n_file(output_file) == {
+        key: value.upper() for key, value in input_data.items()
+    }
+    # The comments and empty lines of the input file are kept
+    with open(input_file, encoding="utf-8") as f:
+        input_comments = [line for line in f if line.startswith("#") or line == "\n"]
+    with open(output_file, encoding="utf-8") as f:
+        output_comments = [line for line in f if line.startswith("#") or line == "\n"]
+    assert output_comments == input_comments
+
+
+def test_translate_file_failure_leaves_no_output(tmp_path, monkeypatch, translator_api):
+    """translate_file does not leave a partial output file behind
+    when a request fails part way through the input file
+    """
+    payloads = translator_api.payloads
+
+    def lose_connection(payload):
+        if len(payloads) >= 2:
+            raise requests.ConnectionError("Connection lost")
+
+    translator_api.on_request = lose_connection
+    monkeypatch.setattr(i18ntools.translate, "default_max_elements", 3)
+    input_file = tmp_path / "messages.properties"
+    shutil.copy("tests/resources/example.properties", input_file)
+    # The connection stays lost for every retry
+    rate_limiter = RateLimiter(max_retries=2, sleep=lambda seconds: None)
+    with pytest.raises(requests.ConnectionError):
+        translate_file(str(input_file), "de", rate_limiter=rate_limiter, journal=True)
+    assert len(payloads) == 4
+    # Only the journal of the first chunk is kept, to resume from
+    assert sorted(tmp_path.iterdir()) == [
+        input_file,
+        tmp_path / "messages_de.properties.journal",
+    ]
+
+
+def test_translate_file_resume(tmp_path, monkeypatch, translator_api):
+    """translate_file with resume=True does not send the messages that
+    were journaled before a run failed, and removes the journal once
+    the output file is complete
+    """
+    payloads = translator_api.payloads
+
+    def lose_connection(payload):
+        if len(payloads) == 3:
+            raise requests.ConnectionError("Connection lost")
+
+    translator_api.on_request = lose_connection
+    monkeypatch.setattr(i18ntools.translate, "default_max_elements", 3)
+    input_file = tmp_path / "messages.properties"
+    shutil.copy("tests/resources/example.properties", input_file)
+    rate_limiter = RateLimiter(max_retries=0)
+    with pytest.raises(requests.ConnectionError):
+        translate_file(str(input_file), "de", rate_limiter=rate_limiter, journal=True)
+
+    translator_api.on_request = None
+    payloads.clear()
+    translate_file(str(input_file), "de", rate_limiter=rate_limiter, resume=True)
+
+    # Only the last chunk is sent again
+    assert [len(payload) for payload in payloads] == [2]
+    output_file = tmp_path / "messages_de.properties"
+    assert not (tmp_path / "messages_de.properties.journal").exists()
+    input_data = parse_i18n_file(input_file)
+    assert parse_i18n_file(output_file) == {
+        key: value.upper() for key, value in input_data.items()
+    }
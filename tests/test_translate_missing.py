@@ -1,9 +1,15 @@
 import os
+from pathlib import Path
 
+import i18ntools.translate_missing
 import pytest
 import requests
 import vcr
-from i18ntools.translate_missing import translate_missing_messages
+from i18ntools.parse_i18n_file import parse_i18n_file
+from i18ntools.translate_missing import (
+    get_manifest_filepath,
+    translate_missing_messages,
+)
 
 # Do not record any authorization headers
 filter_headers = ["authorization", "Ocp-Apim-Subscription-Key"]
@@ -160,3 +166,72 @@ def test_translate_missing_messages_remove_backslashes(
         output_file_path=str(output_file),
     )
     assert output_file.read_text() == fake_german_i18n_data_without_backslashes
+
+
+def test_translate_missing_messages_incremental(tmp_path, translator_api):
+    """translate_missing_messages with incremental=True translates the
+    messages whose source value changed since the last run
+    """
+    payloads = translator_api.payloads
+    input_file = tmp_path / "messages.properties"
+    output_file = tmp_path / "messages_de.properties"
+    input_file.write_text("greeting=Hello\nfarewell=Goodbye\n")
+    output_file.write_text("greeting=Hallo\n")
+
+    # The first run only translates the missing message and saves a manifest
+    translate_missing_messages(str(input_file), "de", incremental=True)
+    assert payloads == [[{"text": "Goodbye"}]]
+    assert Path(get_manifest_filepath(output_file)).exists()
+    assert output_file.read_text() == "greeting=Hallo\nfarewell=GOODBYE\n"
+
+    # Nothing changed, so nothing is sent
+    payloads.clear()
+    translate_missing_messages(str(input_file), "de", incremental=True)
+    assert payloads == []
+
+    # The changed message is translated again and replaced in place
+    input_file.write_text("greeting=Hello there\nfarewell=Goodbye\nnew=New\n")
+    translate_missing_messages(str(input_file), "de", incremental=True)
+    assert payloads == [[{"text": "Hello there"}, {"text": "New"}]]
+    assert parse_i18n_file(output_file) == {
+        "greeting": "HELLO THERE",
+        "farewell": "GOODBYE",
+        "new": "NEW",
+    }
+
+    # Without incremental mode the changed message is left alone
+    payloads.clear()
+    input_file.write_text("greeting=Hi\nfarewell=Goodbye\nnew=New\n")
+    translate_missing_messages(str(input_file), "de")
+    assert payloads == []
+    assert parse_i18n_file(output_file)["greeting"] == "HELLO THERE"
+
+
+def test_translate_missing_messages_sort_writes_once(
+    tmp_path, monkeypatch, translator_api
+):
+    """translate_missing_messages with sort_file=True builds the sorted file
+    in memory, writes it once and keeps comments only in the output file
+    """
+    written_files = []
+    write_i18n_document = i18ntools.translate_missing.write_i18n_document
+
+    def counting_write_i18n_document(document, file_path):
+        written_files.append(file_path)
+        write_i18n_document(document, file_path)
+
+    monkeypatch.setattr(
+        i18ntools.translate_missing,
+        "write_i18n_document",
+        counting_write_i18n_document,
+    )
+    input_file = tmp_path / "messages.properties"
+    output_file = tmp_path / "messages_de.properties"
+    input_file.write_text("# Greetings\ngreeting=Hello\nfarewell=Goodbye\n")
+    output_file.write_text("# Checked by Anna\nfarewell=Auf Wiedersehen\n")
+
+    translate_missing_messages(str(input_file), "de", sort_file=True)
+    assert written_files == [str(output_file)]
+    assert output_file.read_text() == (
+        "# Greetings\ngreeting=HELLO\n# Checked by Anna\nfarewell=Auf Wiedersehen\n"
+    )
@@ -0,0 +1,144 @@
+import shutil
+
+import i18ntools.translate_tree
+import pytest
+from i18ntools.parse_i18n_file import parse_i18n_file
+from i18ntools.translate_tree import (
+    find_base_bundles,
+    missing_mode,
+    sort_mode,
+    translate_mode,
+    translate_tree,
+    write_bundle,
+)
+
+
+@pytest.fixture
+def bundle_tree(tmp_path):
+    """Fixture that returns a directory tree with two base bundles,
+    one translation and a file that is not a properties file."""
+    shutil.copy("tests/resources/example.properties", tmp_path / "messages.properties")
+    (tmp_path / "admin").mkdir()
+    shutil.copy(
+        "tests/resources/example2.properties", tmp_path / "admin" / "admin.properties"
+    )
+    shutil.copy(
+        "tests/resources/translations_de2.properties",
+        tmp_path / "messages_de.properties",
+    )
+    (tmp_path / "notes.txt").write_text("not a bundle\n")
+    return tmp_path
+
+
+def test_find_base_bundles(bundle_tree):
+    assert find_base_bundles(bundle_tree) == [
+        str(bundle_tree / "messages.properties"),
+        str(bundle_tree / "admin" / "admin.properties"),
+    ]
+    assert find_base_bundles(bundle_tree, exclude=["admin/*"]) == [
+        str(bundle_tree / "messages.properties"),
+    ]
+    assert find_base_bundles(bundle_tree, include=["admin.properties"]) == [
+        str(bundle_tree / "admin" / "admin.properties"),
+    ]
+    with pytest.raises(FileNotFoundError):
+        find_base_bundles(bundle_tree / "missing")
+
+
+def test_find_base_bundles_with_underscore(tmp_path):
+    """Base bundles with underscores in their name are found, and only the
+    files named with a language code are skipped as translations"""
+    for filename in (
+        "error_messages.properties",
+        "error_messages_de.properties",
+        "messages_en_GB.properties",
+        "messages_zh-Hans.properties",
+    ):
+        (tmp_path / filename).write_text("a=Hello\n")
+    assert find_base_bundles(tmp_path) == [str(tmp_path / "error_messages.properties")]
+
+
+def test_translate_tree_with_underscore(tmp_path, translator_api):
+    """The output file of a base bundle with an underscore in its name keeps
+    the whole name of the base bundle"""
+    (tmp_path / "error_messages.properties").write_text("a=Hello\n")
+    translate_tree(tmp_path, "fr", processes=1)
+    assert parse_i18n_file(str(tmp_path / "error_messages_fr.properties")) == {
+        "a": "HELLO"
+    }
+    assert not (tmp_path / "error_fr.properties").exists()
+
+
+def test_translate_tree(bundle_tree, translator_api):
+    """translate_tree translates every base bundle into every language"""
+    translate_tree(bundle_tree, "fr,es", processes=1)
+
+    for base_bundle in find_base_bundles(bundle_tree):
+        input_data = parse_i18n_file(base_bundle)
+        for lang in ("fr", "es"):
+            output_file = base_bundle.replace(".properties", f"_{lang}.properties")
+            assert parse_i18n_file(output_file) == {
+                key: f"{lang}:{value.upper()}" for key, value in input_data.items()
+            }
+
+
+def test_translate_tree_missing_messages(bundle_tree, translator_api):
+    """translate_tree in missing_mode only translates the messages missing
+    from the output files that exist"""
+    output_file = bundle_tree / "messages_de.properties"
+    output_data = parse_i18n_file(output_file)
+    input_data = parse_i18n_file(bundle_tree / "messages.properties")
+    translate_tree(bundle_tree, "de", missing_mode, processes=1)
+
+    # admin_de.properties does not exist, so it is not created
+    assert not (bundle_tree / "admin" / "admin_de.properties").exists()
+    missing_keys = [key for key in input_data if key not in output_data]
+    assert [
+        item["text"] for payload in translator_api.payloads for item in payload
+    ] == [input_data[key] for key in missing_keys]
+    assert parse_i18n_file(output_file) == {
+        **output_data,
+        **{key: input_data[key].upper() for key in missing_keys},
+    }
+
+
+def test_translate_tree_sort(bundle_tree, translator_api):
+    """translate_tree in sort_mode sorts the output files like their
+    base bundles without sending any requests"""
+    output_file = bundle_tree / "messages_de.properties"
+    output_data = parse_i18n_file(output_file)
+    translate_tree(bundle_tree, "de", sort_mode, processes=1)
+
+    assert translator_api.payloads == []
+    input_keys = list(parse_i18n_file(bundle_tree / "messages.properties"))
+    sorted_data = parse_i18n_file(output_file)
+    assert sorted_data == output_data
+    assert list(sorted_data) == [key for key in input_keys if key in output_data]
+
+
+def test_write_bundle_failure_keeps_output(bundle_tree, monkeypatch):
+    """write_bundle replaces the output file only once the new one is
+    complete, and leaves no partial file behind when writing fails"""
+    output_file = bundle_tree / "messages_de.properties"
+    output_text = output_file.read_text()
+    write_i18n_document = i18ntools.translate_tree.write_i18n_document
+
+    def failing_write(document, file_path):
+        with open(file_path, "w", encoding="utf-8") as f:
+            f.write("cut=off")
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(i18ntools.translate_tree, "write_i18n_document", failing_write)
+    input_file = str(bundle_tree / "messages.properties")
+    translations = dict.fromkeys(parse_i18n_file(input_file), "x")
+    with pytest.raises(OSError, match="No space"):
+        write_bundle(input_file, str(output_file), translate_mode, translations, False)
+    assert output_file.read_text() == output_text
+    assert not (bundle_tree / "messages_de.properties.partial").exists()
+
+    monkeypatch.setattr(
+        i18ntools.translate_tree, "write_i18n_document", write_i18n_document
+    )
+    write_bundle(input_file, str(output_file), translate_mode, translations, False)
+    assert parse_i18n_file(output_file) == translations
+    assert not (bundle_tree / "messages_de.properties.partial").exists()
@@ -0,0 +1,84 @@
+import time
+
+import pytest
+from i18ntools.translate import make_api_call
+from i18ntools.translation_cache import TranslationCache, get_default_cache_path
+
+
+def test_get_default_cache_path(monkeypatch, tmp_path):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    assert get_default_cache_path() == (tmp_path / "i18ntools" / "translations.sqlite3")
+
+
+def test_lookup_and_store(tmp_path):
+    cache_path = tmp_path / "cache.sqlite3"
+    with TranslationCache(cache_path) as cache:
+        assert cache.lookup("Hello", "en", ["de"]) is None
+        cache.store("Hello", "en", ["de", "fr"], ["Hallo", "Bonjour"])
+        assert cache.lookup("Hello", "en", ["de"]) == ["Hallo"]
+        assert cache.lookup("Hello", "en", ["fr", "de"]) == ["Bonjour", "Hallo"]
+        # A translation is only found for the same pair of languages
+        assert cache.lookup("Hello", "en", ["de", "es"]) is None
+        assert cache.lookup("Hello", "nl", ["de"]) is None
+        # Whitespace is part of the key
+        assert cache.lookup("Hello ", "en", ["de"]) is None
+        # Text is compared in Unicode NFC form
+        cache.store("Café", "en", ["de"], ["Café"])
+        assert cache.lookup("Café", "en", ["de"]) == ["Café"]
+
+    # The translations are still there after the cache is reopened
+    with TranslationCache(cache_path) as cache:
+        assert cache.lookup("Hello", "en", ["fr"]) == ["Bonjour"]
+        assert len(cache) == 3
+
+
+def test_evict(tmp_path):
+    cache = TranslationCache(tmp_path / "cache.sqlite3", max_entries=2)
+    for index, text in enumerate(["one", "two", "three"]):
+        cache.store(text, "en", ["de"], [text.upper()])
+        time.sleep(0.01)
+    cache.lookup("one", "en", ["de"])
+    cache.evict()
+    # "two" was the least recently used translation
+    assert len(cache) == 2
+    assert cache.lookup("two", "en", ["de"]) is None
+    assert cache.lookup("one", "en", ["de"]) == ["ONE"]
+
+    cache.max_age_days = 0
+    cache.evict()
+    assert len(cache) == 0
+    cache.close()
+
+
+def test_make_api_call_with_cache(tmp_path, translator_api):
+    """make_api_call only sends the values that are not in the cache
+    and saves the new translations in it
+    """
+    payloads = translator_api.payloads
+    with TranslationCache(tmp_path / "cache.sqlite3") as cache:
+        cache.store("two", "en", ["de"], ["zwei"])
+        input_data = {"a": "one", "b": "two", "c": "three"}
+        translation_info = make_api_call(input_data, "de", cache=cache)
+        assert payloads == [[{"text": "one"}, {"text": "three"}]]
+        assert [item["translations"][0]["text"] for item in translation_info] == [
+            "ONE",
+            "zwei",
+            "THREE",
+        ]
+
+        # Everything is in the cache now, so nothing is sent
+        payloads.clear()
+        translation_info = make_api_call(input_data, "de", cache=cache)
+        assert payloads == []
+        assert translation_info[2] == {"translations": [{"text": "THREE", "to": "de"}]}
+
+
+def test_make_api_call_with_short_response(tmp_path, translator_api):
+    """make_api_call raises when the translator returns fewer translations
+    than it was sent texts, and stores none of them in the cache
+    """
+    translator_api.on_request = lambda payload: payload[:-1]
+    with TranslationCache(tmp_path / "cache.sqlite3") as cache:
+        with pytest.raises(ValueError, match="1 translations for a request of 2"):
+            make_api_call({"a": "one", "b": "two"}, "de", cache=cache)
+        assert len(cache) == 0
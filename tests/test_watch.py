@@ -0,0 +1,145 @@
+import os
+
+from i18ntools.parse_cache import DocumentCache
+from i18ntools.watch import BundleWatcher, diff_messages
+
+
+class RecordingBackend:
+    """A translator backend that translates texts into upper case and
+    records the batches it is asked to translate."""
+
+    def __init__(self):
+        self.batches = []
+        self.closed = False
+
+    def translate_batch(self, texts, input_lang, output_langs):
+        self.batches.append(sorted(texts))
+        return [[f"{lang}:{text.upper()}" for lang in output_langs] for text in texts]
+
+    def close(self):
+        self.closed = True
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def save(file_path, text):
+    """Writes a file and moves its modification time forward, so the save is
+    seen even when it happens within the resolution of the file system."""
+    file_path.write_text(text, encoding="utf-8")
+    stat = os.stat(file_path)
+    os.utime(file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_diff_messages():
+    assert diff_messages({"a": "1", "b": "2"}, {"a": "1", "b": "3", "c": "4"}) == [
+        "b",
+        "c",
+    ]
+    assert diff_messages({"a": "1"}, {}) == []
+
+
+def test_bundle_watcher(tmp_path):
+    """The watcher creates the missing output files, then translates only the
+    new and changed messages of each save once the saves stop"""
+    input_file = tmp_path / "messages.properties"
+    save(input_file, "# Greetings\nhello=Hello\nbye=Bye\n")
+    german_file = tmp_path / "messages_de.properties"
+    german_file.write_text("hello=Hallo\n", encoding="utf-8")
+    backend = RecordingBackend()
+    clock = FakeClock()
+    watcher = BundleWatcher([str(input_file)], "de,fr", backend=backend, clock=clock)
+
+    watcher.poll()
+    watcher.changed_at.clear()
+    assert watcher.sync([str(input_file)]) == 3
+    assert german_file.read_text() == "hello=Hallo\nbye=de:BYE\n"
+    assert (tmp_path / "messages_fr.properties").read_text() == (
+        "# Greetings\nhello=fr:HELLO\nbye=fr:BYE\n"
+    )
+
+    # A burst of saves is only translated once it has settled
+    save(input_file, "# Greetings\nhello=Hello there\nbye=Bye\n")
+    assert watcher.poll() == []
+    clock.now += 0.5
+    save(input_file, "# Greetings\nhello=Hello there\nbye=Bye\nthanks=Thanks\n")
+    assert watcher.poll() == []
+    clock.now += 0.5
+    assert watcher.poll() == []
+    clock.now += 1.0
+    ready = watcher.poll()
+    assert ready == [str(input_file)]
+    assert watcher.poll() == []
+
+    backend.batches.clear()
+    assert watcher.sync(ready) == 4
+    # Both languages have the same changes, so they share one request
+    assert backend.batches == [["Hello there", "Thanks"]]
+    assert german_file.read_text() == (
+        "hello=de:HELLO THERE\nbye=de:BYE\nthanks=de:THANKS\n"
+    )
+    assert (tmp_path / "messages_fr.properties").read_text() == (
+        "# Greetings\nhello=fr:HELLO THERE\nbye=fr:BYE\nthanks=fr:THANKS\n"
+    )
+
+    watcher.close()
+    # The watcher does not close a backend it was given
+    assert not backend.closed
+
+
+def test_bundle_watcher_run(tmp_path):
+    """run keeps watching after a save that cannot be parsed, and translates
+    the file once it is fixed"""
+    input_file = tmp_path / "messages.properties"
+    save(input_file, "hello=Hello\n")
+    output_file = tmp_path / "messages_de.properties"
+    output_file.write_text("hello=Hallo\n", encoding="utf-8")
+    manifest_file = tmp_path / "messages_de.properties.manifest.json"
+    manifest_file.write_text('{"version": 1, "hashes": {}}', encoding="utf-8")
+    backend = RecordingBackend()
+    clock = FakeClock()
+    saves = [
+        "hello=Hello\nhello=Hello again\n",
+        "hello=Hello\nbye=Bye\n",
+    ]
+
+    def sleep(seconds):
+        clock.now += seconds
+        if saves and clock.now % 2 == 0:
+            save(input_file, saves.pop(0))
+
+    with BundleWatcher(
+        [str(input_file)], "de", backend=backend, debounce=1.0, clock=clock
+    ) as watcher:
+        watcher.run(poll_interval=0.5, stop=lambda: clock.now >= 10, sleep=sleep)
+
+    assert backend.batches == [["Bye"]]
+    assert output_file.read_text() == "hello=Hallo\nbye=de:BYE\n"
+    assert '"bye"' in manifest_file.read_text()
+
+
+def test_bundle_watcher_with_document_cache(tmp_path):
+    """With a document_cache, the watcher does not parse the files that did
+    not change since the last sync again"""
+    input_file = tmp_path / "messages.properties"
+    input_file.write_text("hello=Hello\n", encoding="utf-8")
+    (tmp_path / "messages_de.properties").write_text("hello=Hallo\n")
+    (tmp_path / "messages_fr.properties").write_text("hello=Bonjour\n")
+    for file_path in tmp_path.iterdir():
+        os.utime(file_path, ns=(0, 0))
+    document_cache = DocumentCache()
+    watcher = BundleWatcher(
+        [str(input_file)],
+        "de,fr",
+        backend=RecordingBackend(),
+        document_cache=document_cache,
+    )
+    assert watcher.sync([str(input_file)]) == 0
+    assert (document_cache.hits, document_cache.misses) == (0, 3)
+    assert watcher.sync([str(input_file)]) == 0
+    assert (document_cache.hits, document_cache.misses) == (3, 3)